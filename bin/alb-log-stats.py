@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+"""
+This script summarizes the Keycloak load balancer access logs (see ALB_ACCESS_LOGS_BUCKET
+and ALB_ACCESS_LOGS_PREFIX), reporting request counts and latency percentiles for each
+realm, endpoint and status code.
+
+Log files are read from S3 or from a local directory. Each gzipped file is decompressed
+and parsed as a stream, and files are processed in parallel across several processes.
+Latencies are aggregated into fixed histogram buckets (about 5% wide), so memory use
+does not grow with the number of requests.
+
+Usage:
+    python alb-log-stats.py <s3://bucket/prefix | directory> [--start DATE] [--end DATE]
+        [--account-id ID] [--region REGION] [--processes N] [--output FILE]
+
+Example:
+    python alb-log-stats.py s3://my-alb-logs/keycloak --start 2025-01-01 --end 2025-01-07
+"""
+
+import argparse
+import datetime
+import gzip
+import io
+import json
+import math
+import os
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Fields of an ALB access log entry up to and including the request line, see
+# https://docs.aws.amazon.com/elasticloadbalancing/latest/application/load-balancer-access-logs.html
+LOG_LINE_PATTERN = re.compile(
+    r"^\S+ \S+ \S+ \S+ \S+ "
+    r"(?P<request_processing_time>\S+) (?P<target_processing_time>\S+) "
+    r"(?P<response_processing_time>\S+) (?P<elb_status_code>\S+) \S+ \S+ \S+ "
+    r'"\S+ (?:[a-z]+://[^/ ]+)?(?P<path>[^? ]*)\S* [^"]*"'
+)
+REALM_PATH_PATTERN = re.compile(r"^/(?:admin/)?realms/(?P<realm>[^/]+)(?P<rest>/.*)?$")
+# Log files are named ..._<end time, e.g. 20250101T0005Z>_<ip>_<id>.log.gz
+LOG_FILE_DATE_PATTERN = re.compile(r"_(\d{8})T\d{4}Z_")
+
+ENDPOINTS = [
+    ("token", re.compile(r"^/protocol/openid-connect/token(/introspect)?$")),
+    ("auth", re.compile(r"^/protocol/openid-connect/auth$")),
+    ("certs", re.compile(r"^/protocol/openid-connect/certs$")),
+    ("userinfo", re.compile(r"^/protocol/openid-connect/userinfo$")),
+    ("discovery", re.compile(r"^/\.well-known/")),
+    ("login-actions", re.compile(r"^/login-actions/")),
+]
+
+TIMINGS = ["request_processing_time", "target_processing_time", "response_processing_time"]
+PERCENTILES = [50, 90, 99]
+
+# Histogram buckets are ~5% wide, starting at 0.1 ms
+BUCKET_GROWTH = 1.05
+BUCKET_MIN_SECONDS = 0.0001
+
+
+def bucket_index(seconds: float) -> int:
+    if seconds <= BUCKET_MIN_SECONDS:
+        return 0
+    return int(math.log(seconds / BUCKET_MIN_SECONDS, BUCKET_GROWTH)) + 1
+
+
+def bucket_upper_bound(index: int) -> float:
+    return BUCKET_MIN_SECONDS * BUCKET_GROWTH**index
+
+
+def classify(path: str) -> tuple[str, str]:
+    """
+    Returns the realm and endpoint of a request path.
+    """
+    match = REALM_PATH_PATTERN.match(path)
+    if not match:
+        return "-", "resources" if path.startswith("/resources/") else "other"
+
+    realm, rest = match.group("realm"), match.group("rest") or "/"
+    if path.startswith("/admin/"):
+        return realm, "admin"
+    for endpoint, pattern in ENDPOINTS:
+        if pattern.match(rest):
+            return realm, endpoint
+    return realm, "other"
+
+
+def new_stats() -> dict:
+    return {"count": 0, **{timing: defaultdict(int) for timing in TIMINGS}}
+
+
+def parse_stream(stream, stats: dict) -> int:
+    """
+    Adds every entry of an uncompressed log stream to stats.
+    Returns the number of lines that could not be parsed.
+    """
+    unparsed = 0
+    for line in stream:
+        match = LOG_LINE_PATTERN.match(line)
+        if not match:
+            unparsed += 1
+            continue
+
+        realm, endpoint = classify(match.group("path"))
+        entry = stats[(realm, endpoint, match.group("elb_status_code"))]
+        entry["count"] += 1
+        for timing in TIMINGS:
+            # -1 when the load balancer could not send the request or get a response
+            value = float(match.group(timing))
+            if value >= 0:
+                entry[timing][bucket_index(value)] += 1
+    return unparsed
+
+
+def process_file(source: str) -> tuple[dict, int]:
+    """
+    Parses a single gzipped log file, from a local path or an s3:// URL.
+    Returns its stats and the number of unparsed lines.
+    """
+    stats = defaultdict(new_stats)
+
+    if source.startswith("s3://"):
+        import boto3
+
+        bucket, _, key = source[len("s3://") :].partition("/")
+        raw = boto3.client("s3").get_object(Bucket=bucket, Key=key)["Body"]
+    else:
+        raw = open(source, "rb")
+
+    with raw, io.TextIOWrapper(gzip.GzipFile(fileobj=raw), encoding="utf-8") as stream:
+        unparsed = parse_stream(stream, stats)
+
+    # Convert to plain dicts so the result can be sent back to the parent process
+    return {
+        key: {
+            "count": entry["count"],
+            **{timing: dict(entry[timing]) for timing in TIMINGS},
+        }
+        for key, entry in stats.items()
+    }, unparsed
+
+
+def merge_stats(total: dict, stats: dict) -> None:
+    for key, entry in stats.items():
+        total_entry = total[key]
+        total_entry["count"] += entry["count"]
+        for timing in TIMINGS:
+            for index, count in entry[timing].items():
+                total_entry[timing][index] += count
+
+
+def percentiles(histogram: dict[int, int]) -> dict[str, float]:
+    """
+    Returns the requested percentiles of a histogram, in milliseconds (upper bucket bound).
+    """
+    total = sum(histogram.values())
+    if not total:
+        return {f"p{p}": None for p in PERCENTILES}
+
+    result = {}
+    cumulative = 0
+    remaining = list(PERCENTILES)
+    for index in sorted(histogram):
+        cumulative += histogram[index]
+        while remaining and cumulative >= total * remaining[0] / 100:
+            result[f"p{remaining.pop(0)}"] = round(bucket_upper_bound(index) * 1000, 1)
+    return result
+
+
+def list_dates(start: datetime.date, end: datetime.date):
+    day = start
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def list_s3_files(url: str, start, end, account_id, region) -> list[str]:
+    """
+    Lists the log files under an s3://bucket/prefix for each day of the date range.
+    """
+    import boto3
+
+    session = boto3.session.Session()
+    account_id = account_id or session.client("sts").get_caller_identity()["Account"]
+    region = region or session.region_name
+    bucket, _, prefix = url[len("s3://") :].partition("/")
+    prefix = f"{prefix.strip('/')}/" if prefix.strip("/") else ""
+
+    s3_client = session.client("s3")
+    paginator = s3_client.get_paginator("list_objects_v2")
+    files = []
+    for day in list_dates(start, end):
+        day_prefix = (
+            f"{prefix}AWSLogs/{account_id}/elasticloadbalancing/{region}/"
+            f"{day:%Y/%m/%d}/"
+        )
+        for page in paginator.paginate(Bucket=bucket, Prefix=day_prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith(".log.gz"):
+                    files.append(f"s3://{bucket}/{obj['Key']}")
+    return files
+
+
+def list_local_files(directory: str, start, end) -> list[str]:
+    """
+    Lists the log files in a directory tree that fall within the date range.
+    """
+    files = []
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if not filename.endswith(".log.gz"):
+                continue
+            match = LOG_FILE_DATE_PATTERN.search(filename)
+            if match:
+                day = datetime.datetime.strptime(match.group(1), "%Y%m%d").date()
+                if (start and day < start) or (end and day > end):
+                    continue
+            files.append(os.path.join(root, filename))
+    return sorted(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize Keycloak ALB access logs")
+    parser.add_argument("source", help="s3://bucket/prefix or a local directory")
+    parser.add_argument(
+        "--start", type=datetime.date.fromisoformat, help="First day (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--end",
+        type=datetime.date.fromisoformat,
+        help="Last day (YYYY-MM-DD, default: today for S3)",
+    )
+    parser.add_argument(
+        "--account-id", help="Account of the load balancer (default: current)"
+    )
+    parser.add_argument(
+        "--region", help="Region of the load balancer (default: current)"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    if args.source.startswith("s3://"):
+        end = args.end or datetime.date.today()
+        start = args.start or end
+        files = list_s3_files(args.source, start, end, args.account_id, args.region)
+    else:
+        files = list_local_files(args.source, args.start, args.end)
+
+    if not files:
+        print(f"No log files found in {args.source}")
+        return 1
+    print(f"Processing {len(files)} log file(s) with {args.processes} process(es)...")
+
+    total = defaultdict(new_stats)
+    unparsed = 0
+    with ProcessPoolExecutor(max_workers=args.processes) as executor:
+        futures = [executor.submit(process_file, source) for source in files]
+        for i, future in enumerate(as_completed(futures), 1):
+            stats, file_unparsed = future.result()
+            merge_stats(total, stats)
+            unparsed += file_unparsed
+            if i % 100 == 0:
+                print(f"  {i}/{len(files)} files processed")
+
+    rows = [
+        {
+            "realm": realm,
+            "endpoint": endpoint,
+            "status": status,
+            "count": entry["count"],
+            **{timing: percentiles(entry[timing]) for timing in TIMINGS},
+        }
+        for (realm, endpoint, status), entry in total.items()
+    ]
+    rows.sort(key=lambda row: row["count"], reverse=True)
+
+    print(
+        f"\n{'realm':<16} {'endpoint':<14} {'status':<6} {'count':>10}  "
+        + "  ".join(f"{'target p' + str(p):>11}" for p in PERCENTILES)
+    )
+    for row in rows:
+        target = row["target_processing_time"]
+        print(
+            f"{row['realm']:<16} {row['endpoint']:<14} {row['status']:<6} {row['count']:>10}  "
+            + "  ".join(
+                f"{target[f'p{p}']:>9.1f}ms" if target[f"p{p}"] is not None else f"{'-':>11}"
+                for p in PERCENTILES
+            )
+        )
+    if unparsed:
+        print(f"\n{unparsed} line(s) could not be parsed")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"files": len(files), "unparsed": unparsed, "rows": rows}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
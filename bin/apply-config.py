@@ -2,10 +2,23 @@
 
 """
 This script invokes a Lambda function to apply ECS configuration changes, waits for the ECS task
-to finish, and fetches its logs from CloudWatch Logs.
+to finish, and fetches its logs from CloudWatch Logs. The task logs as JSON, which is used
+to print a summary of how long the import of each realm file took.
+
+When the task imports the realm files concurrently (CONFIG_CLI__IMPORT_CONCURRENCY, see
+keycloak-config-cli/import-realms.sh), each log line is tagged with its file, and the
+summary also lists the exit code of each file. The script fails if any file failed.
+
+The realm configuration published by the latest deployment is applied, unless a
+configVersion (see the ConfigVersion stack output) is given to re-apply an earlier one.
+
+Only one config task runs per stage at a time. If a task with the same configuration is
+already running, the script waits on that task instead of starting another one. Otherwise
+a single follow-up run is queued (shared by all requests made in the meantime, using the
+latest configuration) and the script waits for it to start and finish.
 
 Usage:
-    python apply_config.py <lambdaArn> <configEnvironmentJson>
+    python apply_config.py <lambdaArn> [configEnvironmentJson] [configVersion]
 
 Example:
     python apply_config.py arn:aws:lambda:us-east-1:123456789012:function:applyConfig '{"key":"value"}'
@@ -13,20 +26,46 @@ Example:
 
 import sys
 import json
+import os
+import re
 import time
 import traceback
 import boto3
 
 
-def main(lambda_arn: str, config_env_json: str):
+CONFIG_CONTAINER_NAME = "ConfigContainer"
+# How long to wait for a queued run to start
+RUN_START_TIMEOUT_SECONDS = 2 * 60 * 60
+
+IMPORT_FILE_PATTERN = re.compile(r"Importing file '([^']+)'")
+REALM_PATTERN = re.compile(r"realm '([^']+)'")
+# Logged by import-realms.sh when the import of a file has finished
+IMPORT_RESULT_PATTERN = re.compile(
+    r"Import of file '([^']+)' finished with exit code (\d+)"
+)
+
+
+def main(lambda_arn: str, config_env_json: str, config_version: str = None):
     # Default exit code is None, which we'll interpret as 0 if no errors occur.
     exit_code = None
 
     try:
-        # 1) Invoke the Lambda function
-        response_payload = invoke_lambda(lambda_arn, config_env_json)
-
-        # Response should contain { "taskArn": "...", "clusterArn": "..." }
+        # 1) Invoke the Lambda function, which starts, joins or queues a run
+        environment = json.loads(config_env_json)
+        if config_version:
+            environment["CONFIG_VERSION"] = config_version
+        response_payload = invoke_lambda(
+            lambda_arn, {"action": "apply", "environment": environment}
+        )
+        if response_payload.get("joined"):
+            print(f"Joining config run {response_payload['runId']} already in progress")
+        elif response_payload.get("queued"):
+            print(
+                f"Another config run is in progress, queued run {response_payload['runId']}"
+            )
+
+        # Response should eventually contain { "taskArn": "...", "clusterArn": "..." }
+        response_payload = wait_for_run_start(lambda_arn, response_payload)
         task_arn = response_payload.get("taskArn")
         cluster_arn = response_payload.get("clusterArn")
         if not task_arn or not cluster_arn:
@@ -40,14 +79,22 @@ def main(lambda_arn: str, config_env_json: str):
         while True:
             attempts += 1
             task = poll_ecs_task(ecs_client, task_arn, cluster_arn)
-            containers = task.get("containers", [])
-            if containers:
-                exit_code = containers[0].get("exitCode")
+            containers = {c.get("name"): c for c in task.get("containers", [])}
+            if CONFIG_CONTAINER_NAME in containers:
+                exit_code = containers[CONFIG_CONTAINER_NAME].get("exitCode")
                 print(f"Task exit code: {exit_code}")
             else:
                 print("No container found in task; cannot retrieve exit code.")
                 exit_code = None
 
+            # The config container never starts if the configuration could not be synced
+            for name, container in containers.items():
+                if container.get("exitCode") not in (None, 0) or container.get("reason"):
+                    print(
+                        f"Container {name} exited with {container.get('exitCode')}: "
+                        f"{container.get('reason', 'no reason given')}"
+                    )
+
             # If we have an exit code, stop checking
             if exit_code is not None:
                 break
@@ -72,12 +119,24 @@ def main(lambda_arn: str, config_env_json: str):
         # 4) Retrieve CloudWatch logs
         task_id = task_arn.split("/")[-1]
         log_stream_name = f"{log_stream_prefix}/{container_name}/{task_id}"
-        logs = fetch_cloudwatch_logs(log_group, log_stream_name, region)
+        logs = parse_log_events(
+            fetch_cloudwatch_logs(log_group, log_stream_name, region)
+        )
 
         # Print the logs to stdout
         print("Task output:\n" + "-" * 100)
-        for line in logs:
-            print(line)
+        for entry in logs:
+            level = f"{entry['level']:<5} " if entry["level"] else ""
+            file = f"[{entry['import_file']}] " if entry["import_file"] else ""
+            print(level + file + entry["message"])
+
+        timings = summarize_import_timings(logs)
+        print_import_timings(timings)
+
+        failed = [t["file"] for t in timings if t["exit_code"] not in (None, 0)]
+        if failed:
+            print(f"Failed realm imports: {', '.join(failed)}")
+            return exit_code or 1
 
         return exit_code or 0
 
@@ -87,7 +146,7 @@ def main(lambda_arn: str, config_env_json: str):
         return 1
 
 
-def invoke_lambda(lambda_arn, env_json):
+def invoke_lambda(lambda_arn, payload):
     """
     Invokes the specified Lambda function with the JSON payload.
     Returns the parsed JSON response from Lambda.
@@ -96,11 +155,32 @@ def invoke_lambda(lambda_arn, env_json):
     response = lambda_client.invoke(
         FunctionName=lambda_arn,
         InvocationType="RequestResponse",
-        Payload=env_json.encode("utf-8"),
+        Payload=json.dumps(payload).encode("utf-8"),
     )
 
-    payload = response["Payload"].read()
-    return json.loads(payload.decode("utf-8") or "{}")
+    result = json.loads(response["Payload"].read().decode("utf-8") or "{}")
+    if response.get("FunctionError"):
+        raise RuntimeError(f"Lambda failed: {result.get('errorMessage', result)}")
+    return result
+
+
+def wait_for_run_start(lambda_arn, run):
+    """
+    Polls the Lambda until the task of a queued (or starting) run has been started.
+    Returns the run, including its taskArn and clusterArn.
+    """
+    deadline = time.monotonic() + RUN_START_TIMEOUT_SECONDS
+    while not run.get("taskArn"):
+        if run.get("unknown"):
+            raise RuntimeError(f"Config run {run['runId']} is no longer queued")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Config run {run['runId']} did not start in time")
+
+        print(f"Waiting for config run {run['runId']} to start...")
+        time.sleep(15)
+        run = invoke_lambda(lambda_arn, {"action": "status", "runId": run["runId"]})
+
+    return run
 
 
 def poll_ecs_task(ecs_client, task_arn, cluster_arn):
@@ -138,7 +218,10 @@ def get_log_config(ecs_client, task_definition_arn):
         print("No container definitions found in task definition.")
         return None
 
-    container_def = container_defs[0]
+    container_def = next(
+        (c for c in container_defs if c.get("name") == CONFIG_CONTAINER_NAME),
+        container_defs[0],
+    )
     log_config = container_def.get("logConfiguration")
     if not log_config or log_config.get("logDriver") != "awslogs":
         print("Log driver is not 'awslogs'. Cannot fetch logs.")
@@ -180,20 +263,150 @@ def fetch_cloudwatch_logs(log_group, log_stream_name, region):
 
         next_token = new_token
 
-    # Return just the messages
-    return [event.get("message", "") for event in all_events]
+    return all_events
+
+
+def parse_log_events(events):
+    """
+    Parses the JSON log lines written by keycloak-config-cli, keeping any other lines as is.
+    Returns a list of dicts with timestamp (in ms), level, message and import_file keys,
+    the latter being None unless the files are imported concurrently.
+    """
+    entries = []
+    for event in events:
+        line = event.get("message", "")
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+
+        if isinstance(record, dict):
+            message = record.get("message", "")
+            if record.get("stack_trace"):
+                message += "\n" + record["stack_trace"]
+            entries.append(
+                {
+                    "timestamp": event.get("timestamp", 0),
+                    "level": record.get("level", ""),
+                    "message": message,
+                    "import_file": record.get("import_file") or None,
+                }
+            )
+        else:
+            entries.append(
+                {
+                    "timestamp": event.get("timestamp", 0),
+                    "level": "",
+                    "message": line,
+                    "import_file": None,
+                }
+            )
+    return entries
+
+
+def summarize_import_timings(entries):
+    """
+    Splits the log into the import of each realm file. Lines tagged with their file
+    (concurrent imports) are grouped by that file, otherwise the files are taken to be
+    imported one after the other, as keycloak-config-cli does.
+    Returns a list of dicts with file, realm, start and end (in ms), seconds, warnings,
+    errors and exit_code keys, the exit code being None unless imported concurrently.
+    """
+    imports = {}
+    current = None
+    concurrent = False
+    for entry in entries:
+        if entry["import_file"]:
+            concurrent = True
+            current = imports.get(entry["import_file"])
+            if current is None:
+                current = imports[entry["import_file"]] = new_import(
+                    entry["import_file"], entry["timestamp"]
+                )
+        elif concurrent:
+            # Untagged lines, e.g. of the JVM, cannot be attributed to a file
+            continue
+        else:
+            match = IMPORT_FILE_PATTERN.search(entry["message"])
+            if match:
+                if current:
+                    current["end"] = entry["timestamp"]
+                file = os.path.basename(match.group(1))
+                current = imports[file] = new_import(file, entry["timestamp"])
+                continue
+
+        if not current:
+            continue
+        current["end"] = entry["timestamp"]
+        result_match = IMPORT_RESULT_PATTERN.search(entry["message"])
+        if result_match:
+            current["exit_code"] = int(result_match.group(2))
+            continue
+        if current["realm"] is None:
+            realm_match = REALM_PATTERN.search(entry["message"])
+            if realm_match:
+                current["realm"] = realm_match.group(1)
+        if entry["level"] in ("WARN", "WARNING"):
+            current["warnings"] += 1
+        elif entry["level"] == "ERROR":
+            current["errors"] += 1
+
+    return [
+        {
+            **i,
+            "realm": i["realm"] or "-",
+            "seconds": (i["end"] - i["start"]) / 1000,
+        }
+        for i in imports.values()
+    ]
+
+
+def new_import(file, timestamp):
+    return {
+        "file": file,
+        "realm": None,
+        "start": timestamp,
+        "end": timestamp,
+        "warnings": 0,
+        "errors": 0,
+        "exit_code": None,
+    }
+
+
+def print_import_timings(timings):
+    if not timings:
+        return
+
+    print("-" * 100 + "\nImport timings:")
+    print(
+        f"  {'file':<24} {'realm':<16} {'seconds':>8} {'warnings':>9} {'errors':>7} "
+        f"{'exit code':>10}"
+    )
+    for timing in timings:
+        exit_code = "-" if timing["exit_code"] is None else timing["exit_code"]
+        print(
+            f"  {timing['file']:<24} {timing['realm']:<16} {timing['seconds']:>8.1f} "
+            f"{timing['warnings']:>9} {timing['errors']:>7} {exit_code:>10}"
+        )
+    # Wall time, which is less than the sum of the files when imported concurrently
+    elapsed = (max(t["end"] for t in timings) - min(t["start"] for t in timings)) / 1000
+    print(f"  {'elapsed':<24} {'':<16} {elapsed:>8.1f}")
 
 
 if __name__ == "__main__":
     # Parse command-line arguments
     if len(sys.argv) < 2:
-        print("Usage: python apply_config.py <lambdaArn> [configEnvironmentJson]")
+        print(
+            "Usage: python apply_config.py <lambdaArn> [configEnvironmentJson] [configVersion]"
+        )
         sys.exit(1)
 
     lambda_arn = sys.argv[1]
     assert lambda_arn, f"Must provide valid Lambda ARN, got {lambda_arn=}"
     config_env_json = sys.argv[2] if len(sys.argv) > 2 else "{}"
+    config_version = sys.argv[3] if len(sys.argv) > 3 else None
 
     print(f"{lambda_arn=}")
     print(f"{config_env_json=}")
-    sys.exit(main(lambda_arn, config_env_json))
+    print(f"{config_version=}")
+    sys.exit(main(lambda_arn, config_env_json, config_version))
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+"""
+This script load tests the HTTP server of Keycloak, e.g. of the docker-compose stack, to
+compare settings of its worker pool, idle timeout and response compression (see
+KeycloakHttpSettings in cdk/lib/settings.py).
+
+Each worker keeps a single connection alive and repeatedly requests the discovery
+document, the signing keys, a token (password grant of the admin-cli client, with the
+KEYCLOAK_USER and KEYCLOAK_PASSWORD credentials) and the userinfo of that token.
+Responses are requested with "Accept-Encoding: gzip". For each endpoint, the report
+records the latency percentiles, the errors, the bytes received and how many responses
+were compressed. For all requests, it records how often a kept-alive connection was
+closed by the server and had to be reopened.
+
+With --pause, each worker idles between rounds of requests. A pause longer than the
+idle timeout of Keycloak (HTTP_IDLE_TIMEOUT_SECONDS in docker-compose.yaml) shows the
+server closing idle connections, which behind the load balancer must only happen after
+the load balancer's idle timeout.
+
+Usage:
+    python http-benchmark.py [--url URL] [--realm REALM] [--concurrency N] [--duration SECONDS] [--pause SECONDS] [--output FILE]
+
+Example:
+    docker compose up -d keycloak
+    python http-benchmark.py --concurrency 50 --duration 60 --output http.json
+    HTTP_COMPRESSION_ENABLED=false docker compose up -d --build keycloak
+    python http-benchmark.py --concurrency 50 --duration 60 --output http-uncompressed.json
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+
+
+class Worker(threading.Thread):
+    """
+    Sends rounds of requests over one kept-alive connection until the deadline.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        realm: str,
+        username: str,
+        password: str,
+        deadline: float,
+        pause: float,
+    ):
+        super().__init__(daemon=True)
+        parsed = urllib.parse.urlparse(url)
+        self.connection_class = (
+            http.client.HTTPSConnection
+            if parsed.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.netloc = parsed.netloc
+        self.base_path = f"{parsed.path.rstrip('/')}/realms/{realm}"
+        self.credentials = urllib.parse.urlencode(
+            {
+                "grant_type": "password",
+                "client_id": "admin-cli",
+                "username": username,
+                "password": password,
+                "scope": "openid",
+            }
+        ).encode("utf-8")
+        self.deadline = deadline
+        self.pause = pause
+        self.connection = None
+        self.connections_opened = 0
+        self.reconnects = 0
+        # Per endpoint: latencies (ms), bytes received, compressed responses and errors
+        self.results = {}
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            self.request("discovery", "GET", "/.well-known/openid-configuration")
+            self.request("certs", "GET", "/protocol/openid-connect/certs")
+            token = self.request(
+                "token",
+                "POST",
+                "/protocol/openid-connect/token",
+                body=self.credentials,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+            if token:
+                self.request(
+                    "userinfo",
+                    "GET",
+                    "/protocol/openid-connect/userinfo",
+                    headers={"Authorization": f"Bearer {token['access_token']}"},
+                )
+            if self.pause:
+                time.sleep(self.pause)
+        if self.connection:
+            self.connection.close()
+
+    def request(
+        self,
+        endpoint: str,
+        method: str,
+        path: str,
+        body: bytes = None,
+        headers: dict = None,
+    ):
+        """
+        Sends a request, reopening the connection once if the server closed it while
+        idle. Returns the decoded JSON body of successful responses.
+        """
+        result = self.results.setdefault(
+            endpoint, {"latencies": [], "bytes": 0, "compressed": 0, "errors": {}}
+        )
+        headers = {"Accept-Encoding": "gzip", **(headers or {})}
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=30)
+                self.connections_opened += 1
+            start = time.perf_counter()
+            try:
+                self.connection.request(
+                    method, self.base_path + path, body=body, headers=headers
+                )
+                response = self.connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError) as e:
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    error = type(e).__name__
+                    result["errors"][error] = result["errors"].get(error, 0) + 1
+                    return None
+                # A kept-alive connection closed by the server
+                self.reconnects += 1
+                continue
+
+            result["latencies"].append((time.perf_counter() - start) * 1000)
+            result["bytes"] += len(data)
+            if response.getheader("Content-Encoding") == "gzip":
+                result["compressed"] += 1
+                data = gzip.decompress(data)
+            if response.getheader("Connection", "").lower() == "close":
+                self.connection.close()
+                self.connection = None
+            if response.status >= 400:
+                error = f"HTTP {response.status}"
+                result["errors"][error] = result["errors"].get(error, 0) + 1
+                return None
+            return json.loads(data) if data else None
+
+
+def percentile(values: list[float], p: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(p) - 1]
+
+
+def summarize(workers: list[Worker], seconds: float) -> dict:
+    endpoints = {}
+    for worker in workers:
+        for endpoint, result in worker.results.items():
+            total = endpoints.setdefault(
+                endpoint, {"latencies": [], "bytes": 0, "compressed": 0, "errors": {}}
+            )
+            total["latencies"] += result["latencies"]
+            total["bytes"] += result["bytes"]
+            total["compressed"] += result["compressed"]
+            for error, count in result["errors"].items():
+                total["errors"][error] = total["errors"].get(error, 0) + count
+
+    report = {"seconds": round(seconds, 1), "endpoints": {}}
+    for endpoint, total in endpoints.items():
+        latencies = total["latencies"]
+        report["endpoints"][endpoint] = {
+            "requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "avg_bytes": round(total["bytes"] / len(latencies)) if latencies else 0,
+            "compressed": total["compressed"],
+            "errors": total["errors"],
+        }
+    requests = sum(e["requests"] for e in report["endpoints"].values())
+    report["requests"] = requests
+    report["requests_per_second"] = round(requests / seconds, 1) if seconds else 0
+    report["connections_opened"] = sum(w.connections_opened for w in workers)
+    report["reconnects"] = sum(w.reconnects for w in workers)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test Keycloak's HTTP server over kept-alive connections"
+    )
+    parser.add_argument(
+        "--url",
+        default=os.environ.get("KEYCLOAK_URL", "http://localhost:8080"),
+        help="Keycloak URL (default: KEYCLOAK_URL or http://localhost:8080)",
+    )
+    parser.add_argument("--realm", default="master", help="Realm of the requests")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent connections")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run for")
+    parser.add_argument(
+        "--pause", type=float, default=0, help="Seconds each worker idles between rounds"
+    )
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    workers = [
+        Worker(
+            args.url,
+            args.realm,
+            os.environ.get("KEYCLOAK_USER", "admin"),
+            os.environ.get("KEYCLOAK_PASSWORD", "admin"),
+            start + args.duration,
+            args.pause,
+        )
+        for _ in range(args.concurrency)
+    ]
+    print(f"Running {args.concurrency} workers against {args.url} for {args.duration}s...")
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    report = {
+        "url": args.url,
+        "realm": args.realm,
+        "concurrency": args.concurrency,
+        "pause": args.pause,
+        **summarize(workers, time.monotonic() - start),
+    }
+
+    print(
+        f"  {'endpoint':<12} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'avg bytes':>10} {'gzip':>6} {'errors':>7}"
+    )
+    for endpoint, stats in report["endpoints"].items():
+        print(
+            f"  {endpoint:<12} {stats['requests']:>9} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+            f"{stats['p99_ms']:>8} {stats['avg_bytes']:>10} {stats['compressed']:>6} "
+            f"{sum(stats['errors'].values()):>7}"
+        )
+    print(
+        f"{report['requests']} requests in {report['seconds']}s "
+        f"({report['requests_per_second']}/s), {report['connections_opened']} connections "
+        f"opened, {report['reconnects']} closed by the server while idle"
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    errors = sum(sum(e["errors"].values()) for e in report["endpoints"].values())
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
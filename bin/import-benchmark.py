@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+"""
+This script measures how long keycloak-config-cli takes to import each realm file for a
+stage, using the services in docker-compose.yaml, to find which realms dominate the time
+it takes to apply configuration.
+
+Each realm file is imported on its own, first cold (the realm is deleted beforehand,
+except for master which cannot be deleted) and then warm (the realm is already up to
+date). For every import the report records the wall time of the keycloak-config-cli
+container, the run time reported by keycloak-config-cli itself, and the number of admin
+API requests Keycloak served, taken from its HTTP metrics.
+
+Keycloak must already be running, e.g. `docker compose up -d keycloak`. The realms are
+deleted through --url, which defaults to the port docker-compose.yaml publishes Keycloak
+on (KEYCLOAK_URL is ignored) and must be a local address unless --yes is given. Variables used
+by $(env:...) substitutions without a default are set to placeholder values unless they
+are provided in the environment or the .env file read by docker compose.
+
+Usage:
+    python import-benchmark.py <configDir> [--realm FILE ...] [--warm-runs N] [--url URL] [--yes] [--output FILE]
+
+Example:
+    python import-benchmark.py keycloak-config-cli/config/prod --warm-runs 3 --output import.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cdk"))
+
+from keycloak_admin import KeycloakAdminClient, KeycloakAdminError  # noqa: E402
+from lib.utils import load_realm_configs  # noqa: E402
+from lib.validation import ENV_VAR_PATTERN  # noqa: E402
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# Mount point of keycloak-config-cli/config in the keycloak-config-cli service
+CONTAINER_CONFIG_DIR = "/config"
+# Keycloak of docker-compose.yaml, which keycloak-config-cli imports into
+COMPOSE_KEYCLOAK_URL = "http://localhost:8080"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+# e.g. http_server_requests_seconds_count{method="GET",outcome="SUCCESS",status="200",uri="/admin/realms/{realm}"} 3.0
+ADMIN_REQUESTS_PATTERN = re.compile(
+    r'^http_server_requests_seconds_count\{[^}]*uri="/admin/[^"]*"[^}]*\}\s+([0-9.eE+]+)$',
+    re.MULTILINE,
+)
+# e.g. keycloak-config-cli ran in 00:12.345.
+CLI_RUN_TIME_PATTERN = re.compile(r"keycloak-config-cli ran in (\d+):(\d+)\.(\d+)")
+
+
+def count_admin_requests(metrics_url: str) -> int:
+    """
+    Returns the total number of admin API requests served by Keycloak so far.
+    """
+    with urllib.request.urlopen(metrics_url, timeout=10) as response:
+        metrics = response.read().decode("utf-8")
+    return int(sum(float(count) for count in ADMIN_REQUESTS_PATTERN.findall(metrics)))
+
+
+def compose_env_var_names() -> set[str]:
+    """
+    Returns the names of the variables already provided to the keycloak-config-cli
+    service by docker-compose.yaml and the .env file.
+    """
+    with open(os.path.join(ROOT_DIR, "docker-compose.yaml"), "r", encoding="utf-8") as f:
+        compose = yaml.safe_load(f)
+    names = set(compose["services"]["keycloak-config-cli"].get("environment") or {})
+
+    env_file = os.path.join(ROOT_DIR, ".env")
+    if os.path.exists(env_file):
+        with open(env_file, "r", encoding="utf-8") as f:
+            for line in f:
+                name, sep, _ = line.strip().partition("=")
+                if sep and not name.startswith("#"):
+                    names.add(name.removeprefix("export ").strip())
+
+    return names
+
+
+def placeholder_env_vars(config_path: str, provided: set[str]) -> dict[str, str]:
+    """
+    Returns placeholder values for the substitutions without a default in a realm file
+    that are not otherwise provided.
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    return {
+        name: f"benchmark-{name.lower()}"
+        for name, default in ENV_VAR_PATTERN.findall(content)
+        if not default and name not in provided
+    }
+
+
+def run_import(config_path: str, env_vars: dict[str, str], metrics_url: str) -> dict:
+    """
+    Imports a single realm file with the keycloak-config-cli service.
+    Returns the wall time, keycloak-config-cli run time, admin request count and exit code.
+    """
+    container_path = os.path.join(
+        CONTAINER_CONFIG_DIR,
+        os.path.relpath(config_path, os.path.join(ROOT_DIR, "keycloak-config-cli", "config")),
+    )
+    command = ["docker", "compose", "run", "--rm", "--no-deps"]
+    for name, value in {**env_vars, "IMPORT_FILES_LOCATIONS": container_path}.items():
+        command += ["-e", f"{name}={value}"]
+    command.append("keycloak-config-cli")
+
+    requests_before = count_admin_requests(metrics_url)
+    start = time.perf_counter()
+    result = subprocess.run(
+        command, cwd=ROOT_DIR, capture_output=True, text=True, check=False
+    )
+    wall_time = time.perf_counter() - start
+    requests_after = count_admin_requests(metrics_url)
+
+    match = CLI_RUN_TIME_PATTERN.search(result.stdout)
+    cli_time = (
+        int(match.group(1)) * 60 + int(match.group(2)) + int(match.group(3)) / 1000
+        if match
+        else None
+    )
+    if result.returncode != 0:
+        print(result.stdout[-2000:] + result.stderr[-2000:])
+
+    return {
+        "wall_time": wall_time,
+        "cli_time": cli_time,
+        "admin_requests": requests_after - requests_before,
+        "exit_code": result.returncode,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark keycloak-config-cli imports per realm"
+    )
+    parser.add_argument("config_dir", help="Directory containing the realm files")
+    parser.add_argument(
+        "--realm",
+        action="append",
+        dest="realm_files",
+        help="Realm file to benchmark, may be repeated (default: all)",
+    )
+    parser.add_argument(
+        "--warm-runs", type=int, default=1, help="Warm imports per realm (default: 1)"
+    )
+    parser.add_argument(
+        "--metrics-url",
+        default="http://localhost:9000/metrics",
+        help="Keycloak metrics endpoint (default: http://localhost:9000/metrics)",
+    )
+    parser.add_argument(
+        "--url",
+        default=COMPOSE_KEYCLOAK_URL,
+        help=f"Keycloak of the docker compose stack, whose realms are deleted (default: {COMPOSE_KEYCLOAK_URL})",
+    )
+    parser.add_argument(
+        "--yes",
+        action="store_true",
+        help="Delete the realms even if --url is not a local address",
+    )
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    # The cold imports delete every realm but master, never do that to a remote Keycloak
+    # by accident
+    if urllib.parse.urlparse(args.url).hostname not in LOCAL_HOSTS and not args.yes:
+        parser.error(
+            f"--url {args.url} is not a local address, pass --yes to delete its realms"
+        )
+
+    config_dir = os.path.abspath(args.config_dir)
+    realm_configs = load_realm_configs(config_dir)
+    client = KeycloakAdminClient.from_environment(url=args.url)
+    provided_env_vars = compose_env_var_names() | set(os.environ)
+
+    report = {"config_dir": args.config_dir, "realms": {}}
+
+    # Import master first, the other realms may depend on its clients and identity providers
+    filenames = sorted(
+        args.realm_files or realm_configs,
+        key=lambda f: (realm_configs[f].get("realm") != "master", f),
+    )
+    for filename in filenames:
+        realm = realm_configs[filename].get("realm")
+        config_path = os.path.join(config_dir, filename)
+        env_vars = placeholder_env_vars(config_path, provided_env_vars)
+        realm_report = {"realm": realm, "cold": None, "warm": []}
+
+        if realm != "master":
+            try:
+                client.delete(f"/admin/realms/{realm}")
+            except KeycloakAdminError as e:
+                if e.status != 404:
+                    raise
+            realm_report["cold"] = run_import(config_path, env_vars, args.metrics_url)
+            print(f"{filename} cold: {format_run(realm_report['cold'])}")
+
+        for i in range(args.warm_runs):
+            run = run_import(config_path, env_vars, args.metrics_url)
+            realm_report["warm"].append(run)
+            print(f"{filename} warm {i + 1}/{args.warm_runs}: {format_run(run)}")
+
+        report["realms"][filename] = realm_report
+
+    failed = [
+        filename
+        for filename, realm_report in report["realms"].items()
+        for run in [realm_report["cold"], *realm_report["warm"]]
+        if run and run["exit_code"] != 0
+    ]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if failed:
+        print(f"Imports failed for: {', '.join(sorted(set(failed)))}")
+        return 1
+    return 0
+
+
+def format_run(run: dict) -> str:
+    cli_time = f"{run['cli_time']:.1f}s" if run["cli_time"] is not None else "n/a"
+    return (
+        f"{run['wall_time']:.1f}s wall, {cli_time} in keycloak-config-cli, "
+        f"{run['admin_requests']} admin requests, exit code {run['exit_code']}"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
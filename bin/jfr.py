@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+"""
+This script controls Java Flight Recorder in the running Keycloak tasks through ECS Exec,
+to find out which code paths (identity providers, password hashing, database access, ...)
+a task spends its CPU time and allocations on.
+
+Each task keeps a continuous recording with low overhead settings (see ProfilingSettings
+in cdk/lib/settings.py), which `dump` writes to a file in the container and uploads to
+the profiling bucket. `start` starts an additional, more detailed recording for a fixed
+duration, which is dumped and uploaded in the same way by passing its name to `dump`.
+Recordings are uploaded with presigned URLs, so the tasks need no access to the bucket.
+
+The cluster, service and bucket names are the KeycloakClusterName, KeycloakServiceName
+and ProfilingBucketName stack outputs. The AWS CLI and its Session Manager plugin must
+be installed.
+
+Usage:
+    python jfr.py <clusterName> <serviceName> check [--task ID]
+    python jfr.py <clusterName> <serviceName> start [--name NAME] [--settings SETTINGS] [--duration DURATION] [--task ID]
+    python jfr.py <clusterName> <serviceName> dump <bucketName> [--name NAME] [--task ID] [--download DIR]
+
+Example:
+    python jfr.py veda-keycloak-prod-cluster veda-keycloak-prod-service start --duration 10m
+    python jfr.py veda-keycloak-prod-cluster veda-keycloak-prod-service dump my-profiling-bucket --name on-demand --download ./recordings
+"""
+
+import argparse
+import datetime
+import os
+import subprocess
+import sys
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+CONTAINER_NAME = "keycloak"
+JFR_CONTROL = "java -jar /opt/keycloak/tools/jfr-control.jar"
+# Name of the recording started by JAVA_OPTS_APPEND in the task definition
+CONTINUOUS_RECORDING = "continuous"
+PRESIGNED_URL_EXPIRY_SECONDS = 3600
+
+
+def list_tasks(cluster: str, service: str, task_id: str = None) -> list[str]:
+    """
+    Returns the ARNs of the running tasks of the service, or of a single task.
+    """
+    ecs_client = boto3.client("ecs")
+    task_arns = []
+    for page in ecs_client.get_paginator("list_tasks").paginate(
+        cluster=cluster, serviceName=service, desiredStatus="RUNNING"
+    ):
+        task_arns += page["taskArns"]
+
+    if task_id:
+        task_arns = [arn for arn in task_arns if arn.split("/")[-1] == task_id]
+    return task_arns
+
+
+def execute(cluster: str, task_arn: str, command: str) -> int:
+    """
+    Runs a command in the Keycloak container of a task with ECS Exec.
+    Returns the exit code of the AWS CLI.
+    """
+    return subprocess.run(
+        [
+            "aws",
+            "ecs",
+            "execute-command",
+            "--cluster",
+            cluster,
+            "--task",
+            task_arn,
+            "--container",
+            CONTAINER_NAME,
+            "--interactive",
+            "--command",
+            command,
+        ],
+        check=False,
+    ).returncode
+
+
+def is_uploaded(s3_client, bucket: str, key: str) -> bool:
+    """
+    Returns whether a recording was uploaded. The exit code of ECS Exec does not reflect
+    the exit code of the command run in the container, so the upload is checked in S3.
+    """
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            return False
+        raise
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Control Java Flight Recorder in the Keycloak tasks"
+    )
+    parser.add_argument("cluster", help="Name of the Keycloak ECS cluster")
+    parser.add_argument("service", help="Name of the Keycloak ECS service")
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    task = argparse.ArgumentParser(add_help=False)
+    task.add_argument("--task", help="ID of a single task (default: all running tasks)")
+
+    actions.add_parser("check", parents=[task], help="List the recordings of each task")
+
+    start = actions.add_parser(
+        "start", parents=[task], help="Start a recording for a fixed duration"
+    )
+    start.add_argument("--name", default="on-demand", help="Recording name (default: on-demand)")
+    start.add_argument(
+        "--settings",
+        default="profile",
+        help="JFR settings, 'default' or the more detailed 'profile' (default: profile)",
+    )
+    start.add_argument("--duration", default="5m", help="Recording duration (default: 5m)")
+
+    dump = actions.add_parser(
+        "dump", parents=[task], help="Dump a recording and upload it to S3"
+    )
+    dump.add_argument("bucket", help="Name of the profiling bucket")
+    dump.add_argument(
+        "--name",
+        default=CONTINUOUS_RECORDING,
+        help=f"Recording name (default: {CONTINUOUS_RECORDING})",
+    )
+    dump.add_argument("--download", help="Download the uploaded recordings to this directory")
+    args = parser.parse_args()
+
+    task_arns = list_tasks(args.cluster, args.service, args.task)
+    if not task_arns:
+        print(f"No running tasks found for service {args.service}")
+        return 1
+
+    s3_client = boto3.client("s3", config=Config(signature_version="s3v4"))
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    failed = []
+    uploaded = []
+
+    for task_arn in task_arns:
+        task_id = task_arn.split("/")[-1]
+        print(f"Task {task_id}:")
+
+        if args.action == "check":
+            command = f"{JFR_CONTROL} check"
+        elif args.action == "start":
+            command = (
+                f"{JFR_CONTROL} start {args.name} {args.settings} {args.duration} "
+                f"/tmp/{args.name}.jfr"
+            )
+        else:
+            key = f"{args.service}/{task_id}/{args.name}-{timestamp}.jfr"
+            url = s3_client.generate_presigned_url(
+                "put_object",
+                Params={"Bucket": args.bucket, "Key": key},
+                ExpiresIn=PRESIGNED_URL_EXPIRY_SECONDS,
+            )
+            # The on-demand recording writes to this file when it ends, see start above
+            filename = (
+                f"/tmp/{args.name}.jfr"
+                if args.name != CONTINUOUS_RECORDING
+                else f"/tmp/{args.name}-{timestamp}.jfr"
+            )
+            command = f"{JFR_CONTROL} dump {args.name} {filename} {url}"
+
+        if execute(args.cluster, task_arn, command) != 0:
+            failed.append(task_id)
+        elif args.action == "dump":
+            if not is_uploaded(s3_client, args.bucket, key):
+                print(f"Recording was not uploaded to s3://{args.bucket}/{key}")
+                failed.append(task_id)
+                continue
+            uploaded.append(key)
+            print(f"Uploaded to s3://{args.bucket}/{key}")
+
+    if args.action == "start" and not failed:
+        print(
+            f"\nRecording '{args.name}' started for {args.duration}, run "
+            f"`dump <bucketName> --name {args.name}` during or after it to upload it"
+        )
+
+    if args.action == "dump" and args.download:
+        os.makedirs(args.download, exist_ok=True)
+        for key in uploaded:
+            path = os.path.join(args.download, key.replace("/", "_"))
+            s3_client.download_file(args.bucket, key, path)
+            print(f"Downloaded {path}")
+
+    if failed:
+        print(f"Command failed for task(s): {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Minimal client for the Keycloak admin REST API, shared by the scripts in this directory.
+
+Credentials are read from the same environment variables used by keycloak-config-cli
+(KEYCLOAK_URL, KEYCLOAK_USER, KEYCLOAK_PASSWORD), which matches the docker-compose
+setup, or from the admin secret created by the stack (see the AdminSecretArn output).
+"""
+
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.parse
+from typing import Any, Optional
+
+# Methods that can be sent again when the connection fails before a response arrives
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+
+
+class KeycloakAdminError(RuntimeError):
+    def __init__(self, method: str, path: str, status: int, body: str):
+        super().__init__(f"{method} {path} failed with HTTP {status}: {body[:500]}")
+        self.status = status
+
+
+class KeycloakAdminClient:
+    """
+    Thin wrapper around the admin REST API. Connections are kept alive and reused,
+    one per thread, and the access token is refreshed transparently.
+    """
+
+    def __init__(self, url: str, username: str, password: str):
+        parsed = urllib.parse.urlparse(url)
+        self.url = url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.request_count = 0
+
+        self._scheme = parsed.scheme
+        self._netloc = parsed.netloc
+        self._base_path = parsed.path.rstrip("/")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._request_count_lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+
+    @classmethod
+    def from_environment(
+        cls, url: Optional[str] = None, admin_secret_arn: Optional[str] = None
+    ) -> "KeycloakAdminClient":
+        """
+        Builds a client from KEYCLOAK_URL/KEYCLOAK_USER/KEYCLOAK_PASSWORD, or from
+        the stack's admin secret in Secrets Manager when an ARN is provided.
+        """
+        url = url or os.environ.get("KEYCLOAK_URL", "http://localhost:8080")
+
+        if admin_secret_arn:
+            import boto3
+
+            secrets_client = boto3.client("secretsmanager")
+            secret = json.loads(
+                secrets_client.get_secret_value(SecretId=admin_secret_arn)["SecretString"]
+            )
+            return cls(url, secret["username"], secret["password"])
+
+        return cls(
+            url,
+            os.environ.get("KEYCLOAK_USER", "admin"),
+            os.environ.get("KEYCLOAK_PASSWORD", "admin"),
+        )
+
+    def get(self, path: str, params: Optional[dict] = None) -> Any:
+        return self.request("GET", path, params=params)
+
+    def post(self, path: str, body: Any = None, params: Optional[dict] = None) -> Any:
+        return self.request("POST", path, body=body, params=params)
+
+    def put(self, path: str, body: Any = None) -> Any:
+        return self.request("PUT", path, body=body)
+
+    def delete(self, path: str) -> Any:
+        return self.request("DELETE", path)
+
+    def create(self, path: str, body: Any) -> str:
+        """
+        Creates an entity, e.g. create("/admin/realms/veda/users", user), and returns
+        its ID, taken from the Location header of the response.
+        """
+        _, headers = self._request("POST", path, body, None)
+        return headers["Location"].rstrip("/").rsplit("/", 1)[-1]
+
+    def paginate(self, path: str, page_size: int = 100, params: Optional[dict] = None):
+        """
+        Yields items from a list endpoint that supports first/max pagination.
+        """
+        first = 0
+        while True:
+            page = self.get(path, params={**(params or {}), "first": first, "max": page_size})
+            yield from page
+            if len(page) < page_size:
+                return
+            first += page_size
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        body: Any = None,
+        params: Optional[dict] = None,
+    ) -> Any:
+        """
+        Sends a request to the admin API, e.g. request("GET", "/admin/realms/veda").
+        Returns the decoded JSON body, or None for empty responses.
+        """
+        data, _ = self._request(method, path, body, params)
+        return json.loads(data) if data else None
+
+    def _request(self, method, path, body, params) -> tuple[bytes, http.client.HTTPMessage]:
+        headers = {
+            "Authorization": f"Bearer {self._get_token()}",
+            "Accept": "application/json",
+        }
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        status, data, response_headers = self._send(method, path, params, payload, headers)
+        if status == 401:
+            # Token may have been revoked or expired early, retry once with a new token
+            headers["Authorization"] = f"Bearer {self._get_token(force=True)}"
+            status, data, response_headers = self._send(
+                method, path, params, payload, headers
+            )
+
+        if status >= 400:
+            raise KeycloakAdminError(method, path, status, data.decode("utf-8", "replace"))
+
+        return data, response_headers
+
+    def _get_token(self, force: bool = False) -> str:
+        with self._lock:
+            if force or not self._token or time.monotonic() >= self._token_expires_at:
+                status, data, _ = self._send(
+                    "POST",
+                    "/realms/master/protocol/openid-connect/token",
+                    None,
+                    urllib.parse.urlencode(
+                        {
+                            "grant_type": "password",
+                            "client_id": "admin-cli",
+                            "username": self.username,
+                            "password": self.password,
+                        }
+                    ).encode("utf-8"),
+                    {"Content-Type": "application/x-www-form-urlencoded"},
+                    # Requesting another token has no side effects
+                    replay=True,
+                )
+                if status != 200:
+                    raise KeycloakAdminError(
+                        "POST", "token", status, data.decode("utf-8", "replace")
+                    )
+                token = json.loads(data)
+                self._token = token["access_token"]
+                # Refresh a little early to avoid racing the expiry
+                self._token_expires_at = time.monotonic() + token["expires_in"] - 10
+            return self._token
+
+    def _send(
+        self, method, path, params, payload, headers, replay: Optional[bool] = None
+    ) -> tuple[int, bytes, http.client.HTTPMessage]:
+        """
+        Sends a request over the connection of the current thread. When the connection
+        fails, idempotent requests (or any request with replay=True) are sent once more
+        over a new connection. Other requests, e.g. creating an entity, may have been
+        processed already and are left to the caller to retry or look up.
+        """
+        url = self._base_path + path
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        if replay is None:
+            replay = method in IDEMPOTENT_METHODS
+
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, url, body=payload, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                with self._request_count_lock:
+                    self.request_count += 1
+                return response.status, data, response.headers
+            except (http.client.HTTPException, ConnectionError):
+                # The server may have closed an idle keep-alive connection
+                connection.close()
+                self._local.connection = None
+                if attempt or not replay:
+                    raise
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection_class = (
+                http.client.HTTPSConnection
+                if self._scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = connection_class(self._netloc, timeout=60)
+            self._local.connection = connection
+        return connection
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+
+"""
+This script compares the realm configuration files for a stage against the live state of a
+Keycloak instance and computes an entity-level changeset (clients, client scopes, roles,
+groups, identity providers, flows, components, users and realm settings).
+
+The changeset is printed as a plan and can optionally be written out as reduced realm
+files that only contain the entities that need to be applied. Those files must be imported
+with keycloak-config-cli's delete behaviour disabled, as entities that are not part of the
+changeset are intentionally absent; the required environment variables are printed along
+with the plan.
+
+Credentials are read from KEYCLOAK_URL, KEYCLOAK_USER and KEYCLOAK_PASSWORD (defaulting to
+the docker-compose Keycloak) or from the stack's admin secret via --admin-secret-arn.
+$(env:...) substitutions in the realm files are resolved from the current environment;
+values that cannot be resolved, and secrets that Keycloak masks, are not compared.
+
+Usage:
+    python realm-diff.py <configDir> [--realm REALM] [--admin-secret-arn ARN] [--output DIR]
+
+Example:
+    KEYCLOAK_URL=http://localhost:8080 python realm-diff.py keycloak-config-cli/config/dev --output /tmp/changes
+"""
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cdk"))
+
+import yaml  # noqa: E402
+
+from keycloak_admin import KeycloakAdminClient, KeycloakAdminError  # noqa: E402
+from lib.utils import load_realm_configs  # noqa: E402
+from lib.validation import ENV_VAR_PATTERN  # noqa: E402
+
+# Value Keycloak returns in place of secrets
+MASKED_VALUE = "**********"
+
+# Server-generated keys that are never part of the desired state
+IGNORED_KEYS = {"id", "containerId", "internalId", "secret", "parentId"}
+
+# Top-level entity collections and the attribute that identifies each entity
+ENTITY_COLLECTIONS = {
+    "clients": "clientId",
+    "clientScopes": "name",
+    "groups": "name",
+    "identityProviders": "alias",
+    "identityProviderMappers": "name",
+    "authenticationFlows": "alias",
+    "authenticatorConfig": "alias",
+    "requiredActions": "alias",
+    "users": "username",
+}
+
+# Attributes used to match items of nested lists, e.g. protocolMappers within a client
+NESTED_ITEM_KEYS = ["clientId", "alias", "name", "clientScope", "username", "authenticator"]
+
+# Nested items Keycloak creates by itself, e.g. the locale mapper of the admin console and
+# the generated realm keys, which are not reported as removals when absent locally
+DEFAULT_ITEMS = {
+    "locale",
+    "rsa-generated",
+    "rsa-enc-generated",
+    "hmac-generated",
+    "hmac-generated-hs512",
+    "aes-generated",
+}
+
+# Prefix of the paths of nested items that only exist live
+REMOVAL_PREFIX = "-"
+
+# keycloak-config-cli settings required to import a partial realm without deleting the
+# entities that were left out of it
+PARTIAL_IMPORT_ENV = {
+    f"IMPORT_MANAGED_{entity}": "no-delete"
+    for entity in [
+        "AUTHENTICATIONFLOW",
+        "CLIENT",
+        "CLIENTSCOPE",
+        "CLIENTSCOPEMAPPING",
+        "COMPONENT",
+        "GROUP",
+        "IDENTITYPROVIDER",
+        "IDENTITYPROVIDERMAPPER",
+        "REQUIREDACTION",
+        "ROLE",
+        "SCOPEMAPPING",
+        "SUBCOMPONENT",
+        "CLIENTAUTHORIZATIONRESOURCES",
+        "CLIENTAUTHORIZATIONPOLICIES",
+        "CLIENTAUTHORIZATIONSCOPES",
+        "MESSAGEBUNDLES",
+    ]
+}
+
+
+@dataclass
+class Change:
+    action: str  # "add" or "update"
+    entity: str  # e.g. "clients", "roles.client.grafana"
+    key: str
+    paths: list[str] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        symbol = "+" if self.action == "add" else "~"
+        detail = f": {', '.join(self.paths)}" if self.paths else ""
+        return f"  {symbol} {self.entity} '{self.key}'{detail}"
+
+
+@dataclass
+class RealmChangeset:
+    realm: str
+    changes: list[Change] = field(default_factory=list)
+    unchanged: int = 0
+    live_only: list[str] = field(default_factory=list)
+    partial: dict = field(default_factory=dict)
+
+
+def substitute_env_vars(data: Any, env: dict[str, str]) -> Any:
+    """
+    Resolves $(env:NAME) and $(env:NAME:-default) substitutions the same way
+    keycloak-config-cli does, leaving unresolvable references untouched.
+    """
+    if isinstance(data, dict):
+        return {key: substitute_env_vars(value, env) for key, value in data.items()}
+    if isinstance(data, list):
+        return [substitute_env_vars(value, env) for value in data]
+    if isinstance(data, str):
+
+        def replace(match):
+            name, default = match.groups()
+            if name in env:
+                return env[name]
+            if default is not None:
+                return default[2:].strip('"')
+            return match.group(0)
+
+        return ENV_VAR_PATTERN.sub(replace, data)
+    return data
+
+
+def normalize(value: Any) -> Any:
+    """
+    Normalizes a value so that semantically equal local and live values compare equal:
+    scalars are compared as strings (Keycloak stores most attributes as strings), JSON
+    documents embedded in strings are parsed, and lists of scalars are order-insensitive.
+    """
+    if isinstance(value, dict):
+        return {
+            key: normalize(item)
+            for key, item in value.items()
+            if key not in IGNORED_KEYS and item != MASKED_VALUE
+        }
+    if isinstance(value, list):
+        items = [normalize(item) for item in value]
+        if all(not isinstance(item, (dict, list)) for item in items):
+            return sorted(items, key=str)
+        return items
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        stripped = value.strip()
+        if stripped[:1] in ("{", "["):
+            try:
+                return normalize(json.loads(stripped))
+            except ValueError:
+                pass
+        return stripped
+    return value
+
+
+def diff_subset(local: Any, live: Any, path: str = "") -> list[str]:
+    """
+    Returns the paths at which the desired (local) value differs from the live value.
+    Keys that are absent locally are left to Keycloak's defaults and are not compared.
+    Keyed list items that only exist live are returned as removals, prefixed with
+    REMOVAL_PREFIX, unless Keycloak creates them by default.
+    """
+    if isinstance(local, str) and ENV_VAR_PATTERN.search(local):
+        # Unresolved substitution, the desired value is unknown
+        return []
+
+    if live is None:
+        return [] if local in (None, "", [], {}) else [path or "."]
+
+    if isinstance(local, dict):
+        if not isinstance(live, dict):
+            return [path or "."]
+        paths = []
+        for key, value in local.items():
+            if key in IGNORED_KEYS or live.get(key) == MASKED_VALUE:
+                continue
+            paths.extend(diff_subset(value, live.get(key), f"{path}.{key}" if path else key))
+        return paths
+
+    if isinstance(local, list) and local and all(isinstance(item, dict) for item in local):
+        if not isinstance(live, list):
+            return [path]
+        key = _item_key(local)
+        if key is None:
+            if len(local) != len(live):
+                return [path]
+            paths = []
+            for index, (local_item, live_item) in enumerate(zip(local, live)):
+                paths.extend(diff_subset(local_item, live_item, f"{path}[{index}]"))
+            return paths
+
+        live_items = {item.get(key): item for item in live if isinstance(item, dict)}
+        paths = []
+        for item in local:
+            paths.extend(
+                diff_subset(item, live_items.pop(item.get(key), None), f"{path}[{item.get(key)}]")
+            )
+        paths.extend(
+            f"{REMOVAL_PREFIX}{path}[{name}]" for name in live_items if name not in DEFAULT_ITEMS
+        )
+        return paths
+
+    return [] if normalize(local) == normalize(live) else [path]
+
+
+def _item_key(items: list[dict]) -> Optional[str]:
+    for key in NESTED_ITEM_KEYS:
+        if all(key in item for item in items):
+            return key
+    return None
+
+
+def export_live_realm(client: KeycloakAdminClient, realm: str, usernames: list[str]) -> Optional[dict]:
+    """
+    Exports the live state of a realm, or returns None if the realm does not exist.
+    Users are not part of the partial export and are fetched individually.
+    """
+    try:
+        live = client.post(
+            f"/admin/realms/{realm}/partial-export",
+            params={"exportClients": "true", "exportGroupsAndRoles": "true"},
+        )
+    except KeycloakAdminError as e:
+        if e.status == 404:
+            return None
+        raise
+
+    # The partial export omits identity provider mappers and required actions
+    live["identityProviderMappers"] = [
+        mapper
+        for provider in live.get("identityProviders", [])
+        for mapper in client.get(
+            f"/admin/realms/{realm}/identity-provider/instances/{provider['alias']}/mappers"
+        )
+    ]
+    live["requiredActions"] = client.get(
+        f"/admin/realms/{realm}/authentication/required-actions"
+    )
+    live["users"] = [
+        user
+        for user in (_export_user(client, realm, username) for username in usernames)
+        if user is not None
+    ]
+    return live
+
+
+def _export_user(client: KeycloakAdminClient, realm: str, username: str) -> Optional[dict]:
+    matches = client.get(
+        f"/admin/realms/{realm}/users", params={"username": username, "exact": "true"}
+    )
+    if not matches:
+        return None
+
+    user = matches[0]
+    mappings = client.get(f"/admin/realms/{realm}/users/{user['id']}/role-mappings")
+    user["realmRoles"] = [
+        role["name"]
+        for role in mappings.get("realmMappings", [])
+        if role["name"] != f"default-roles-{realm}"
+    ]
+    user["clientRoles"] = {
+        client_id: [role["name"] for role in mapping.get("mappings", [])]
+        for client_id, mapping in mappings.get("clientMappings", {}).items()
+    }
+    user["groups"] = [
+        group["path"]
+        for group in client.get(f"/admin/realms/{realm}/users/{user['id']}/groups")
+    ]
+    return user
+
+
+def compute_changeset(
+    local: dict, live: Optional[dict], original: Optional[dict] = None
+) -> RealmChangeset:
+    """
+    Computes the entity-level changes required to bring the live realm in line with the
+    local configuration (with substitutions resolved), along with a partial realm that
+    contains only those entities. The partial realm is built from the original data, if
+    provided, so that resolved secrets are never written out.
+    """
+    original = original if original is not None else local
+    realm = local["realm"]
+    changeset = RealmChangeset(realm=realm)
+    partial = {"realm": realm}
+    changeset.partial = partial
+
+    if live is None:
+        changeset.changes.append(Change("add", "realm", realm))
+        changeset.partial = original
+        return changeset
+
+    # Realm-level settings are compared as a single entity
+    settings = {
+        key: value
+        for key, value in local.items()
+        if key not in ENTITY_COLLECTIONS and key not in ("roles", "clientScopeMappings", "components")
+    }
+    paths = diff_subset(settings, live)
+    if paths:
+        changeset.changes.append(Change("update", "realm", realm, paths))
+        partial.update({key: original[key] for key in settings})
+    else:
+        changeset.unchanged += 1
+
+    for collection, key in ENTITY_COLLECTIONS.items():
+        if collection not in local:
+            continue
+        items = _diff_collection(
+            changeset,
+            collection,
+            key,
+            local.get(collection) or [],
+            live.get(collection) or [],
+            original.get(collection) or [],
+        )
+        if items:
+            partial[collection] = items
+
+    local_roles = local.get("roles") or {}
+    live_roles = live.get("roles") or {}
+    original_roles = original.get("roles") or {}
+    realm_roles = _diff_collection(
+        changeset,
+        "roles.realm",
+        "name",
+        local_roles.get("realm") or [],
+        live_roles.get("realm") or [],
+        original_roles.get("realm") or [],
+    )
+    if realm_roles:
+        partial.setdefault("roles", {})["realm"] = realm_roles
+    for client_id, roles in (local_roles.get("client") or {}).items():
+        client_roles = _diff_collection(
+            changeset,
+            f"roles.client.{client_id}",
+            "name",
+            roles or [],
+            (live_roles.get("client") or {}).get(client_id) or [],
+            (original_roles.get("client") or {}).get(client_id) or [],
+        )
+        if client_roles:
+            partial.setdefault("roles", {}).setdefault("client", {})[client_id] = client_roles
+
+    # Scope mappings are applied per client, so a client's mappings are kept together
+    for client_id, mappings in (local.get("clientScopeMappings") or {}).items():
+        live_mappings = (live.get("clientScopeMappings") or {}).get(client_id)
+        paths = diff_subset(mappings or [], live_mappings or [])
+        if paths:
+            action = "update" if live_mappings else "add"
+            changeset.changes.append(Change(action, "clientScopeMappings", client_id, paths))
+            partial.setdefault("clientScopeMappings", {})[client_id] = original[
+                "clientScopeMappings"
+            ][client_id]
+        else:
+            changeset.unchanged += 1
+
+    for provider_type, components in (local.get("components") or {}).items():
+        live_components = (live.get("components") or {}).get(provider_type) or []
+        paths = diff_subset(components or [], live_components)
+        if paths:
+            changeset.changes.append(Change("update", "components", provider_type, paths))
+            partial.setdefault("components", {})[provider_type] = original["components"][
+                provider_type
+            ]
+        else:
+            changeset.unchanged += 1
+
+    return changeset
+
+
+def _diff_collection(
+    changeset: RealmChangeset,
+    entity: str,
+    key: str,
+    local_items: list,
+    live_items: list,
+    original_items: list,
+) -> list:
+    live_by_key = {item.get(key): item for item in live_items if isinstance(item, dict)}
+    changed = []
+    # Substitution preserves structure, so local and original items line up by index
+    for item, original_item in zip(local_items, original_items):
+        name = item.get(key)
+        live_item = live_by_key.pop(name, None)
+        if live_item is None:
+            changeset.changes.append(Change("add", entity, name))
+            changed.append(original_item)
+            continue
+        paths = diff_subset(item, live_item)
+        if paths:
+            changeset.changes.append(Change("update", entity, name, paths))
+            changed.append(original_item)
+        else:
+            changeset.unchanged += 1
+
+    if entity != "users":
+        changeset.live_only.extend(f"{entity} '{name}'" for name in live_by_key)
+    return changed
+
+
+def main(
+    config_dir: str,
+    realms: list[str],
+    url: Optional[str],
+    admin_secret_arn: Optional[str],
+    output_dir: Optional[str],
+):
+    client = KeycloakAdminClient.from_environment(url, admin_secret_arn)
+    total_changes = 0
+
+    for filename, data in load_realm_configs(config_dir).items():
+        if not data or (realms and data.get("realm") not in realms):
+            continue
+
+        local = substitute_env_vars(data, dict(os.environ))
+        usernames = [user["username"] for user in local.get("users") or []]
+        live = export_live_realm(client, local["realm"], usernames)
+        changeset = compute_changeset(local, live, original=data)
+        total_changes += len(changeset.changes)
+
+        print(
+            f"Realm '{changeset.realm}' ({filename}): {len(changeset.changes)} to apply, "
+            f"{changeset.unchanged} unchanged"
+        )
+        for change in changeset.changes:
+            print(change)
+        for name in changeset.live_only:
+            print(f"  {REMOVAL_PREFIX} {name} exists only in Keycloak (not managed by {filename})")
+        if changeset.live_only or any(
+            path.startswith(REMOVAL_PREFIX) for change in changeset.changes for path in change.paths
+        ):
+            print(
+                f"  Items marked {REMOVAL_PREFIX} are not deleted: the partial import runs with "
+                "IMPORT_MANAGED_*=no-delete"
+            )
+
+        if output_dir and changeset.changes:
+            os.makedirs(output_dir, exist_ok=True)
+            with open(os.path.join(output_dir, filename), "w", encoding="utf-8") as f:
+                yaml.safe_dump(changeset.partial, f, sort_keys=False, allow_unicode=True)
+
+    print(f"{total_changes} change(s) across realm files in {config_dir}")
+    print(f"Admin API requests: {client.request_count}")
+    if output_dir and total_changes:
+        print(f"Partial realm files written to {output_dir}, import them with:")
+        for key, value in PARTIAL_IMPORT_ENV.items():
+            print(f"  {key}={value}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("config_dir", help="Directory of realm files, e.g. keycloak-config-cli/config/dev")
+    parser.add_argument("--realm", action="append", default=[], help="Only diff the given realm(s)")
+    parser.add_argument("--url", help="Keycloak URL, defaults to $KEYCLOAK_URL")
+    parser.add_argument("--admin-secret-arn", help="ARN of the stack's admin secret")
+    parser.add_argument("--output", help="Write partial realm files with only the changed entities")
+    args = parser.parse_args()
+
+    sys.exit(main(args.config_dir, args.realm, args.url, args.admin_secret_arn, args.output))
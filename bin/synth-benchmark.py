@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+"""
+This script measures how long the CDK app takes to synthesize for each stage, and how
+much memory it uses, so that changes to the app's startup can be compared over time.
+
+Each stage is synthesized in a fresh process by running cdk/app.py directly (the same
+command `cdk synth` runs), with STAGE set accordingly and the output written to a
+temporary directory. The reported peak memory covers the Python process and the jsii
+Node.js runtime it starts. With --importtime, the app is also run with
+`python -X importtime` and the slowest imports are included in the report.
+
+All other settings are read from the environment (or the .env file) as usual.
+
+Usage:
+    python synth-benchmark.py [--stage STAGE ...] [--runs N] [--importtime] [--output FILE]
+
+Example:
+    python synth-benchmark.py --stage dev --stage prod --runs 3 --importtime --output synth.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CDK_APP = os.path.join(ROOT_DIR, "cdk", "app.py")
+
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$")
+
+
+def run_synth(stage: str, importtime: bool = False) -> dict:
+    """
+    Synthesizes the app once for a stage.
+    Returns the wall time in seconds, peak RSS in MiB and, optionally, the raw
+    `-X importtime` output.
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command.append(CDK_APP)
+
+    with tempfile.TemporaryDirectory() as outdir:
+        env = {
+            **os.environ,
+            "STAGE": stage,
+            "CDK_OUTDIR": outdir,
+            "JSII_SILENCE_WARNING_DEPRECATED_NODE_VERSION": "1",
+        }
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            command,
+            cwd=ROOT_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        stderr = process.stderr.read()
+        # wait4 reports the resource usage of this child (and the jsii runtime it waited
+        # on) rather than the running maximum over all children
+        _, status, rusage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Synth for stage {stage} failed:\n{stderr[-2000:]}")
+
+    return {
+        "wall_time": elapsed,
+        # ru_maxrss is reported in KiB on Linux and bytes on macOS
+        "peak_rss_mib": rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+        "stderr": stderr,
+    }
+
+
+def parse_importtime(stderr: str, top: int) -> list[dict]:
+    """
+    Parses `python -X importtime` output.
+    Returns the top-level imports with the highest cumulative time, in milliseconds.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append(
+                {
+                    "module": module,
+                    "self_ms": int(self_us) / 1000,
+                    "cumulative_ms": int(cumulative_us) / 1000,
+                    "depth": (len(indent) - 1) // 2,
+                }
+            )
+
+    imports.sort(key=lambda i: i["cumulative_ms"], reverse=True)
+    return imports[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CDK synth per stage")
+    parser.add_argument(
+        "--stage",
+        action="append",
+        dest="stages",
+        help="Stage to synthesize, may be repeated (default: dev and prod)",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=3, help="Synth runs per stage (default: 3)"
+    )
+    parser.add_argument(
+        "--importtime",
+        action="store_true",
+        help="Record the slowest imports with python -X importtime",
+    )
+    parser.add_argument(
+        "--top", type=int, default=20, help="Number of imports to report (default: 20)"
+    )
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "stages": {}}
+
+    for stage in args.stages or ["dev", "prod"]:
+        runs = []
+        for i in range(args.runs):
+            result = run_synth(stage)
+            print(
+                f"{stage} run {i + 1}/{args.runs}: {result['wall_time']:.2f}s, "
+                f"{result['peak_rss_mib']:.0f} MiB peak"
+            )
+            runs.append(result)
+
+        wall_times = [r["wall_time"] for r in runs]
+        stage_report = {
+            "runs": len(runs),
+            "wall_time_median": statistics.median(wall_times),
+            "wall_time_min": min(wall_times),
+            "wall_time_max": max(wall_times),
+            "peak_rss_mib": max(r["peak_rss_mib"] for r in runs),
+        }
+
+        if args.importtime:
+            # Run separately, the instrumentation itself slows down the imports
+            result = run_synth(stage, importtime=True)
+            stage_report["imports"] = parse_importtime(result["stderr"], args.top)
+
+        report["stages"][stage] = stage_report
+
+    for stage, stage_report in report["stages"].items():
+        print(
+            f"\n{stage}: median {stage_report['wall_time_median']:.2f}s "
+            f"(min {stage_report['wall_time_min']:.2f}s, max {stage_report['wall_time_max']:.2f}s), "
+            f"{stage_report['peak_rss_mib']:.0f} MiB peak"
+        )
+        for entry in stage_report.get("imports", []):
+            print(
+                f"  {entry['cumulative_ms']:9.1f} ms  "
+                f"{'  ' * entry['depth']}{entry['module']}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+"""
+This script reports how long the recent tasks of an ECS service or task family took to
+start, to compare task definitions with and without lazy loading (SOCI indexes, see
+LazyLoadingSettings in cdk/lib/settings.py).
+
+For each task it takes the timestamps recorded by ECS: the image pull (pullStartedAt to
+pullStoppedAt) and the time from the task's creation to the RUNNING state. With lazy
+loading the pull only fetches the image manifests and index, and the remaining layers
+are loaded on demand after the container has started. Tasks are grouped by task
+definition revision, and a revision is marked as lazy loaded when all of its asset
+images are tagged with a SOCI index (the "-soci" tag suffix).
+
+ECS only returns stopped tasks for about an hour, so start the tasks to compare shortly
+before running this, e.g. by forcing a new deployment of the service or by applying the
+configuration, once with LAZY_LOADING__KEYCLOAK=false and once without.
+
+The cluster and service names are the KeycloakClusterName and KeycloakServiceName stack
+outputs; the config task is selected with --family and the ConfigTaskDefinitionArn output.
+
+Usage:
+    python task-startup.py <clusterName> (--service NAME | --family FAMILY) [--output FILE]
+
+Example:
+    aws ecs update-service --cluster veda-keycloak-dev-cluster --service veda-keycloak-dev-service --force-new-deployment
+    python task-startup.py veda-keycloak-dev-cluster --service veda-keycloak-dev-service --output startup.json
+    python task-startup.py veda-keycloak-dev-cluster --family $CONFIG_TASK_DEFINITION_ARN
+"""
+
+import argparse
+import json
+import statistics
+import sys
+
+import boto3
+
+# Tag suffix of the images that SociIndexV2Build pushed with a SOCI index
+SOCI_TAG_SUFFIX = "-soci"
+
+
+def list_task_arns(ecs_client, cluster: str, service: str = None, family: str = None) -> list[str]:
+    """
+    Returns the ARNs of the running and recently stopped tasks of a service or family.
+    """
+    filters = {"serviceName": service} if service else {"family": family}
+    task_arns = []
+    for status in ["RUNNING", "STOPPED"]:
+        for page in ecs_client.get_paginator("list_tasks").paginate(
+            cluster=cluster, desiredStatus=status, **filters
+        ):
+            task_arns += page["taskArns"]
+    return task_arns
+
+
+def describe_tasks(ecs_client, cluster: str, task_arns: list[str]) -> list[dict]:
+    tasks = []
+    # DescribeTasks accepts up to 100 tasks per request
+    for i in range(0, len(task_arns), 100):
+        tasks += ecs_client.describe_tasks(cluster=cluster, tasks=task_arns[i : i + 100])[
+            "tasks"
+        ]
+    return tasks
+
+
+def is_lazy_loaded(ecs_client, task_definition_arn: str) -> bool:
+    """
+    Returns whether all images of a task definition that were built from CDK assets
+    have a SOCI index. Public images, e.g. sidecars, are not considered.
+    """
+    containers = ecs_client.describe_task_definition(taskDefinition=task_definition_arn)[
+        "taskDefinition"
+    ]["containerDefinitions"]
+    asset_images = [
+        container["image"]
+        for container in containers
+        if ".dkr.ecr." in container["image"] and "container-assets" in container["image"]
+    ]
+    return bool(asset_images) and all(
+        image.endswith(SOCI_TAG_SUFFIX) for image in asset_images
+    )
+
+
+def startup_times(task: dict) -> dict:
+    """
+    Returns the pull and time to running of a task in seconds, None where ECS did
+    not record the timestamps (e.g. the task failed to start).
+    """
+
+    def seconds(start: str, end: str):
+        if start in task and end in task:
+            return (task[end] - task[start]).total_seconds()
+        return None
+
+    return {
+        "task": task["taskArn"].split("/")[-1],
+        "created_at": task["createdAt"].isoformat(),
+        "pull": seconds("pullStartedAt", "pullStoppedAt"),
+        "to_running": seconds("createdAt", "startedAt"),
+        "stopped_reason": task.get("stoppedReason"),
+    }
+
+
+def summarize(values: list[float]) -> dict:
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "min": round(min(values), 1),
+        "median": round(statistics.median(values), 1),
+        "max": round(max(values), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the image pull and time to running of recent ECS tasks"
+    )
+    parser.add_argument("cluster", help="Name of the ECS cluster")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--service", help="Name of the ECS service")
+    target.add_argument(
+        "--family", help="Task definition family or ARN, e.g. of the config task"
+    )
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    # e.g. arn:aws:ecs:us-west-2:123456789012:task-definition/family:3
+    family = args.family.split("/")[-1].split(":")[0] if args.family else None
+
+    ecs_client = boto3.client("ecs")
+    task_arns = list_task_arns(ecs_client, args.cluster, args.service, family)
+    if not task_arns:
+        print("No running or recently stopped tasks found")
+        return 1
+
+    revisions = {}
+    tasks = describe_tasks(ecs_client, args.cluster, task_arns)
+    for task in sorted(tasks, key=lambda t: t["createdAt"]):
+        revision = revisions.setdefault(
+            task["taskDefinitionArn"],
+            {
+                "lazy_loading": is_lazy_loaded(ecs_client, task["taskDefinitionArn"]),
+                "tasks": [],
+            },
+        )
+        revision["tasks"].append(startup_times(task))
+
+    report = {
+        "cluster": args.cluster,
+        "service": args.service,
+        "family": family,
+        "revisions": {},
+    }
+    for task_definition_arn, revision in revisions.items():
+        name = task_definition_arn.split("/")[-1]
+        revision["pull"] = summarize([t["pull"] for t in revision["tasks"]])
+        revision["to_running"] = summarize([t["to_running"] for t in revision["tasks"]])
+        report["revisions"][name] = revision
+
+        print(
+            f"{name} ({'lazy loading' if revision['lazy_loading'] else 'full pull'}), "
+            f"{len(revision['tasks'])} tasks: pull {format_summary(revision['pull'])}, "
+            f"to running {format_summary(revision['to_running'])}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    return 0
+
+
+def format_summary(summary: dict) -> str:
+    if not summary:
+        return "n/a"
+    return f"{summary['median']}s median ({summary['min']}s - {summary['max']}s)"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
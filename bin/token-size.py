@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+
+"""
+This script estimates the claims and encoded size of the access token Keycloak issues to
+each client, from the realm files of a stage, and flags the clients whose tokens exceed a
+size threshold. Large tokens are sent with every API request, so they add to header
+parsing, cookie and proxy limits, and signature verification in every resource server.
+
+Tokens are estimated for a worst case user who is a member of every group in the realm,
+and therefore holds every role granted to those groups. Claims are built from the
+client's default client scopes (the built-in scopes and the protocol mappers of the
+scopes defined in the realm file) and its own protocol mappers, with placeholder values
+for user attributes. The size of the lightweight access token (see the
+client.use.lightweight.access.token.enabled client attribute) is reported alongside, so
+that the saving of enabling it can be judged before doing so.
+
+Usage:
+    python token-size.py <configDir> [--threshold BYTES] [--top N] [--hostname URL] [--output FILE]
+
+Example:
+    python token-size.py keycloak-config-cli/config/prod --threshold 2048 --top 5
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cdk"))
+
+from lib.utils import LIGHTWEIGHT_ACCESS_TOKEN_ATTRIBUTE, load_realm_configs  # noqa: E402
+
+# {"alg":"RS256","typ":"JWT","kid":"<43 character key id>"}, and an RSA 2048 signature
+HEADER = {"alg": "RS256", "typ": "JWT", "kid": "k" * 43}
+SIGNATURE_BYTES = 256
+
+UUID = "00000000-0000-0000-0000-000000000000"
+TIMESTAMP = 1_700_000_000
+# Placeholder values for a typical user
+USERNAME = "u" * 16
+GIVEN_NAME = "g" * 10
+FAMILY_NAME = "f" * 12
+EMAIL = "e" * 24 + "@example.com"
+ATTRIBUTE_VALUE = "a" * 32
+
+# Keycloak's default realm roles and account client roles, held by every user
+DEFAULT_ACCOUNT_ROLES = ["manage-account", "manage-account-links", "view-profile"]
+
+# Built-in client scopes that are not listed in the scope claim
+SCOPES_NOT_IN_TOKEN_SCOPE = {"acr", "basic", "roles", "web-origins"}
+
+
+def encoded_length(data: dict) -> int:
+    """
+    Returns the length of a dictionary serialized as compact JSON and base64url-encoded
+    without padding, as in a JWT.
+    """
+    return math.ceil(len(json.dumps(data, separators=(",", ":")).encode("utf-8")) * 4 / 3)
+
+
+def token_length(claims: dict) -> int:
+    return encoded_length(HEADER) + 1 + encoded_length(claims) + 1 + math.ceil(
+        SIGNATURE_BYTES * 4 / 3
+    )
+
+
+def group_paths(groups: list, parent: str = "") -> list[tuple[str, dict]]:
+    """
+    Flattens nested groups into (full path, group) pairs.
+    """
+    paths = []
+    for group in groups or []:
+        path = f"{parent}/{group.get('name')}"
+        paths.append((path, group))
+        paths += group_paths(group.get("subGroups"), path)
+    return paths
+
+
+class RealmModel:
+    """
+    The groups and roles of a realm, and the roles held by a member of every group.
+    """
+
+    def __init__(self, data: dict):
+        self.realm = data.get("realm")
+        self.client_scopes = {
+            scope.get("name"): scope for scope in data.get("clientScopes") or []
+        }
+        self.groups = group_paths(data.get("groups"))
+
+        self.realm_roles = [f"default-roles-{self.realm}", "offline_access", "uma_authorization"]
+        self.client_roles: dict[str, list[str]] = {"account": list(DEFAULT_ACCOUNT_ROLES)}
+        for _, group in self.groups:
+            for role in group.get("realmRoles") or []:
+                if role not in self.realm_roles:
+                    self.realm_roles.append(role)
+            for client_id, roles in (group.get("clientRoles") or {}).items():
+                held = self.client_roles.setdefault(client_id, [])
+                held += [role for role in roles if role not in held]
+
+        # (role client or None for realm roles, client or client scope) -> mapped roles
+        self.scope_mappings: dict[tuple, set[str]] = {}
+        for mapping in data.get("scopeMappings") or []:
+            target = mapping.get("client") or mapping.get("clientScope")
+            self.scope_mappings.setdefault((None, target), set()).update(mapping.get("roles") or [])
+        for role_client, mappings in (data.get("clientScopeMappings") or {}).items():
+            for mapping in mappings or []:
+                target = mapping.get("client") or mapping.get("clientScope")
+                self.scope_mappings.setdefault((role_client, target), set()).update(
+                    mapping.get("roles") or []
+                )
+
+    def roles_in_scope(self, client: dict) -> tuple[list[str], dict[str, list[str]]]:
+        """
+        Returns the realm and client roles that end up in the client's tokens. Without
+        fullScopeAllowed, these are limited to the client's own roles and the roles scope
+        mapped to the client or its default client scopes.
+        """
+        if client.get("fullScopeAllowed", True):
+            return self.realm_roles, self.client_roles
+
+        targets = [client.get("clientId")] + list(client.get("defaultClientScopes") or [])
+
+        def mapped(role_client, roles):
+            allowed = set().union(
+                *(self.scope_mappings.get((role_client, target), set()) for target in targets)
+            )
+            return [role for role in roles if role in allowed]
+
+        client_roles = {
+            role_client: roles if role_client == client.get("clientId") else mapped(role_client, roles)
+            for role_client, roles in self.client_roles.items()
+        }
+        return mapped(None, self.realm_roles), {
+            role_client: roles for role_client, roles in client_roles.items() if roles
+        }
+
+
+def set_claim(claims: dict, name: str, value) -> None:
+    """
+    Sets a claim, nesting it for dotted claim names as Keycloak does.
+    """
+    *parents, leaf = [part.replace("\\.", ".") for part in split_claim_name(name)]
+    for parent in parents:
+        claims = claims.setdefault(parent, {})
+    claims[leaf] = value
+
+
+def split_claim_name(name: str) -> list[str]:
+    parts, current, escaped = [], "", False
+    for char in name:
+        if char == "." and not escaped:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+        escaped = char == "\\" and not escaped
+    return parts + [current]
+
+
+def apply_mapper(claims: dict, mapper: dict, realm: RealmModel, client: dict) -> bool:
+    """
+    Adds the access token claim of a protocol mapper to claims.
+    Returns False for mapper types whose value could not be estimated.
+    """
+    config = mapper.get("config") or {}
+    mapper_type = mapper.get("protocolMapper")
+    realm_roles, client_roles = realm.roles_in_scope(client)
+    claim_name = (config.get("claim.name") or mapper.get("name") or "").replace(
+        "${client_id}", client.get("clientId", "")
+    )
+
+    def role_values(roles: list[str], prefix: str) -> list[str]:
+        return [f"{prefix}{role}" for role in roles]
+
+    if mapper_type == "oidc-group-membership-mapper":
+        full_path = config.get("full.path", "true") == "true"
+        set_claim(
+            claims,
+            claim_name,
+            [path if full_path else path.rsplit("/", 1)[-1] for path, _ in realm.groups],
+        )
+    elif mapper_type == "oidc-usermodel-client-role-mapper":
+        client_id = config.get("usermodel.clientRoleMapping.clientId")
+        prefix = config.get("usermodel.clientRoleMapping.rolePrefix") or ""
+        roles = (
+            client_roles.get(client_id, [])
+            if client_id
+            else [role for roles in client_roles.values() for role in roles]
+        )
+        set_claim(claims, claim_name, role_values(roles, prefix))
+    elif mapper_type == "oidc-usermodel-realm-role-mapper":
+        prefix = config.get("usermodel.realmRoleMapping.rolePrefix") or ""
+        set_claim(claims, claim_name, role_values(realm_roles, prefix))
+    elif mapper_type == "oidc-hardcoded-claim-mapper":
+        set_claim(claims, claim_name, config.get("claim.value", ""))
+    elif mapper_type == "oidc-audience-mapper":
+        audience = config.get("included.client.audience") or config.get(
+            "included.custom.audience"
+        )
+        add_audience(claims, audience)
+    elif mapper_type in ("oidc-usermodel-attribute-mapper", "oidc-usermodel-property-mapper"):
+        set_claim(claims, claim_name, ATTRIBUTE_VALUE)
+    else:
+        set_claim(claims, claim_name, ATTRIBUTE_VALUE)
+        return False
+    return True
+
+
+def add_audience(claims: dict, audience: str) -> None:
+    if not audience:
+        return
+    current = claims.get("aud")
+    if current is None:
+        claims["aud"] = audience
+    elif isinstance(current, str):
+        if current != audience:
+            claims["aud"] = [current, audience]
+    elif audience not in current:
+        current.append(audience)
+
+
+def apply_builtin_scope(claims: dict, scope: str, realm: RealmModel, client: dict) -> None:
+    """
+    Adds the claims of the mappers in Keycloak's built-in client scopes.
+    """
+    realm_roles, client_roles = realm.roles_in_scope(client)
+
+    if scope == "basic":
+        claims["auth_time"] = TIMESTAMP
+        claims["sub"] = UUID
+    elif scope == "acr":
+        claims["acr"] = "1"
+    elif scope == "web-origins":
+        claims["allowed-origins"] = list(client.get("webOrigins") or [])
+    elif scope == "profile":
+        claims["name"] = f"{GIVEN_NAME} {FAMILY_NAME}"
+        claims["preferred_username"] = USERNAME
+        claims["given_name"] = GIVEN_NAME
+        claims["family_name"] = FAMILY_NAME
+    elif scope == "email":
+        claims["email_verified"] = True
+        claims["email"] = EMAIL
+    elif scope == "roles":
+        claims["realm_access"] = {"roles": list(realm_roles)}
+        claims["resource_access"] = {
+            client_id: {"roles": roles} for client_id, roles in client_roles.items()
+        }
+        # The audience resolve mapper adds every client the user holds roles of
+        for client_id in client_roles:
+            if client_id != client.get("clientId"):
+                add_audience(claims, client_id)
+    elif scope == "microprofile-jwt":
+        claims["upn"] = USERNAME
+        claims["groups"] = list(realm_roles)
+
+
+def estimate_claims(
+    realm: RealmModel, client: dict, hostname: str, lightweight: bool
+) -> tuple[dict, list[str]]:
+    """
+    Returns the estimated access token claims of a client and the mappers whose values
+    could not be estimated.
+    """
+    client_id = client.get("clientId")
+    scopes = list(client.get("defaultClientScopes") or [])
+
+    # Claims added to every access token, including lightweight ones
+    claims = {
+        "exp": TIMESTAMP,
+        "iat": TIMESTAMP,
+        "auth_time": TIMESTAMP,
+        "jti": UUID,
+        "iss": f"{hostname.rstrip('/')}/realms/{realm.realm}",
+        "sub": UUID,
+        "typ": "Bearer",
+        "azp": client_id,
+        "sid": UUID,
+        "scope": " ".join(
+            ["openid"]
+            + [
+                scope
+                for scope in scopes
+                if scope not in SCOPES_NOT_IN_TOKEN_SCOPE
+                and (realm.client_scopes.get(scope, {}).get("attributes") or {}).get(
+                    "include.in.token.scope", "true"
+                )
+                == "true"
+            ]
+        ),
+    }
+    unestimated = []
+
+    mappers = []
+    for scope in scopes:
+        if scope in realm.client_scopes:
+            mappers += realm.client_scopes[scope].get("protocolMappers") or []
+        elif not lightweight:
+            apply_builtin_scope(claims, scope, realm, client)
+    mappers += client.get("protocolMappers") or []
+
+    for mapper in mappers:
+        config = mapper.get("config") or {}
+        if config.get("access.token.claim") != "true":
+            continue
+        if lightweight and config.get("lightweight.claim") != "true":
+            continue
+        if not apply_mapper(claims, mapper, realm, client):
+            unestimated.append(f"{mapper.get('name')} ({mapper.get('protocolMapper')})")
+
+    return claims, unestimated
+
+
+def claim_sizes(claims: dict) -> dict[str, int]:
+    """
+    Returns the number of JSON bytes each top-level claim adds to the token payload.
+    """
+    return {
+        name: len(json.dumps({name: value}, separators=(",", ":"))) - 1
+        for name, value in claims.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Estimate the access token size of each client"
+    )
+    parser.add_argument("config_dir", help="Directory containing the realm files")
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=4096,
+        help="Flag tokens larger than this many bytes (default: 4096)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=5,
+        help="Number of heaviest clients to break down by claim (default: 5)",
+    )
+    parser.add_argument(
+        "--hostname",
+        default=os.environ.get("HOSTNAME", "https://keycloak.example.com"),
+        help="Keycloak URL used in the iss claim (default: $HOSTNAME)",
+    )
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    rows = []
+    for filename, data in load_realm_configs(args.config_dir).items():
+        realm = RealmModel(data)
+        for client in data.get("clients") or []:
+            if client.get("bearerOnly") or client.get("protocol", "openid-connect") != (
+                "openid-connect"
+            ):
+                continue
+
+            lightweight = (client.get("attributes") or {}).get(
+                LIGHTWEIGHT_ACCESS_TOKEN_ATTRIBUTE
+            ) == "true"
+            claims, unestimated = estimate_claims(realm, client, args.hostname, lightweight)
+            full_claims, _ = estimate_claims(realm, client, args.hostname, False)
+            lightweight_claims, _ = estimate_claims(realm, client, args.hostname, True)
+
+            rows.append(
+                {
+                    "file": filename,
+                    "realm": realm.realm,
+                    "client": client.get("clientId"),
+                    "lightweight": lightweight,
+                    "claims": len(claims),
+                    "size": token_length(claims),
+                    "full_size": token_length(full_claims),
+                    "lightweight_size": token_length(lightweight_claims),
+                    "claim_sizes": claim_sizes(claims),
+                    "unestimated_mappers": unestimated,
+                }
+            )
+
+    rows.sort(key=lambda row: row["size"], reverse=True)
+    flagged = [row for row in rows if row["size"] > args.threshold]
+
+    print(
+        f"{'realm':<12} {'client':<32} {'claims':>6} {'bytes':>7} "
+        f"{'full':>7} {'lightweight':>11}"
+    )
+    for row in rows:
+        print(
+            f"{row['realm']:<12} {row['client']:<32} {row['claims']:>6} {row['size']:>7} "
+            f"{row['full_size']:>7} {row['lightweight_size']:>11}"
+            + (" (lightweight)" if row["lightweight"] else "")
+            + (" !" if row in flagged else "")
+        )
+
+    for row in rows[: args.top]:
+        print(f"\n{row['realm']}/{row['client']}: {row['size']} bytes encoded")
+        for name, size in sorted(
+            row["claim_sizes"].items(), key=lambda item: item[1], reverse=True
+        ):
+            print(f"  {size:>6}  {name}")
+        if row["unestimated_mappers"]:
+            print(f"  Placeholder values used for: {', '.join(row['unestimated_mappers'])}")
+
+    if flagged:
+        print(
+            f"\n{len(flagged)} client(s) exceed {args.threshold} bytes: "
+            + ", ".join(f"{row['realm']}/{row['client']}" for row in flagged)
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"threshold": args.threshold, "clients": rows}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+
+"""
+This script moves users between realms and stages through the admin REST API, e.g. to
+seed a new stage with the users of another or to split a realm.
+
+`export` streams the users of a realm into a newline delimited JSON file, one user
+representation per line, including their group paths, direct realm and client role
+mappings and identity provider links. Pages of users are requested one after another and
+the details of the users within a page concurrently.
+
+`import` creates the users of such a file in a realm, with a bounded number of concurrent
+requests. Throttled and failed requests are retried with exponential backoff; users that
+still fail are written to <file>.failed.ndjson and the import exits with 1. Users whose
+username or email already exists in the realm are skipped. Groups, roles and identity
+providers that do not exist in the target realm are left out and listed in the report,
+as are custom attributes if the target realm's user profile does not allow them.
+
+Both commands record their progress in <file>.checkpoint and continue from it with
+--resume, e.g. after an interruption or once the cause of failed users is fixed. A
+throughput report (users per second, admin requests per user and per-user latency) is
+printed at the end and can be written as JSON with --output. `generate` writes synthetic
+users, e.g. to measure import throughput against the docker-compose Keycloak.
+
+Passwords and other credentials cannot be read through the admin API and are not
+transferred, users that sign in with a password need to reset it in the target realm.
+
+Credentials are read from KEYCLOAK_URL, KEYCLOAK_USER and KEYCLOAK_PASSWORD (defaulting to
+the docker-compose Keycloak) or from the stack's admin secret via --admin-secret-arn.
+
+Usage:
+    python user-transfer.py export <realm> <file> [--page-size N] [--concurrency N] [--resume]
+    python user-transfer.py import <realm> <file> [--concurrency N] [--retries N] [--resume]
+    python user-transfer.py generate <file> [--count N] [--prefix PREFIX]
+
+Example:
+    KEYCLOAK_URL=https://keycloak.example.com python user-transfer.py export veda users.ndjson --admin-secret-arn $ADMIN_SECRET_ARN
+    KEYCLOAK_URL=http://localhost:8080 python user-transfer.py import veda users.ndjson --concurrency 16
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from keycloak_admin import KeycloakAdminClient, KeycloakAdminError
+
+# Statuses of requests worth retrying, throttling and server side errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+BASE_BACKOFF_SECONDS = 0.2
+MAX_BACKOFF_SECONDS = 10.0
+
+# Read-only or server-generated attributes of exported users, not accepted on creation
+READ_ONLY_KEYS = {
+    "id",
+    "access",
+    "createdTimestamp",
+    "disableableCredentialTypes",
+    "federationLink",
+    "notBefore",
+    "origin",
+    "self",
+    "serviceAccountClientId",
+    "totp",
+    "userProfileMetadata",
+}
+
+# Composite role granted to every new user of a realm, e.g. default-roles-veda
+DEFAULT_ROLES_PREFIX = "default-roles-"
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, KeycloakAdminError):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+def backoff(attempt: int):
+    """
+    Sleeps before retrying, with exponential backoff and full jitter.
+    """
+    time.sleep(random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2**attempt)))
+
+
+def with_retries(retries: int, function, *args) -> Any:
+    for attempt in range(retries + 1):
+        try:
+            return function(*args)
+        except (KeycloakAdminError, OSError, http.client.HTTPException) as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+        backoff(attempt)
+
+
+class Throughput:
+    """
+    Counts the users processed by outcome along with their latency, and prints the
+    progress at most once per interval.
+    """
+
+    def __init__(self, client: KeycloakAdminClient, interval: float):
+        self.client = client
+        self.interval = interval
+        self.outcomes: Counter = Counter()
+        self.latencies: list[float] = []
+        # References left out of imported users, e.g. "group /admins", by number of users
+        self.missing: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._last_print = self._start
+        self._requests_at_start = client.request_count
+
+    def record(self, outcome: str, latency: Optional[float] = None):
+        with self._lock:
+            self.outcomes[outcome] += 1
+            if latency is not None:
+                self.latencies.append(latency)
+            now = time.perf_counter()
+            if now - self._last_print >= self.interval:
+                self._last_print = now
+                print(self.summary())
+
+    @property
+    def processed(self) -> int:
+        return len(self.latencies)
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self._start
+        outcomes = ", ".join(f"{count} {outcome}" for outcome, count in sorted(self.outcomes.items()))
+        return f"{elapsed:.0f}s: {outcomes} ({self.processed / elapsed:.1f} users/s)"
+
+    def report(self) -> dict:
+        elapsed = time.perf_counter() - self._start
+        requests = self.client.request_count - self._requests_at_start
+        report = {
+            "users": dict(self.outcomes),
+            "elapsed_seconds": round(elapsed, 3),
+            "users_per_second": round(self.processed / elapsed, 2) if elapsed else None,
+            "admin_requests": requests,
+            "admin_requests_per_user": round(requests / self.processed, 2) if self.processed else None,
+            "latency_ms": None,
+            "missing": self.missing,
+        }
+        if len(self.latencies) >= 2:
+            percentiles = statistics.quantiles(self.latencies, n=100)
+            report["latency_ms"] = {
+                "p50": round(percentiles[49] * 1000, 1),
+                "p95": round(percentiles[94] * 1000, 1),
+                "p99": round(percentiles[98] * 1000, 1),
+                "max": round(max(self.latencies) * 1000, 1),
+            }
+        return report
+
+
+def read_checkpoint(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_done_usernames(path: str) -> set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def write_checkpoint(path: str, checkpoint: dict):
+    # Written to a temporary file first, so that an interruption never leaves it truncated
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(path + ".tmp", path)
+
+
+def export_user(client: KeycloakAdminClient, realm: str, user: dict) -> dict:
+    """
+    Adds the group paths, direct role mappings and identity provider links to a user.
+    """
+    path = f"/admin/realms/{realm}/users/{user['id']}"
+    groups = list(client.paginate(f"{path}/groups", params={"briefRepresentation": "true"}))
+    mappings = client.get(f"{path}/role-mappings")
+    links = client.get(f"{path}/federated-identity")
+    return {
+        **user,
+        "groups": [group["path"] for group in groups],
+        "realmRoles": [role["name"] for role in mappings.get("realmMappings", [])],
+        "clientRoles": {
+            client_id: [role["name"] for role in client_mappings["mappings"]]
+            for client_id, client_mappings in mappings.get("clientMappings", {}).items()
+        },
+        "federatedIdentities": [
+            {key: link[key] for key in ("identityProvider", "userId", "userName")}
+            for link in links
+        ],
+    }
+
+
+def export_users(client: KeycloakAdminClient, args) -> Throughput:
+    checkpoint_path = args.file + ".checkpoint"
+    checkpoint = read_checkpoint(checkpoint_path) if args.resume else None
+    # Offset of the next page, and size of the file once the previous page was written
+    first, size = (checkpoint["first"], checkpoint["bytes"]) if checkpoint else (0, 0)
+    if checkpoint:
+        print(f"Resuming after {first} users")
+
+    throughput = Throughput(client, args.progress_interval)
+
+    def export(user: dict) -> dict:
+        start = time.perf_counter()
+        user = with_retries(args.retries, export_user, client, args.realm, user)
+        throughput.record("exported", time.perf_counter() - start)
+        return user
+
+    with (
+        open(args.file, "ab" if checkpoint else "wb") as f,
+        ThreadPoolExecutor(max_workers=args.concurrency) as executor,
+    ):
+        # Drops users written after the checkpoint, their page is exported again
+        f.truncate(size)
+        while True:
+            page = with_retries(
+                args.retries,
+                client.get,
+                f"/admin/realms/{args.realm}/users",
+                {"briefRepresentation": "false", "first": first, "max": args.page_size},
+            )
+            # Service accounts belong to their client and are created along with it
+            users = [user for user in page if not user.get("serviceAccountClientId")]
+            for user in executor.map(export, users):
+                f.write(json.dumps(user, separators=(",", ":")).encode("utf-8") + b"\n")
+            f.flush()
+
+            first += len(page)
+            write_checkpoint(checkpoint_path, {"first": first, "bytes": f.tell()})
+            if len(page) < args.page_size:
+                break
+
+    return throughput
+
+
+class TargetRealm:
+    """
+    Groups, roles and identity providers of the realm users are imported into, so that
+    references to missing ones can be left out rather than failing the user.
+    """
+
+    def __init__(self, client: KeycloakAdminClient, realm: str):
+        self.client = client
+        self.path = f"/admin/realms/{realm}"
+        self.missing: Counter = Counter()
+
+        self.group_paths = set(self._group_paths(f"{self.path}/groups"))
+        self.realm_roles = {
+            role["name"]: role
+            for role in client.paginate(f"{self.path}/roles", params={"briefRepresentation": "true"})
+        }
+        self.identity_providers = {
+            provider["alias"] for provider in client.get(f"{self.path}/identity-provider/instances")
+        }
+        self.clients = {
+            c["clientId"]: c["id"]
+            for c in client.paginate(f"{self.path}/clients", params={"briefRepresentation": "true"})
+        }
+        self._client_roles: dict[str, dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def _group_paths(self, path: str):
+        for group in self.client.paginate(path, params={"briefRepresentation": "true"}):
+            yield group["path"]
+            # Keycloak 23+ only lists the subgroups of a group through its children
+            if group.get("subGroups"):
+                yield from self._subgroup_paths(group["subGroups"])
+            elif group.get("subGroupCount"):
+                yield from self._group_paths(f"{self.path}/groups/{group['id']}/children")
+
+    def _subgroup_paths(self, groups: list[dict]):
+        for group in groups:
+            yield group["path"]
+            yield from self._subgroup_paths(group.get("subGroups", []))
+
+    def client_roles(self, client_id: str) -> dict[str, dict]:
+        with self._lock:
+            if client_id not in self._client_roles:
+                self._client_roles[client_id] = {
+                    role["name"]: role
+                    for role in self.client.paginate(f"{self.path}/clients/{self.clients[client_id]}/roles")
+                }
+            return self._client_roles[client_id]
+
+    def keep(self, kind: str, name: str, exists: bool) -> bool:
+        if not exists:
+            with self._lock:
+                self.missing[f"{kind} {name}"] += 1
+        return exists
+
+
+def find_user_id(client: KeycloakAdminClient, realm: str, username: str) -> str:
+    users = client.get(
+        f"/admin/realms/{realm}/users",
+        params={"username": username, "exact": "true", "briefRepresentation": "true"},
+    )
+    return users[0]["id"]
+
+
+def import_user(
+    client: KeycloakAdminClient, realm: str, target: TargetRealm, user: dict, retries: int
+) -> str:
+    """
+    Creates a user along with its groups, identity provider links and role mappings.
+    Returns "imported", or "exists" if the username or email is already taken.
+    """
+    representation = {
+        key: value
+        for key, value in user.items()
+        if key not in READ_ONLY_KEYS and key not in ("realmRoles", "clientRoles")
+    }
+    representation["groups"] = [
+        path for path in user.get("groups", []) if target.keep("group", path, path in target.group_paths)
+    ]
+    representation["federatedIdentities"] = [
+        link
+        for link in user.get("federatedIdentities", [])
+        if target.keep(
+            "identity provider",
+            link["identityProvider"],
+            link["identityProvider"] in target.identity_providers,
+        )
+    ]
+
+    path = f"/admin/realms/{realm}/users"
+    for attempt in range(retries + 1):
+        try:
+            user_id = client.create(path, representation)
+            break
+        except (KeycloakAdminError, OSError, http.client.HTTPException) as e:
+            if isinstance(e, KeycloakAdminError) and e.status == 409:
+                if attempt == 0:
+                    return "exists"
+                # An earlier attempt created the user, but its response was lost
+                user_id = with_retries(retries, find_user_id, client, realm, user["username"])
+                break
+            if attempt == retries or not is_retryable(e):
+                raise
+        backoff(attempt)
+
+    # Role mappings are not part of the creation request, adding them again is a no-op
+    realm_roles = [
+        target.realm_roles[name]
+        for name in user.get("realmRoles", [])
+        if not name.startswith(DEFAULT_ROLES_PREFIX)
+        and target.keep("realm role", name, name in target.realm_roles)
+    ]
+    if realm_roles:
+        with_retries(retries, client.post, f"{path}/{user_id}/role-mappings/realm", realm_roles)
+
+    for client_id, names in user.get("clientRoles", {}).items():
+        if not target.keep("client", client_id, client_id in target.clients):
+            continue
+        available = target.client_roles(client_id)
+        roles = [
+            available[name]
+            for name in names
+            if target.keep("client role", f"{client_id}/{name}", name in available)
+        ]
+        if roles:
+            with_retries(
+                retries,
+                client.post,
+                f"{path}/{user_id}/role-mappings/clients/{target.clients[client_id]}",
+                roles,
+            )
+
+    return "imported"
+
+
+def import_users(client: KeycloakAdminClient, args) -> Throughput:
+    checkpoint_path = args.file + ".checkpoint"
+    failed_path = args.file + ".failed.ndjson"
+    # Usernames of the users imported or skipped by previous runs, one per line
+    done = read_done_usernames(checkpoint_path) if args.resume else set()
+    if done:
+        print(f"Resuming after {len(done)} users")
+
+    target = TargetRealm(client, args.realm)
+    throughput = Throughput(client, args.progress_interval)
+    failed_count = 0
+
+    def run(user: dict) -> tuple[str, float]:
+        start = time.perf_counter()
+        outcome = import_user(client, args.realm, target, user, args.retries)
+        return outcome, time.perf_counter() - start
+
+    def collect(futures: dict, return_when: str):
+        nonlocal failed_count
+        finished, _ = wait(futures, return_when=return_when)
+        for future in finished:
+            line, username = futures.pop(future)
+            try:
+                outcome, latency = future.result()
+            except Exception as e:
+                print(f"{username}: {e}", file=sys.stderr)
+                failed.write(line)
+                failed_count += 1
+                throughput.record("failed")
+                continue
+            checkpoint.write(username + "\n")
+            throughput.record(outcome, latency)
+        checkpoint.flush()
+
+    with (
+        open(args.file, "r", encoding="utf-8") as f,
+        open(checkpoint_path, "a" if args.resume else "w", encoding="utf-8") as checkpoint,
+        open(failed_path, "w", encoding="utf-8") as failed,
+        ThreadPoolExecutor(max_workers=args.concurrency) as executor,
+    ):
+        futures: dict = {}
+        for line in f:
+            if not line.strip():
+                continue
+            user = json.loads(line)
+            if user["username"] in done:
+                throughput.record("resumed")
+                continue
+            # Bounds the users read ahead of the requests in flight
+            if len(futures) >= args.concurrency * 2:
+                collect(futures, FIRST_COMPLETED)
+            futures[executor.submit(run, user)] = (line, user["username"])
+        while futures:
+            collect(futures, FIRST_COMPLETED)
+
+    if failed_count:
+        print(f"{failed_count} users failed, written to {failed_path}")
+    else:
+        os.remove(failed_path)
+    if target.missing:
+        print("Left out, missing in the target realm:")
+        for reference, count in target.missing.most_common():
+            print(f"  {reference} ({count} users)")
+
+    throughput.missing = dict(target.missing)
+    return throughput
+
+
+def generate_users(args) -> int:
+    with open(args.file, "w", encoding="utf-8") as f:
+        for i in range(args.count):
+            username = f"{args.prefix}{i:06d}"
+            user = {
+                "username": username,
+                "email": f"{username}@example.com",
+                "emailVerified": True,
+                "enabled": True,
+                "firstName": "Transfer",
+                "lastName": f"Test {i}",
+            }
+            f.write(json.dumps(user, separators=(",", ":")) + "\n")
+    print(f"Wrote {args.count} users to {args.file}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export and import the users of a realm through the admin API"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    transfer = argparse.ArgumentParser(add_help=False)
+    transfer.add_argument("realm", help="Name of the realm")
+    transfer.add_argument("file", help="Newline delimited JSON file of users")
+    transfer.add_argument("--url", help="Keycloak URL, defaults to $KEYCLOAK_URL")
+    transfer.add_argument("--admin-secret-arn", help="ARN of the stack's admin secret")
+    transfer.add_argument(
+        "--concurrency", type=int, default=8, help="Concurrent users in flight (default: 8)"
+    )
+    transfer.add_argument(
+        "--retries",
+        type=int,
+        default=5,
+        help="Retries of throttled and failed requests (default: 5)",
+    )
+    transfer.add_argument(
+        "--resume", action="store_true", help="Continue from the checkpoint of a previous run"
+    )
+    transfer.add_argument(
+        "--progress-interval",
+        type=float,
+        default=10,
+        help="Seconds between progress reports (default: 10)",
+    )
+    transfer.add_argument("--output", help="Write the throughput report as JSON to this file")
+
+    export = commands.add_parser("export", parents=[transfer], help="Export the users of a realm")
+    export.add_argument(
+        "--page-size", type=int, default=100, help="Users requested per page (default: 100)"
+    )
+    commands.add_parser("import", parents=[transfer], help="Import users into a realm")
+
+    generate = commands.add_parser("generate", help="Write synthetic users to import")
+    generate.add_argument("file", help="Newline delimited JSON file to write")
+    generate.add_argument("--count", type=int, default=1000, help="Number of users (default: 1000)")
+    generate.add_argument(
+        "--prefix", default="transfer-test-", help="Username prefix (default: transfer-test-)"
+    )
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        return generate_users(args)
+
+    client = KeycloakAdminClient.from_environment(args.url, args.admin_secret_arn)
+    if args.command == "export":
+        throughput = export_users(client, args)
+    else:
+        throughput = import_users(client, args)
+
+    print(throughput.summary())
+    report = {
+        "command": args.command,
+        "realm": args.realm,
+        "file": args.file,
+        "concurrency": args.concurrency,
+        **throughput.report(),
+    }
+    print(
+        f"{report['admin_requests']} admin requests "
+        f"({report['admin_requests_per_user']} per user), latency {report['latency_ms']}"
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    return 1 if throughput.outcomes["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+"""
+This script validates the keycloak-config-cli realm configuration for a stage before it is
+deployed, catching typos, unresolvable $(env:...) substitutions, duplicate clientIds and
+unknown client scopes without waiting on the Lambda and ECS task used by apply-config.py.
+
+Client secret environment variables are derived from the realm files and from the
+IDP_SECRET_ARN_* environment variables, in the same way as the CDK app. Any other
+variables must be provided in the configEnvironmentJson, which takes the same form as
+the one passed to apply-config.py.
+
+Usage:
+    python validate-config.py <configDir> [configEnvironmentJson]
+
+Example:
+    python validate-config.py keycloak-config-cli/config/dev '{"GRAFANA_CLIENT_URL":"https://example.com"}'
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cdk"))
+
+from lib.utils import load_realm_configs  # noqa: E402
+from lib.validation import get_client_secret_env_vars, validate_realm_configs  # noqa: E402
+
+
+def main(config_dir: str, config_env_json: str):
+    start = time.perf_counter()
+
+    realm_configs = load_realm_configs(config_dir)
+    available_env_vars = get_client_secret_env_vars(realm_configs) | set(
+        json.loads(config_env_json).keys()
+    )
+    result = validate_realm_configs(realm_configs, available_env_vars)
+
+    for warning in result.warnings:
+        print(f"WARNING: {warning}")
+    for error in result.errors:
+        print(f"ERROR: {error}")
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Validated {len(realm_configs)} realm file(s) in {config_dir} in {elapsed:.3f}s: "
+        f"{len(result.errors)} error(s), {len(result.warnings)} warning(s)"
+    )
+    return 0 if result.ok else 1
+
+
+if __name__ == "__main__":
+    # Parse command-line arguments
+    if len(sys.argv) < 2:
+        print("Usage: python validate-config.py <configDir> [configEnvironmentJson]")
+        sys.exit(1)
+
+    config_dir = sys.argv[1]
+    config_env_json = sys.argv[2] if len(sys.argv) > 2 else "{}"
+    sys.exit(main(config_dir, config_env_json))
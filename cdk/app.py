@@ -2,14 +2,7 @@
 import os
 import logging
 
-from aws_cdk import (
-    App,
-    DefaultStackSynthesizer,
-    PermissionsBoundary,
-)
-
-from lib.keycloak import KeycloakStack
-from lib.utils import get_oauth_secrets, get_private_client_ids, get_send_email_addresses, get_application_role_arns
+from lib.utils import DeploymentEnvironment, get_private_client_ids
 from lib.settings import Settings
 
 logging.basicConfig(
@@ -19,8 +12,10 @@ logging.basicConfig(
 env_file = os.environ.get("ENV_FILE", ".env")
 settings = Settings(_env_file=env_file)
 
-logging.info("Extracting ARNs of IdP secrets from environment...")
-idp_oauth_client_secrets = get_oauth_secrets()
+logging.info("Extracting IdP secrets, send email addresses and role ARNs from environment...")
+deployment_env = DeploymentEnvironment.from_environ()
+
+idp_oauth_client_secrets = deployment_env.idp_oauth_client_secrets
 if idp_oauth_client_secrets:
     logging.info(
         "Found IdP client secrets in environment: %s",
@@ -43,8 +38,8 @@ else:
         "No private client IDs found in %s",
         settings.keycloak_config_cli_config_dir,
     )
-    
-send_email_addresses = get_send_email_addresses()
+
+send_email_addresses = deployment_env.send_email_addresses
 if send_email_addresses:
     logging.info(
         "Found send email addresses in environment: %s",
@@ -53,7 +48,7 @@ if send_email_addresses:
 else:
     logging.warning("No send email addresses found in the environment.")
 
-application_role_arns = get_application_role_arns()
+application_role_arns = deployment_env.application_role_arns
 if application_role_arns:
     logging.info(
         "Found application role ARNs in environment: %s",
@@ -62,6 +57,12 @@ if application_role_arns:
 else:
     logging.warning("No application role ARNs found in the environment.")
 
+# Importing aws_cdk starts the jsii runtime and accounts for most of the startup time, so
+# it is deferred until the settings and configuration above have been read successfully
+from aws_cdk import App, DefaultStackSynthesizer, PermissionsBoundary  # noqa: E402
+
+from lib.keycloak import KeycloakStack  # noqa: E402
+
 app = App()
 
 # Optionally set a custom synthesizer if CDK_BOOTSTRAP_QUALIFIER is present
@@ -99,6 +100,18 @@ KeycloakStack(
     is_production=settings.is_production,
     stage=settings.stage,
     rds_snapshot_identifier=settings.rds_snapshot_identifier,
+    cdn_certificate_arn=settings.cdn_certificate_arn,
+    keycloak_cache=settings.keycloak_cache,
+    keycloak_http=settings.keycloak_http,
+    waf=settings.waf,
+    architecture=settings.architecture,
+    lazy_loading=settings.lazy_loading,
+    config_cli=settings.config_cli,
+    logging_settings=settings.logging,
+    profiling_settings=settings.profiling,
+    tracing_settings=settings.tracing,
+    email_settings=settings.email,
+    db_maintenance=settings.db_maintenance,
     # Stack Configuration
     env={
         "account": settings.aws_account_id,
@@ -0,0 +1,34 @@
+from aws_cdk import (
+    aws_ecr_assets as ecr_assets,
+    aws_ecs as ecs,
+)
+
+from lib.settings import Architecture
+
+IMAGE_PLATFORMS = {
+    "amd64": ecr_assets.Platform.LINUX_AMD64,
+    "arm64": ecr_assets.Platform.LINUX_ARM64,
+}
+
+CPU_ARCHITECTURES = {
+    "amd64": ecs.CpuArchitecture.X86_64,
+    "arm64": ecs.CpuArchitecture.ARM64,
+}
+
+
+def image_platform(architecture: Architecture) -> ecr_assets.Platform:
+    """
+    Returns the platform to build a container image asset for.
+    """
+    return IMAGE_PLATFORMS[architecture]
+
+
+def runtime_platform(architecture: Architecture) -> ecs.RuntimePlatform:
+    """
+    Returns the Fargate runtime platform for tasks running an image built with
+    image_platform() for the same architecture.
+    """
+    return ecs.RuntimePlatform(
+        cpu_architecture=CPU_ARCHITECTURES[architecture],
+        operating_system_family=ecs.OperatingSystemFamily.LINUX,
+    )
@@ -0,0 +1,41 @@
+from aws_cdk import (
+    aws_ecr_assets as ecr_assets,
+    aws_ecs as ecs,
+)
+from constructs import Construct
+from deploy_time_build import SociIndexV2Build
+
+from lib.architecture import image_platform
+from lib.settings import Architecture
+
+
+def asset_image(
+    scope: Construct,
+    construct_id: str,
+    *,
+    directory: str,
+    architecture: Architecture,
+    lazy_loading: bool = True,
+    **options,
+) -> ecs.ContainerImage:
+    """
+    Returns a container image built from a directory as a CDK asset, with further
+    options (build_args, exclude, ...) passed to the asset. With lazy loading, a SOCI
+    index is built for the pushed image at deploy time and the tasks run the image
+    tagged with it, so Fargate starts the container before all layers are pulled.
+    """
+    if not lazy_loading:
+        return ecs.ContainerImage.from_asset(
+            directory=directory, platform=image_platform(architecture), **options
+        )
+
+    asset = ecr_assets.DockerImageAsset(
+        scope,
+        construct_id,
+        directory=directory,
+        platform=image_platform(architecture),
+        **options,
+    )
+    return SociIndexV2Build.from_docker_image_asset(
+        scope, f"{construct_id}SociIndex", asset
+    ).to_ecs_docker_image_code()
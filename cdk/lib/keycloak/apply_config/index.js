@@ -0,0 +1,340 @@
+// Starts keycloak-config-cli tasks with single-flight semantics per stage.
+//
+// A lock item in DynamoDB (keyed by stage) tracks the run in progress. A request with
+// the same inputs as the run in progress joins it, any other request queues a single
+// follow-up run, which the latest request replaces the inputs of. The follow-up is
+// started when the ECS task of the current run stops (see the EventBridge rule in
+// KeycloakConfig), or when a caller notices that it has stopped.
+//
+// Events:
+//   { action: "apply", environment: {...} } -> { runId, taskArn?, clusterArn?, joined?, queued? }
+//   { action: "status", runId }             -> { runId, taskArn?, clusterArn?, starting?, queued?, unknown? }
+//   ECS Task State Change (STOPPED)         -> starts the queued follow-up, if any
+
+const crypto = require('crypto');
+const {
+  ECSClient,
+  DescribeTasksCommand,
+  RunTaskCommand,
+} = require('@aws-sdk/client-ecs');
+const {
+  DynamoDBClient,
+  DeleteItemCommand,
+  GetItemCommand,
+  PutItemCommand,
+  UpdateItemCommand,
+} = require('@aws-sdk/client-dynamodb');
+
+const ecsClient = new ECSClient({});
+const dynamodbClient = new DynamoDBClient({});
+
+const {
+  TABLE_NAME,
+  STAGE,
+  CLUSTER,
+  TASK_DEFINITION,
+  CONTAINER_NAME,
+  SYNC_CONTAINER_NAME,
+  SUBNETS,
+  SECURITY_GROUPS,
+  CONFIG_VERSION,
+} = process.env;
+
+// A run that has not started its task within this time is considered abandoned
+const START_TIMEOUT_SECONDS = 300;
+// Upper bound on the lease of a running task, in case its stopped event is lost
+const RUN_TIMEOUT_SECONDS = 6 * 60 * 60;
+const MAX_ATTEMPTS = 5;
+
+exports.handler = async function (event) {
+  console.log('Received event:', JSON.stringify(event));
+
+  if (event.source === 'aws.ecs') {
+    return onTaskStopped(event.detail.taskArn);
+  }
+  if (event.action === 'status') {
+    return getRunStatus(event.runId);
+  }
+  // Events without an action are treated as the task environment
+  return apply(event.action === 'apply' ? event.environment || {} : event);
+};
+
+async function apply(environment) {
+  // Apply the configuration published by the latest deployment unless a specific
+  // version is requested
+  const request = { CONFIG_VERSION, ...environment };
+  const requestHash = hashRequest(request);
+
+  for (let attempt = 0; attempt < MAX_ATTEMPTS; attempt++) {
+    const runId = crypto.randomUUID();
+    if (await tryAcquire(runId, requestHash)) {
+      console.log(`Acquired lock for stage ${STAGE}, starting run ${runId}`);
+      return startRun(runId, request);
+    }
+
+    const current = await getLock();
+    if (!current) {
+      continue; // Released in the meantime
+    }
+    if (await isFinished(current)) {
+      await onRunFinished(current);
+      continue;
+    }
+    if (current.requestHash === requestHash) {
+      console.log(`Joining run ${current.runId}`);
+      return { ...runStatus(current), joined: true };
+    }
+
+    const queuedRunId = current.queuedRunId || runId;
+    if (await tryQueue(current, queuedRunId, request)) {
+      console.log(`Queued run ${queuedRunId} after run ${current.runId}`);
+      return { runId: queuedRunId, queued: true };
+    }
+  }
+
+  throw new Error(`Could not start, join or queue a config run for stage ${STAGE}`);
+}
+
+async function getRunStatus(runId) {
+  let current = await getLock();
+
+  // Start the follow-up if the run before it stopped without us being notified
+  if (current && current.queuedRunId === runId && (await isFinished(current))) {
+    await onRunFinished(current);
+    current = await getLock();
+  }
+
+  if (current && current.runId === runId) {
+    return current.taskArn ? runStatus(current) : { runId, starting: true };
+  }
+  if (current && current.queuedRunId === runId) {
+    return { runId, queued: true };
+  }
+  return { runId, unknown: true };
+}
+
+async function onTaskStopped(taskArn) {
+  const current = await getLock();
+  if (current && current.taskArn === taskArn) {
+    await onRunFinished(current);
+  }
+}
+
+async function onRunFinished(current) {
+  if (!current.queuedRunId) {
+    console.log(`Run ${current.runId} finished, releasing lock`);
+    const released = await conditional(
+      new DeleteItemCommand({
+        TableName: TABLE_NAME,
+        Key: { stage: { S: STAGE } },
+        ConditionExpression: 'runId = :runId AND attribute_not_exists(queuedRunId)',
+        ExpressionAttributeValues: { ':runId': { S: current.runId } },
+      })
+    );
+    if (!released) {
+      await retryRunFinished(current);
+    }
+    return;
+  }
+
+  // Promote the queued follow-up, only one caller succeeds. The condition on the queued
+  // request makes sure a request that replaced it in the meantime is not lost.
+  const request = JSON.parse(current.queuedRequest);
+  const promoted = await conditional(
+    new UpdateItemCommand({
+      TableName: TABLE_NAME,
+      Key: { stage: { S: STAGE } },
+      UpdateExpression:
+        'SET runId = :queuedRunId, requestHash = :requestHash, expiresAt = :expiresAt ' +
+        'REMOVE taskArn, clusterArn, queuedRunId, queuedRequest',
+      ConditionExpression: 'runId = :runId AND queuedRequest = :queuedRequest',
+      ExpressionAttributeValues: {
+        ':runId': { S: current.runId },
+        ':queuedRunId': { S: current.queuedRunId },
+        ':queuedRequest': { S: current.queuedRequest },
+        ':requestHash': { S: hashRequest(request) },
+        ':expiresAt': { N: String(now() + START_TIMEOUT_SECONDS) },
+      },
+    })
+  );
+  if (promoted) {
+    console.log(`Run ${current.runId} finished, starting queued run ${current.queuedRunId}`);
+    await startRun(current.queuedRunId, request);
+  } else {
+    await retryRunFinished(current);
+  }
+}
+
+// Handles the finished run again when a follow-up was queued or replaced while it was
+// being released, unless another caller has already moved on to the next run
+async function retryRunFinished(current) {
+  const latest = await getLock();
+  if (latest && latest.runId === current.runId) {
+    await onRunFinished(latest);
+  }
+}
+
+async function startRun(runId, request) {
+  const environment = Object.entries(request).map(([name, value]) => ({
+    name,
+    value: String(value),
+  }));
+
+  let task;
+  try {
+    const result = await ecsClient.send(
+      new RunTaskCommand({
+        cluster: CLUSTER,
+        taskDefinition: TASK_DEFINITION,
+        launchType: 'FARGATE',
+        overrides: {
+          // The sync container only needs the configuration version. The overrides
+          // of a task are limited to 8192 characters, so the request is not repeated
+          containerOverrides: [
+            { name: CONTAINER_NAME, environment },
+            {
+              name: SYNC_CONTAINER_NAME,
+              environment: [{ name: 'CONFIG_VERSION', value: String(request.CONFIG_VERSION) }],
+            },
+          ],
+        },
+        networkConfiguration: {
+          awsvpcConfiguration: {
+            subnets: SUBNETS.split(','),
+            securityGroups: SECURITY_GROUPS.split(','),
+            assignPublicIp: 'ENABLED',
+          },
+        },
+      })
+    );
+    console.log('ECS RunTask result:', result);
+    if (!result.tasks || !result.tasks.length) {
+      throw new Error(JSON.stringify(result.failures));
+    }
+    task = result.tasks[0];
+  } catch (error) {
+    console.error('Error running ECS task:', error);
+    // Release the failed run only, a follow-up queued behind it is started instead
+    const current = await getLock();
+    if (current && current.runId === runId) {
+      await onRunFinished(current);
+    }
+    throw new Error('Failed to start ECS task');
+  }
+
+  // The lock may have been taken over if the task took longer than the start timeout
+  // to be started
+  const recorded = await conditional(
+    new UpdateItemCommand({
+      TableName: TABLE_NAME,
+      Key: { stage: { S: STAGE } },
+      UpdateExpression:
+        'SET taskArn = :taskArn, clusterArn = :clusterArn, expiresAt = :expiresAt',
+      ConditionExpression: 'runId = :runId',
+      ExpressionAttributeValues: {
+        ':runId': { S: runId },
+        ':taskArn': { S: task.taskArn },
+        ':clusterArn': { S: task.clusterArn },
+        ':expiresAt': { N: String(now() + RUN_TIMEOUT_SECONDS) },
+      },
+    })
+  );
+  if (!recorded) {
+    console.warn(`Lock for stage ${STAGE} no longer held by run ${runId}, task ${task.taskArn} is not tracked`);
+  }
+  return { runId, taskArn: task.taskArn, clusterArn: task.clusterArn };
+}
+
+async function tryAcquire(runId, requestHash) {
+  return conditional(
+    new PutItemCommand({
+      TableName: TABLE_NAME,
+      Item: {
+        stage: { S: STAGE },
+        runId: { S: runId },
+        requestHash: { S: requestHash },
+        expiresAt: { N: String(now() + START_TIMEOUT_SECONDS) },
+      },
+      ConditionExpression: 'attribute_not_exists(stage) OR expiresAt < :now',
+      ExpressionAttributeValues: { ':now': { N: String(now()) } },
+    })
+  );
+}
+
+async function tryQueue(current, queuedRunId, request) {
+  return conditional(
+    new UpdateItemCommand({
+      TableName: TABLE_NAME,
+      Key: { stage: { S: STAGE } },
+      UpdateExpression: 'SET queuedRunId = :queuedRunId, queuedRequest = :queuedRequest',
+      ConditionExpression: 'runId = :runId',
+      ExpressionAttributeValues: {
+        ':runId': { S: current.runId },
+        ':queuedRunId': { S: queuedRunId },
+        ':queuedRequest': { S: JSON.stringify(request) },
+      },
+    })
+  );
+}
+
+async function isFinished(current) {
+  if (!current.taskArn) {
+    return current.expiresAt < now();
+  }
+  const result = await ecsClient.send(
+    new DescribeTasksCommand({ cluster: current.clusterArn, tasks: [current.taskArn] })
+  );
+  const task = (result.tasks || [])[0];
+  return !task || task.lastStatus === 'STOPPED';
+}
+
+async function getLock() {
+  const result = await dynamodbClient.send(
+    new GetItemCommand({
+      TableName: TABLE_NAME,
+      Key: { stage: { S: STAGE } },
+      ConsistentRead: true,
+    })
+  );
+  if (!result.Item) {
+    return null;
+  }
+  return Object.fromEntries(
+    Object.entries(result.Item).map(([key, value]) => [
+      key,
+      value.N !== undefined ? Number(value.N) : value.S,
+    ])
+  );
+}
+
+function runStatus(current) {
+  return {
+    runId: current.runId,
+    taskArn: current.taskArn,
+    clusterArn: current.clusterArn,
+  };
+}
+
+// Returns false instead of throwing when a condition expression fails
+async function conditional(command) {
+  try {
+    await dynamodbClient.send(command);
+    return true;
+  } catch (error) {
+    if (error.name === 'ConditionalCheckFailedException') {
+      return false;
+    }
+    throw error;
+  }
+}
+
+function hashRequest(request) {
+  const sorted = Object.keys(request)
+    .sort()
+    .map((key) => [key, String(request[key])]);
+  return crypto.createHash('sha256').update(JSON.stringify(sorted)).digest('hex');
+}
+
+function now() {
+  return Math.floor(Date.now() / 1000);
+}
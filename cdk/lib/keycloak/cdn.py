@@ -0,0 +1,189 @@
+import re
+
+from constructs import Construct
+from aws_cdk import (
+    Duration,
+    CfnOutput,
+    aws_certificatemanager as acm,
+    aws_cloudfront as cloudfront,
+    aws_cloudfront_origins as origins,
+    aws_ec2 as ec2,
+    aws_elasticloadbalancingv2 as elbv2,
+    custom_resources as cr,
+)
+
+# AWS-managed prefix list of the CloudFront servers that connect to origins
+ORIGIN_FACING_PREFIX_LIST = "com.amazonaws.global.cloudfront.origin-facing"
+# Header holding the viewer's IP address, set by CloudFront on every request. Unlike
+# X-Forwarded-For, whose first address is whatever the client sent, it cannot be spoofed.
+VIEWER_IP_HEADER = "X-Viewer-Ip"
+
+
+class KeycloakCdn(Construct):
+    """
+    CloudFront distribution in front of the Keycloak load balancer. OIDC discovery
+    documents, JWKS and theme resources are cached at the edge; everything else
+    (authorization, token, userinfo, admin, etc) is passed through uncached. The load
+    balancer only accepts connections from CloudFront, so the CDN cannot be bypassed.
+    """
+
+    distribution: cloudfront.Distribution
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        hostname: str,
+        alb: elbv2.IApplicationLoadBalancer,
+        certificate_arn: str,
+        discovery_ttl: Duration = Duration.hours(1),
+        jwks_ttl: Duration = Duration.minutes(5),
+        resources_ttl: Duration = Duration.days(1),
+    ) -> None:
+        """
+        :param scope: Construct scope
+        :param construct_id: Identifier for this construct
+        :param hostname: The Keycloak hostname, used as the distribution alias
+        :param alb: The load balancer serving Keycloak, whose listener must not be open
+            to all addresses
+        :param certificate_arn: ARN of an ACM certificate in us-east-1 for the hostname
+        :param discovery_ttl: How long to cache .well-known documents
+        :param jwks_ttl: How long to cache the realm signing keys. Keep this short,
+            clients will not see rotated keys until the cached copy expires
+        :param resources_ttl: Default TTL for theme and static resources
+        """
+        super().__init__(scope, construct_id)
+
+        # Remove the protocol (http:// or https://) if present
+        domain_name = re.sub(r"(^\w+:|^)//", "", hostname)
+
+        # The ALB certificate is issued for the Keycloak hostname rather than the ALB's
+        # DNS name, so the Host header is always forwarded for the TLS handshake with
+        # the origin to succeed (and for Keycloak to generate the correct URLs)
+        origin = origins.LoadBalancerV2Origin(
+            alb,
+            protocol_policy=cloudfront.OriginProtocolPolicy.HTTPS_ONLY,
+        )
+
+        viewer_ip_function = cloudfront.Function(
+            self,
+            "ViewerIpFunction",
+            comment="Sets the viewer IP header, replacing any value sent by the client",
+            runtime=cloudfront.FunctionRuntime.JS_2_0,
+            code=cloudfront.FunctionCode.from_inline(
+                "function handler(event) {\n"
+                f"  event.request.headers['{VIEWER_IP_HEADER.lower()}'] = "
+                "{ value: event.viewer.ip };\n"
+                "  return event.request;\n"
+                "}\n"
+            ),
+        )
+        function_associations = [
+            cloudfront.FunctionAssociation(
+                function=viewer_ip_function,
+                event_type=cloudfront.FunctionEventType.VIEWER_REQUEST,
+            )
+        ]
+        # Forwards the viewer IP on cache misses, without adding it to the cache key
+        viewer_ip_request_policy = cloudfront.OriginRequestPolicy(
+            self,
+            "ViewerIpOriginRequestPolicy",
+            comment="Keycloak viewer IP",
+            header_behavior=cloudfront.OriginRequestHeaderBehavior.allow_list(
+                VIEWER_IP_HEADER
+            ),
+        )
+
+        def cached_behavior(name: str, ttl: Duration, honor_origin: bool):
+            cache_policy = cloudfront.CachePolicy(
+                self,
+                f"{name}CachePolicy",
+                comment=f"Keycloak {name} responses",
+                # Keycloak marks discovery and JWKS responses as no-cache, so the TTL is
+                # enforced as a minimum for those. Resources are versioned by Keycloak and
+                # already carry long-lived Cache-Control headers that we honor.
+                min_ttl=Duration.seconds(0) if honor_origin else ttl,
+                default_ttl=ttl,
+                max_ttl=Duration.days(30) if honor_origin else ttl,
+                # Keycloak only adds CORS headers to responses of requests with an
+                # Origin, so the cached copy is kept per Origin
+                header_behavior=cloudfront.CacheHeaderBehavior.allow_list(
+                    "Host", "Origin"
+                ),
+                query_string_behavior=cloudfront.CacheQueryStringBehavior.none(),
+                cookie_behavior=cloudfront.CacheCookieBehavior.none(),
+                enable_accept_encoding_gzip=True,
+                enable_accept_encoding_brotli=True,
+            )
+            return cloudfront.BehaviorOptions(
+                origin=origin,
+                cache_policy=cache_policy,
+                origin_request_policy=viewer_ip_request_policy,
+                allowed_methods=cloudfront.AllowedMethods.ALLOW_GET_HEAD_OPTIONS,
+                viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+                compress=True,
+                function_associations=function_associations,
+            )
+
+        discovery = cached_behavior("Discovery", discovery_ttl, honor_origin=False)
+        jwks = cached_behavior("Jwks", jwks_ttl, honor_origin=False)
+        resources = cached_behavior("Resources", resources_ttl, honor_origin=True)
+
+        self.distribution = cloudfront.Distribution(
+            self,
+            "Distribution",
+            comment=f"Keycloak ({domain_name})",
+            domain_names=[domain_name],
+            certificate=acm.Certificate.from_certificate_arn(
+                self, "Certificate", certificate_arn
+            ),
+            price_class=cloudfront.PriceClass.PRICE_CLASS_100,
+            default_behavior=cloudfront.BehaviorOptions(
+                origin=origin,
+                cache_policy=cloudfront.CachePolicy.CACHING_DISABLED,
+                origin_request_policy=cloudfront.OriginRequestPolicy.ALL_VIEWER,
+                allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+                viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+                function_associations=function_associations,
+            ),
+            additional_behaviors={
+                "/realms/*/.well-known/*": discovery,
+                "/realms/*/protocol/openid-connect/certs": jwks,
+                "/resources/*": resources,
+            },
+        )
+
+        # The prefix list ID differs per region, and is looked up at deploy time
+        prefix_list = cr.AwsCustomResource(
+            self,
+            "OriginFacingPrefixList",
+            on_update=cr.AwsSdkCall(
+                service="EC2",
+                action="describeManagedPrefixLists",
+                parameters={
+                    "Filters": [
+                        {"Name": "prefix-list-name", "Values": [ORIGIN_FACING_PREFIX_LIST]}
+                    ]
+                },
+                physical_resource_id=cr.PhysicalResourceId.of(ORIGIN_FACING_PREFIX_LIST),
+                output_paths=["PrefixLists.0.PrefixListId"],
+            ),
+            policy=cr.AwsCustomResourcePolicy.from_sdk_calls(
+                resources=cr.AwsCustomResourcePolicy.ANY_RESOURCE
+            ),
+        )
+        alb.connections.allow_from(
+            ec2.Peer.prefix_list(
+                prefix_list.get_response_field("PrefixLists.0.PrefixListId")
+            ),
+            ec2.Port.tcp(443),
+            "HTTPS from CloudFront",
+        )
+
+        CfnOutput(
+            self,
+            "DistributionDomainName",
+            key="CdnDomainName",
+            value=self.distribution.distribution_domain_name,
+        )
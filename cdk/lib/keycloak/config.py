@@ -1,19 +1,34 @@
 import json
-import textwrap
+import os
+from typing import Optional
 
 from aws_cdk import (
     Duration,
     CfnOutput,
+    FileSystem,
+    RemovalPolicy,
     Stack,
-    aws_ecr_assets as ecr_assets,
+    aws_dynamodb as dynamodb,
     aws_ecs as ecs,
+    aws_events as events,
+    aws_events_targets as targets,
     aws_iam as iam,
     aws_lambda as _lambda,
     aws_kms as kms,
+    aws_s3 as s3,
+    aws_s3_deployment as s3_deployment,
     aws_secretsmanager as secretsmanager,
 )
 from constructs import Construct
 
+from lib.architecture import runtime_platform
+from lib.images import asset_image
+from lib.settings import Architecture, ConfigCliSettings, LoggingSettings
+from .logs import retention_days
+
+# Image used to fetch the realm configuration before keycloak-config-cli starts
+AWS_CLI_IMAGE = "public.ecr.aws/aws-cli/aws-cli:2.22.0"
+
 
 class KeycloakConfig(Construct):
     """
@@ -36,10 +51,17 @@ class KeycloakConfig(Construct):
         application_role_arns: dict[str, list[str]],
         version: str,
         stage: str,
+        architecture: Architecture = "amd64",
+        lazy_loading: bool = True,
+        config_cli_settings: Optional[ConfigCliSettings] = None,
+        logging_settings: Optional[LoggingSettings] = None,
         **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        config_cli_settings = config_cli_settings or ConfigCliSettings()
+        logging_settings = logging_settings or LoggingSettings()
+
         kms_key = kms.Key(
             self,
             "KeycloakKmsKey",
@@ -115,27 +137,65 @@ class KeycloakConfig(Construct):
                     secret, key
                 )
 
+        # Publish the realm configuration for this stage under a content-addressed
+        # prefix. Previous versions are retained so they can be re-applied by
+        # passing their version to the apply config Lambda (see bin/apply-config.py).
+        config_dir = os.path.join(app_dir, "config", stage)
+        config_version = FileSystem.fingerprint(config_dir)
+        config_bucket = s3.Bucket(
+            self,
+            "ConfigBucket",
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            enforce_ssl=True,
+        )
+        s3_deployment.BucketDeployment(
+            self,
+            "ConfigDeployment",
+            sources=[s3_deployment.Source.asset(config_dir)],
+            destination_bucket=config_bucket,
+            destination_key_prefix=f"{stage}/{config_version}/",
+        )
+
         config_task_def = ecs.FargateTaskDefinition(
-            self, "ConfigTaskDef", cpu=256, memory_limit_mib=512
+            self,
+            "ConfigTaskDef",
+            cpu=config_cli_settings.cpu,
+            memory_limit_mib=config_cli_settings.memory_limit_mib,
+            runtime_platform=runtime_platform(architecture),
         )
+        config_task_def.add_volume(name="config")
         container_name = "ConfigContainer"
-        config_task_def.add_container(
+        log_driver = ecs.AwsLogDriver(
+            stream_prefix="KeycloakConfig",
+            log_retention=retention_days(logging_settings.retention_days),
+        )
+        config_container = config_task_def.add_container(
             container_name,
             container_name=container_name,
-            image=ecs.ContainerImage.from_asset(
+            # The realm configuration is excluded from the image so that it is only
+            # rebuilt (and pushed) when the keycloak-config-cli version changes
+            image=asset_image(
+                self,
+                "image",
                 directory=app_dir,
-                platform=ecr_assets.Platform.LINUX_AMD64,
+                architecture=architecture,
+                lazy_loading=lazy_loading,
                 build_args={"KEYCLOAK_CONFIG_CLI_VERSION": version},
+                exclude=["config"],
             ),
             environment={
                 "KEYCLOAK_URL": hostname,
                 "KEYCLOAK_AVAILABILITYCHECK_ENABLED": "true",
                 "KEYCLOAK_AVAILABILITYCHECK_TIMEOUT": "120s",
-                "IMPORT_FILES_LOCATIONS": f"/config/{stage}/*",
+                "IMPORT_FILES_LOCATIONS": "/config/*",
                 "IMPORT_CACHE_ENABLED": "false",
                 "IMPORT_VARSUBSTITUTION_ENABLED": "true",
+                # Log as JSON, see bin/apply-config.py and the Logs Insights queries
+                "SPRING_PROFILES_ACTIVE": "json-log",
+                **config_cli_settings.environment,
             },
-            logging=ecs.LogDrivers.aws_logs(stream_prefix="KeycloakConfig"),
+            logging=log_driver,
             secrets={
                 "KEYCLOAK_USER": ecs.Secret.from_secrets_manager(
                     admin_secret, "username"
@@ -146,60 +206,102 @@ class KeycloakConfig(Construct):
                 **task_client_secrets,  # Merge the generated client secrets
             },
         )
+        config_container.add_mount_points(
+            ecs.MountPoint(
+                container_path="/config", source_volume="config", read_only=True
+            )
+        )
 
-        # Helper to simplify triggering the ECS task
-        code = f"""
-            const {{ ECSClient, RunTaskCommand }} = require('@aws-sdk/client-ecs');
-
-            const ecsClient = new ECSClient({{}});
-
-            exports.handler = async function(event) {{
-                console.log('Received event:', event);
-                const params = {{
-                    cluster: "{cluster.cluster_name}",
-                    taskDefinition: "{config_task_def.task_definition_arn}",
-                    launchType: 'FARGATE',
-                    overrides: {{
-                        containerOverrides: [
-                            {{
-                                name: "{container_name}",
-                                environment: Object.entries(event).map(([name, value]) => ({{
-                                name,
-                                value: String(value),
-                                }})),
-                            }},
-                        ],
-                    }},
-                    networkConfiguration: {{
-                        awsvpcConfiguration: {{
-                            subnets: {json.dumps(subnet_ids)},
-                            securityGroups: {json.dumps(security_group_ids)},
-                            assignPublicIp: 'ENABLED',
-                        }},
-                    }},
-                }};
-
-                try {{
-                    const result = await ecsClient.send(new RunTaskCommand(params));
-                    console.log('ECS RunTask result:', result);
-                    const {{ taskArn, clusterArn }} = result.tasks[0];
-                    return {{ taskArn, clusterArn }};
-                }} catch (error) {{
-                    console.error('Error running ECS task:', error);
-                    throw new Error('Failed to start ECS task');
-                }}
-            }};
-        """
+        # Fetch the requested configuration version into the shared volume before
+        # keycloak-config-cli starts
+        sync_container_name = "ConfigSyncContainer"
+        sync_container = config_task_def.add_container(
+            sync_container_name,
+            container_name=sync_container_name,
+            image=ecs.ContainerImage.from_registry(AWS_CLI_IMAGE),
+            essential=False,
+            entry_point=["sh", "-c"],
+            command=[
+                f'aws s3 sync --no-progress "s3://{config_bucket.bucket_name}/{stage}/${{CONFIG_VERSION:?}}/" /config/'
+            ],
+            logging=ecs.LogDrivers.aws_logs(
+                stream_prefix="KeycloakConfig", log_group=log_driver.log_group
+            ),
+        )
+        self.log_group = log_driver.log_group
+        sync_container.add_mount_points(
+            ecs.MountPoint(
+                container_path="/config", source_volume="config", read_only=False
+            )
+        )
+        config_container.add_container_dependencies(
+            ecs.ContainerDependency(
+                container=sync_container,
+                condition=ecs.ContainerDependencyCondition.SUCCESS,
+            )
+        )
+        config_bucket.grant_read(config_task_def.task_role, f"{stage}/*")
+
+        # Lock table used by the apply config Lambda to run a single config task per
+        # stage at a time
+        lock_table = dynamodb.Table(
+            self,
+            "ApplyConfigLockTable",
+            partition_key=dynamodb.Attribute(
+                name="stage", type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+
+        # Helper to simplify triggering the ECS task, see apply_config/index.js
         apply_config_lambda = _lambda.Function(
             self,
             "ApplyConfigLambda",
-            code=_lambda.Code.from_inline(textwrap.dedent(code).strip()),
+            code=_lambda.Code.from_asset(
+                os.path.join(os.path.dirname(__file__), "apply_config")
+            ),
             handler="index.handler",
             runtime=_lambda.Runtime.NODEJS_LATEST,
             timeout=Duration.minutes(5),
+            environment={
+                "TABLE_NAME": lock_table.table_name,
+                "STAGE": stage,
+                "CLUSTER": cluster.cluster_name,
+                "TASK_DEFINITION": config_task_def.task_definition_arn,
+                "CONTAINER_NAME": container_name,
+                "SYNC_CONTAINER_NAME": sync_container_name,
+                "SUBNETS": ",".join(subnet_ids),
+                "SECURITY_GROUPS": ",".join(security_group_ids),
+                "CONFIG_VERSION": config_version,
+            },
         )
 
         config_task_def.grant_run(apply_config_lambda)
+        lock_table.grant_read_write_data(apply_config_lambda)
+        apply_config_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["ecs:DescribeTasks"],
+                resources=["*"],
+                conditions={"ArnEquals": {"ecs:cluster": cluster.cluster_arn}},
+            )
+        )
+
+        # Start queued runs as soon as the task in progress stops
+        events.Rule(
+            self,
+            "ConfigTaskStoppedRule",
+            event_pattern=events.EventPattern(
+                source=["aws.ecs"],
+                detail_type=["ECS Task State Change"],
+                detail={
+                    "clusterArn": [cluster.cluster_arn],
+                    "taskDefinitionArn": [config_task_def.task_definition_arn],
+                    "lastStatus": ["STOPPED"],
+                },
+            ),
+            targets=[targets.LambdaFunction(apply_config_lambda)],
+        )
 
         CfnOutput(
             self,
@@ -207,3 +309,24 @@ class KeycloakConfig(Construct):
             key="ConfigLambdaArn",
             value=apply_config_lambda.function_arn,
         )
+
+        CfnOutput(
+            self,
+            "ConfigVersion",
+            key="ConfigVersion",
+            value=config_version,
+        )
+
+        CfnOutput(
+            self,
+            "ConfigTaskDefinitionArn",
+            key="ConfigTaskDefinitionArn",
+            value=config_task_def.task_definition_arn,
+        )
+
+        CfnOutput(
+            self,
+            "AdminSecretArn",
+            key="AdminSecretArn",
+            value=admin_secret.secret_arn,
+        )
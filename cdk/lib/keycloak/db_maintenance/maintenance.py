@@ -0,0 +1,334 @@
+"""
+Prunes, vacuums and reindexes the Keycloak database, and reports table and index sizes
+as CloudWatch metrics. Runs as a scheduled Fargate task (see KeycloakDatabaseMaintenance),
+or locally against the Postgres of the docker compose "maintenance" profile.
+
+Connection settings are read from the standard libpq variables (PGHOST, PGPORT,
+PGDATABASE, PGUSER and PGPASSWORD). The job is configured with:
+
+    RETENTION                 JSON, e.g. {"event_days": 90, "admin_event_days": 365,
+                              "offline_session_idle_days": 0, "realms": {"veda": {"event_days": 30}}},
+                              0 keeps the rows indefinitely
+    REINDEX_MIN_SIZE_MB       Only indexes of the hot tables larger than this are checked
+    REINDEX_MAX_LEAF_DENSITY  Indexes with a lower average leaf density (%) are rebuilt
+    METRICS_NAMESPACE         CloudWatch namespace, metrics are only printed when unset
+    STACK_NAME                Value of the Stack dimension of every metric
+    DRY_RUN                   "true" counts the rows that would be pruned without deleting
+                              them, and skips vacuuming and reindexing
+"""
+
+import json
+import os
+import sys
+import time
+
+import psycopg
+from psycopg import sql
+
+# Tables that grow with logins and sessions, and are vacuumed and reindexed on every run
+HOT_TABLES = [
+    "event_entity",
+    "admin_event_entity",
+    "offline_user_session",
+    "offline_client_session",
+]
+# Rows are deleted in batches, so that no single statement holds locks for long
+DELETE_BATCH_SIZE = 5000
+# Tables reported besides the hot tables, largest first
+METRICS_TOP_TABLES = 15
+
+DAY_SECONDS = 24 * 60 * 60
+
+DELETE_EVENTS = """
+DELETE FROM event_entity WHERE id IN (
+    SELECT id FROM event_entity WHERE realm_id = %(realm_id)s AND event_time < %(before_ms)s
+    LIMIT %(limit)s
+)
+"""
+DELETE_ADMIN_EVENTS = """
+DELETE FROM admin_event_entity WHERE id IN (
+    SELECT id FROM admin_event_entity
+    WHERE realm_id = %(realm_id)s AND admin_event_time < %(before_ms)s
+    LIMIT %(limit)s
+)
+"""
+# Client sessions are removed along with the offline user session they belong to
+DELETE_OFFLINE_SESSIONS = """
+WITH expired AS (
+    SELECT user_session_id FROM offline_user_session
+    WHERE realm_id = %(realm_id)s AND offline_flag = '1'
+        AND last_session_refresh < %(before_s)s
+    LIMIT %(limit)s
+), client_sessions AS (
+    DELETE FROM offline_client_session
+    WHERE offline_flag = '1' AND user_session_id IN (SELECT user_session_id FROM expired)
+)
+DELETE FROM offline_user_session
+WHERE offline_flag = '1' AND user_session_id IN (SELECT user_session_id FROM expired)
+"""
+COUNT_EVENTS = """
+SELECT count(*) FROM event_entity WHERE realm_id = %(realm_id)s AND event_time < %(before_ms)s
+"""
+COUNT_ADMIN_EVENTS = """
+SELECT count(*) FROM admin_event_entity
+WHERE realm_id = %(realm_id)s AND admin_event_time < %(before_ms)s
+"""
+COUNT_OFFLINE_SESSIONS = """
+SELECT count(*) FROM offline_user_session
+WHERE realm_id = %(realm_id)s AND offline_flag = '1' AND last_session_refresh < %(before_s)s
+"""
+
+# (retention key, table, delete statement, count statement)
+PRUNE_TARGETS = [
+    ("event_days", "event_entity", DELETE_EVENTS, COUNT_EVENTS),
+    ("admin_event_days", "admin_event_entity", DELETE_ADMIN_EVENTS, COUNT_ADMIN_EVENTS),
+    (
+        "offline_session_idle_days",
+        "offline_user_session",
+        DELETE_OFFLINE_SESSIONS,
+        COUNT_OFFLINE_SESSIONS,
+    ),
+]
+
+TABLE_SIZES = """
+SELECT relname, pg_table_size(relid), pg_indexes_size(relid), n_live_tup, n_dead_tup
+FROM pg_stat_user_tables
+WHERE schemaname = current_schema()
+ORDER BY pg_total_relation_size(relid) DESC
+"""
+INDEX_SIZES = """
+SELECT indexrelname, relname, pg_relation_size(indexrelid)
+FROM pg_stat_user_indexes
+WHERE schemaname = current_schema() AND relname = ANY(%s)
+"""
+
+
+def realm_retention(retention: dict, realm: str) -> dict:
+    """
+    Returns the retention of a realm, its overrides merged over the defaults.
+    """
+    overrides = (retention.get("realms") or {}).get(realm) or {}
+    return {
+        key: (
+            overrides[key] if overrides.get(key) is not None else retention.get(key) or 0
+        )
+        for key, *_ in PRUNE_TARGETS
+    }
+
+
+def prune(conn: psycopg.Connection, retention: dict, dry_run: bool) -> dict[str, int]:
+    """
+    Deletes the events and offline sessions of each realm that are older than its
+    retention. Returns the number of rows deleted (or that would be) per table.
+    """
+    deleted = {table: 0 for _, table, *_ in PRUNE_TARGETS}
+    existing = existing_tables(conn)
+    now = time.time()
+
+    for realm_id, realm in conn.execute("SELECT id, name FROM realm ORDER BY name"):
+        for key, days in realm_retention(retention, realm).items():
+            _, table, delete, count = next(t for t in PRUNE_TARGETS if t[0] == key)
+            if not days or table not in existing:
+                continue
+
+            params = {
+                "realm_id": realm_id,
+                "before_ms": int((now - days * DAY_SECONDS) * 1000),
+                "before_s": int(now - days * DAY_SECONDS),
+                "limit": DELETE_BATCH_SIZE,
+            }
+            if dry_run:
+                rows = conn.execute(count, params).fetchone()[0]
+            else:
+                rows = 0
+                while True:
+                    batch = conn.execute(delete, params).rowcount
+                    rows += batch
+                    if batch < DELETE_BATCH_SIZE:
+                        break
+
+            deleted[table] += rows
+            log(
+                f"{realm}: {'would prune' if dry_run else 'pruned'} {rows} row(s) "
+                f"older than {days} day(s) from {table}"
+            )
+
+    return deleted
+
+
+def vacuum(conn: psycopg.Connection) -> None:
+    existing = existing_tables(conn)
+    for table in HOT_TABLES:
+        if table in existing:
+            start = time.perf_counter()
+            conn.execute(sql.SQL("VACUUM (ANALYZE) {}").format(sql.Identifier(table)))
+            log(f"Vacuumed {table} in {time.perf_counter() - start:.1f}s")
+
+
+def reindex(conn: psycopg.Connection, min_size_mb: int, max_leaf_density: float) -> list[str]:
+    """
+    Rebuilds the B-tree indexes of the hot tables whose leaf pages have become sparse.
+    Returns the names of the rebuilt indexes.
+    """
+    try:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS pgstattuple")
+    except psycopg.Error as e:
+        log(f"Skipping reindexing, the pgstattuple extension is not available: {e}")
+        return []
+
+    rebuilt = []
+    indexes = conn.execute(
+        """
+        SELECT i.indexrelname
+        FROM pg_stat_user_indexes i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = c.relam
+        WHERE i.schemaname = current_schema() AND i.relname = ANY(%s)
+            AND am.amname = 'btree' AND pg_relation_size(i.indexrelid) >= %s
+        """,
+        [HOT_TABLES, min_size_mb * 1024 * 1024],
+    ).fetchall()
+
+    for (index,) in indexes:
+        density = conn.execute(
+            "SELECT avg_leaf_density FROM pgstatindex(%s)", [index]
+        ).fetchone()[0]
+        if density >= max_leaf_density:
+            continue
+
+        start = time.perf_counter()
+        try:
+            conn.execute(
+                sql.SQL("REINDEX INDEX CONCURRENTLY {}").format(sql.Identifier(index))
+            )
+        except psycopg.Error as e:
+            # e.g. a deadlock or lock timeout, the other indexes and the metrics are
+            # still processed
+            log(
+                f"Failed to reindex {index}, an invalid {index}_ccnew index may have to be "
+                f"dropped: {e}"
+            )
+            continue
+        log(
+            f"Reindexed {index} (leaf density {density:.0f}%) in "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+        rebuilt.append(index)
+
+    return rebuilt
+
+
+def collect_sizes(conn: psycopg.Connection) -> dict:
+    """
+    Returns the size of the database, of the hot and largest tables, and of the indexes
+    of the hot tables.
+    """
+    tables = {}
+    for index, (table, table_bytes, index_bytes, live, dead) in enumerate(
+        conn.execute(TABLE_SIZES)
+    ):
+        if index < METRICS_TOP_TABLES or table in HOT_TABLES:
+            tables[table] = {
+                "table_bytes": table_bytes,
+                "index_bytes": index_bytes,
+                "live_tuples": live,
+                "dead_tuples": dead,
+            }
+
+    return {
+        "database_bytes": conn.execute(
+            "SELECT pg_database_size(current_database())"
+        ).fetchone()[0],
+        "tables": tables,
+        "indexes": {
+            index: {"table": table, "bytes": size}
+            for index, table, size in conn.execute(INDEX_SIZES, [HOT_TABLES])
+        },
+    }
+
+
+def metric_data(sizes: dict, deleted: dict[str, int], stack_name: str) -> list[dict]:
+    stack = [{"Name": "Stack", "Value": stack_name}]
+
+    def metric(name, value, unit, dimensions=()):
+        return {
+            "MetricName": name,
+            "Dimensions": stack + list(dimensions),
+            "Value": value,
+            "Unit": unit,
+        }
+
+    data = [metric("DatabaseSize", sizes["database_bytes"], "Bytes")]
+    for table, stats in sizes["tables"].items():
+        dimensions = [{"Name": "Table", "Value": table}]
+        data += [
+            metric("TableSize", stats["table_bytes"], "Bytes", dimensions),
+            metric("IndexSize", stats["index_bytes"], "Bytes", dimensions),
+            metric("DeadTuples", stats["dead_tuples"], "Count", dimensions),
+        ]
+    for index, stats in sizes["indexes"].items():
+        dimensions = [
+            {"Name": "Table", "Value": stats["table"]},
+            {"Name": "Index", "Value": index},
+        ]
+        data.append(metric("IndexSize", stats["bytes"], "Bytes", dimensions))
+    for table, rows in deleted.items():
+        dimensions = [{"Name": "Table", "Value": table}]
+        data.append(metric("RowsPruned", rows, "Count", dimensions))
+    return data
+
+
+def put_metrics(namespace: str, data: list[dict]) -> None:
+    import boto3
+
+    cloudwatch = boto3.client("cloudwatch")
+    # PutMetricData accepts up to 1000 metrics per request
+    for i in range(0, len(data), 1000):
+        cloudwatch.put_metric_data(Namespace=namespace, MetricData=data[i : i + 1000])
+
+
+def existing_tables(conn: psycopg.Connection) -> set[str]:
+    return {
+        table
+        for (table,) in conn.execute(
+            "SELECT tablename FROM pg_tables WHERE schemaname = current_schema()"
+        )
+    }
+
+
+def log(message: str) -> None:
+    print(message, flush=True)
+
+
+def main():
+    retention = json.loads(os.environ.get("RETENTION") or "{}")
+    min_size_mb = int(os.environ.get("REINDEX_MIN_SIZE_MB", "64"))
+    max_leaf_density = float(os.environ.get("REINDEX_MAX_LEAF_DENSITY", "70"))
+    namespace = os.environ.get("METRICS_NAMESPACE")
+    stack_name = os.environ.get("STACK_NAME", "local")
+    dry_run = os.environ.get("DRY_RUN", "false").lower() == "true"
+
+    # VACUUM and REINDEX CONCURRENTLY cannot run inside a transaction block
+    with psycopg.connect(autocommit=True) as conn:
+        if "realm" not in existing_tables(conn):
+            log("No Keycloak schema found in the database")
+            return 1
+
+        deleted = prune(conn, retention, dry_run)
+        rebuilt = []
+        if not dry_run:
+            vacuum(conn)
+            rebuilt = reindex(conn, min_size_mb, max_leaf_density)
+        sizes = collect_sizes(conn)
+
+    data = metric_data(sizes, deleted, stack_name)
+    if namespace:
+        put_metrics(namespace, data)
+        log(f"Published {len(data)} metric(s) to {namespace}")
+
+    log(json.dumps({"pruned": deleted, "reindexed": rebuilt, "sizes": sizes}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import re
+
+from aws_cdk import (
+    Stack,
+    aws_logs as logs,
+)
+from constructs import Construct
+
+RETENTION_DAYS = {
+    7: logs.RetentionDays.ONE_WEEK,
+    14: logs.RetentionDays.TWO_WEEKS,
+    30: logs.RetentionDays.ONE_MONTH,
+    60: logs.RetentionDays.TWO_MONTHS,
+    90: logs.RetentionDays.THREE_MONTHS,
+    180: logs.RetentionDays.SIX_MONTHS,
+    365: logs.RetentionDays.ONE_YEAR,
+    731: logs.RetentionDays.TWO_YEARS,
+    1827: logs.RetentionDays.FIVE_YEARS,
+    3653: logs.RetentionDays.TEN_YEARS,
+}
+
+# First Keycloak version with the KC_HTTP_ACCESS_LOG_* options
+ACCESS_LOG_MIN_VERSION = (26, 1)
+# Format of the Keycloak HTTP access log, parsed by the slow requests query
+ACCESS_LOG_PATTERN = '"%r" %s %b %D'
+ACCESS_LOG_PARSE = (
+    "message '\"* * *\" * * *' as method, path, protocol, status, bytes, duration_ms"
+)
+
+
+def retention_days(days: int) -> logs.RetentionDays:
+    return RETENTION_DAYS[days]
+
+
+def supports_access_log(version: str) -> bool:
+    """
+    Returns whether a Keycloak version has the HTTP access log. Tags without a version
+    number, e.g. "latest" or "nightly", are assumed to have it.
+    """
+    match = re.match(r"(\d+)\.(\d+)", version)
+    return not match or tuple(map(int, match.groups())) >= ACCESS_LOG_MIN_VERSION
+
+
+class KeycloakLogQueries(Construct):
+    """
+    CloudWatch Logs Insights query definitions for the JSON logs of Keycloak and the
+    config task, saved under the stack's name in the Logs Insights console.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        keycloak_log_group: logs.ILogGroup,
+        config_log_group: logs.ILogGroup,
+        access_log_enabled: bool = True,
+        slow_request_ms: int = 1000,
+    ) -> None:
+        """
+        :param scope: Construct scope
+        :param construct_id: Identifier for this construct
+        :param keycloak_log_group: Log group of the Keycloak service
+        :param config_log_group: Log group of the keycloak-config-cli task
+        :param access_log_enabled: Whether Keycloak writes the HTTP access log, which
+            the slow requests and request latency queries need
+        :param slow_request_ms: Requests taking at least this long are reported as slow
+        """
+        super().__init__(scope, construct_id)
+
+        folder = Stack.of(self).stack_name
+
+        # Both queries parse the HTTP access log
+        if access_log_enabled:
+            logs.QueryDefinition(
+                self,
+                "SlowRequests",
+                query_definition_name=f"{folder}/slow-requests",
+                log_groups=[keycloak_log_group],
+                query_string=logs.QueryString(
+                    fields=["@timestamp", "message"],
+                    parse_statements=[ACCESS_LOG_PARSE],
+                    filter_statements=[
+                        f"ispresent(duration_ms) and duration_ms >= {slow_request_ms}"
+                    ],
+                    sort="duration_ms desc",
+                    limit=100,
+                ),
+            )
+
+            logs.QueryDefinition(
+                self,
+                "RequestLatency",
+                query_definition_name=f"{folder}/request-latency-by-path",
+                log_groups=[keycloak_log_group],
+                query_string=logs.QueryString(
+                    parse_statements=[ACCESS_LOG_PARSE],
+                    filter_statements=["ispresent(duration_ms)"],
+                    stats_statements=[
+                        "count(*) as requests, pct(duration_ms, 50) as p50_ms, "
+                        "pct(duration_ms, 99) as p99_ms, max(duration_ms) as max_ms by method, path"
+                    ],
+                    sort="requests desc",
+                    limit=100,
+                ),
+            )
+
+        logs.QueryDefinition(
+            self,
+            "ErrorsByRealm",
+            query_definition_name=f"{folder}/errors-by-realm",
+            log_groups=[keycloak_log_group],
+            query_string=logs.QueryString(
+                fields=["@timestamp", "level", "loggerName", "message"],
+                # Event log lines look like: type="LOGIN_ERROR", realmId="...", realmName="veda", ...
+                parse_statements=[
+                    "message /type=\"?(?<event>[A-Z_]+)\"?/",
+                    "message /realmName=\"?(?<realm>[^\",]+)\"?/",
+                ],
+                filter_statements=['level = "ERROR" or event like /_ERROR$/'],
+                stats_statements=["count(*) as errors by realm, event, bin(5m)"],
+                sort="errors desc",
+            ),
+        )
+
+        logs.QueryDefinition(
+            self,
+            "ImportDurationByRealm",
+            query_definition_name=f"{folder}/import-duration-by-realm",
+            log_groups=[config_log_group],
+            query_string=logs.QueryString(
+                parse_statements=["message /realm '(?<realm>[^']+)'/"],
+                filter_statements=["ispresent(realm)"],
+                stats_statements=[
+                    "min(@timestamp) as started, max(@timestamp) as finished, "
+                    "count(*) as log_lines by @logStream, realm"
+                ],
+                sort="started desc",
+            ),
+        )
+
+        logs.QueryDefinition(
+            self,
+            "ImportErrors",
+            query_definition_name=f"{folder}/import-errors",
+            log_groups=[config_log_group],
+            query_string=logs.QueryString(
+                fields=["@timestamp", "@logStream", "import_file", "level", "message"],
+                filter_statements=['level = "ERROR" or level = "WARN"'],
+                sort="@timestamp desc",
+                limit=100,
+            ),
+        )
@@ -0,0 +1,136 @@
+import os
+from typing import Optional
+
+from aws_cdk import (
+    CfnOutput,
+    Stack,
+    aws_applicationautoscaling as appscaling,
+    aws_ec2 as ec2,
+    aws_ecs as ecs,
+    aws_ecs_patterns as ecs_patterns,
+    aws_iam as iam,
+    aws_rds as rds,
+)
+from constructs import Construct
+
+from lib.architecture import image_platform, runtime_platform
+from lib.settings import Architecture, DatabaseMaintenanceSettings, LoggingSettings
+from .logs import retention_days
+
+# CloudWatch namespace of the table and index size metrics
+METRICS_NAMESPACE = "VedaKeycloak/Database"
+
+
+class KeycloakDatabaseMaintenance(Construct):
+    """
+    Scheduled Fargate task that prunes expired events and offline sessions, vacuums and
+    reindexes the hot tables, and reports table and index sizes as CloudWatch metrics.
+    See db_maintenance/maintenance.py.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        vpc: ec2.IVpc,
+        cluster: ecs.ICluster,
+        database_name: str,
+        database_instance: rds.DatabaseInstance,
+        maintenance_settings: Optional[DatabaseMaintenanceSettings] = None,
+        architecture: Architecture = "amd64",
+        logging_settings: Optional[LoggingSettings] = None,
+        **kwargs,
+    ) -> None:
+        """
+        :param scope: Construct or Stack scope
+        :param construct_id: Identifier for this construct
+        :param vpc: The VPC to deploy into
+        :param cluster: The ECS cluster to run the task in
+        :param database_name: Name of the Keycloak database
+        :param database_instance: The RDS DatabaseInstance used by Keycloak
+        :param maintenance_settings: Schedule, retention and reindexing thresholds
+        :param architecture: CPU architecture of the maintenance image and task
+        :param logging_settings: Log retention
+        """
+        super().__init__(scope, construct_id, **kwargs)
+
+        maintenance_settings = maintenance_settings or DatabaseMaintenanceSettings()
+        logging_settings = logging_settings or LoggingSettings()
+
+        if not database_instance.secret:
+            raise ValueError("Database instance must have an attached secret")
+
+        def ecs_db_secret(key: str) -> ecs.Secret:
+            return ecs.Secret.from_secrets_manager(database_instance.secret, key)
+
+        security_group = ec2.SecurityGroup(
+            self,
+            "SecurityGroup",
+            vpc=vpc,
+            description="Keycloak database maintenance task",
+        )
+
+        # ScheduledFargateTask ignores the runtime platform of its image options, so the
+        # task definition is created here
+        task_definition = ecs.FargateTaskDefinition(
+            self,
+            "TaskDef",
+            cpu=256,
+            memory_limit_mib=512,
+            runtime_platform=runtime_platform(architecture),
+        )
+        task_definition.add_container(
+            "ScheduledContainer",
+            image=ecs.ContainerImage.from_asset(
+                directory=os.path.join(os.path.dirname(__file__), "db_maintenance"),
+                platform=image_platform(architecture),
+            ),
+            logging=ecs.AwsLogDriver(
+                stream_prefix="KeycloakDatabaseMaintenance",
+                log_retention=retention_days(logging_settings.retention_days),
+            ),
+            environment={
+                "PGDATABASE": database_name,
+                "METRICS_NAMESPACE": METRICS_NAMESPACE,
+                "STACK_NAME": Stack.of(self).stack_name,
+                **maintenance_settings.environment,
+            },
+            secrets={
+                "PGHOST": ecs_db_secret("host"),
+                "PGPORT": ecs_db_secret("port"),
+                "PGUSER": ecs_db_secret("username"),
+                "PGPASSWORD": ecs_db_secret("password"),
+            },
+        )
+
+        self.scheduled_task = ecs_patterns.ScheduledFargateTask(
+            self,
+            "Task",
+            cluster=cluster,
+            vpc=vpc,
+            schedule=appscaling.Schedule.expression(maintenance_settings.schedule),
+            security_groups=[security_group],
+            scheduled_fargate_task_definition_options=ecs_patterns.ScheduledFargateTaskDefinitionOptions(
+                task_definition=task_definition,
+            ),
+        )
+
+        database_instance.connections.allow_default_port_from(security_group)
+
+        self.scheduled_task.task_definition.add_to_task_role_policy(
+            iam.PolicyStatement(
+                actions=["cloudwatch:PutMetricData"],
+                resources=["*"],
+                conditions={
+                    "StringEquals": {"cloudwatch:namespace": METRICS_NAMESPACE}
+                },
+            )
+        )
+
+        CfnOutput(
+            self,
+            "TaskDefinitionArn",
+            key="DatabaseMaintenanceTaskDefinitionArn",
+            value=self.scheduled_task.task_definition.task_definition_arn,
+        )
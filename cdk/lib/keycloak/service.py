@@ -1,12 +1,15 @@
+import os
 from typing import Optional
 
 from constructs import Construct
 from aws_cdk import (
+    CfnOutput,
     Duration,
+    Stack,
     aws_ec2 as ec2,
     aws_ecs as ecs,
     aws_ecs_patterns as ecs_patterns,
-    aws_ecr_assets as ecr_assets,
+    aws_iam as iam,
     aws_secretsmanager as secretsmanager,
     aws_certificatemanager as acm,
     aws_elasticloadbalancingv2 as elbv2,
@@ -14,6 +17,22 @@ from aws_cdk import (
     aws_s3 as s3,
 )
 
+from lib.architecture import runtime_platform
+from lib.images import asset_image
+from lib.settings import (
+    Architecture,
+    EmailSettings,
+    KeycloakCacheSettings,
+    KeycloakHttpSettings,
+    LoggingSettings,
+    ProfilingSettings,
+    TracingSettings,
+)
+from .logs import ACCESS_LOG_PATTERN, retention_days, supports_access_log
+
+# AWS Distro for OpenTelemetry collector, the tracing sidecar of the Keycloak tasks
+OTEL_COLLECTOR_IMAGE = "public.ecr.aws/aws-observability/aws-otel-collector:v0.43.3"
+
 
 class KeycloakService(Construct):
     """
@@ -39,6 +58,15 @@ class KeycloakService(Construct):
         stage: str,
         alb_access_logs_bucket: Optional[str] = None,
         alb_access_logs_prefix: Optional[str] = None,
+        cache_settings: Optional[KeycloakCacheSettings] = None,
+        http_settings: Optional[KeycloakHttpSettings] = None,
+        architecture: Architecture = "amd64",
+        lazy_loading: bool = True,
+        open_listener: bool = True,
+        logging_settings: Optional[LoggingSettings] = None,
+        profiling_settings: Optional[ProfilingSettings] = None,
+        tracing_settings: Optional[TracingSettings] = None,
+        email_settings: Optional[EmailSettings] = None,
         **kwargs,
     ) -> None:
         """
@@ -50,9 +78,26 @@ class KeycloakService(Construct):
         :param version: The Keycloak version (e.g. "21.1.2")
         :param hostname: The Keycloak hostname
         :param ssl_certificate_arn: ARN of the SSL Certificate for the ALB
+        :param cache_settings: Infinispan cache and persistent session tuning
+        :param http_settings: HTTP worker pool, idle timeout and compression
+        :param architecture: CPU architecture of the Keycloak image and tasks
+        :param lazy_loading: Build a SOCI index for the Keycloak image
+        :param open_listener: Allow HTTPS to the load balancer from any address, disabled
+            when only a CDN in front of it may connect
+        :param logging_settings: Log retention and HTTP access logging
+        :param profiling_settings: Java Flight Recorder recording and retention
+        :param tracing_settings: OpenTelemetry tracing and sampling
+        :param email_settings: Email sender (SMTP or the SES API)
         """
         super().__init__(scope, construct_id, **kwargs)
 
+        cache_settings = cache_settings or KeycloakCacheSettings()
+        http_settings = http_settings or KeycloakHttpSettings()
+        logging_settings = logging_settings or LoggingSettings()
+        profiling_settings = profiling_settings or ProfilingSettings()
+        tracing_settings = tracing_settings or TracingSettings()
+        email_settings = email_settings or EmailSettings()
+
         if not database_instance.secret:
             raise ValueError("Database instance must have an attached secret")
 
@@ -96,6 +141,7 @@ class KeycloakService(Construct):
             vpc_subnets=ec2.SubnetSelection(
                 subnet_type=ec2.SubnetType.PUBLIC, one_per_az=True
             ),
+            idle_timeout=Duration.seconds(http_settings.idle_timeout_seconds),
         )
 
         if alb_access_logs_bucket:
@@ -104,8 +150,18 @@ class KeycloakService(Construct):
             )
             load_balancer.log_access_logs(bucket, alb_access_logs_prefix)
 
+        # Same stream prefix as the pattern's default log driver, with a retention
+        log_driver = ecs.AwsLogDriver(
+            stream_prefix="service",
+            log_retention=retention_days(logging_settings.retention_days),
+        )
+
         # Fargate Service with ALB, SSL, and Health Check
         kc_major_version = int(version.split(".")[0]) if version else 0
+        # Earlier versions refuse to start with the unknown access log options
+        self.access_log_enabled = (
+            logging_settings.access_log_enabled and supports_access_log(version)
+        )
         self.alb_service = ecs_patterns.ApplicationLoadBalancedFargateService(
             self,
             "service",
@@ -113,22 +169,34 @@ class KeycloakService(Construct):
             load_balancer=load_balancer,
             desired_count=1,
             public_load_balancer=True,
+            open_listener=open_listener,
             listener_port=443,
             certificate=certificate,
             memory_limit_mib=2048,
             cpu=1024,
+            runtime_platform=runtime_platform(architecture),
             health_check_grace_period=Duration.seconds(120),
             redirect_http=False,
+            # Used by bin/jfr.py to control Java Flight Recorder in the running tasks
+            enable_execute_command=profiling_settings.enabled,
             task_image_options=ecs_patterns.ApplicationLoadBalancedTaskImageOptions(
                 container_name="keycloak",
                 container_port=app_port,
-                image=ecs.ContainerImage.from_asset(
+                image=asset_image(
+                    self,
+                    "image",
                     directory=app_dir,
-                    platform=ecr_assets.Platform.LINUX_AMD64,
+                    architecture=architecture,
+                    lazy_loading=lazy_loading,
                     build_args={
                         "KEYCLOAK_VERSION": version,
+                        **cache_settings.build_args,
+                        **http_settings.build_args,
+                        **tracing_settings.build_args,
+                        **email_settings.build_args,
                     },
                 ),
+                log_driver=log_driver,
                 entry_point=["/opt/keycloak/bin/kc.sh"],
                 command=["start"],
                 environment={
@@ -137,7 +205,29 @@ class KeycloakService(Construct):
                     "KC_HTTP_ENABLED": "true",
                     "KC_HTTP_MANAGEMENT_PORT": str(health_management_port),
                     "KC_HEALTH_ENABLED": "true",
+                    "KC_LOG_CONSOLE_OUTPUT": "json",
+                    **(
+                        {
+                            "KC_HTTP_ACCESS_LOG_ENABLED": "true",
+                            "KC_HTTP_ACCESS_LOG_PATTERN": ACCESS_LOG_PATTERN,
+                        }
+                        if self.access_log_enabled
+                        else {}
+                    ),
                     "KC_SPI_EVENTS_LISTENER_EMAIL_ON_USER_CREATION_STAGE": stage,
+                    **cache_settings.environment,
+                    **http_settings.environment,
+                    **profiling_settings.environment,
+                    **(
+                        {
+                            **tracing_settings.environment,
+                            "KC_TRACING_SERVICE_NAME": Stack.of(self).stack_name,
+                            "KC_TRACING_RESOURCE_ATTRIBUTES": f"deployment.environment={stage}",
+                        }
+                        if tracing_settings.enabled
+                        else {}
+                    ),
+                    **email_settings.environment,
                     **keycloak_send_email_addresses
                 },
                 secrets={
@@ -170,6 +260,39 @@ class KeycloakService(Construct):
             )
         )
 
+        if tracing_settings.enabled:
+            # Forwards the spans Keycloak exports to localhost to X-Ray. Not essential,
+            # so a failing collector doesn't stop Keycloak.
+            with open(os.path.join(os.path.dirname(__file__), "otel", "collector.yaml")) as f:
+                collector_config = f.read()
+            task_definition = self.alb_service.task_definition
+            task_definition.add_container(
+                "otel-collector",
+                container_name="otel-collector",
+                image=ecs.ContainerImage.from_registry(OTEL_COLLECTOR_IMAGE),
+                essential=False,
+                memory_reservation_mib=128,
+                environment={
+                    # Read by the collector in place of a configuration file
+                    "AOT_CONFIG_CONTENT": collector_config,
+                },
+                logging=ecs.LogDrivers.aws_logs(
+                    stream_prefix="otel-collector", log_group=log_driver.log_group
+                ),
+            )
+            task_definition.task_role.add_managed_policy(
+                iam.ManagedPolicy.from_aws_managed_policy_name("AWSXRayDaemonWriteAccess")
+            )
+
+        if email_settings.sender == "ses":
+            # Used by the ses-email sender, see keycloak/providers/ses-email
+            self.alb_service.task_definition.add_to_task_role_policy(
+                iam.PolicyStatement(
+                    actions=["ses:SendEmail"],
+                    resources=["*"],
+                )
+            )
+
         self.alb_service.target_group.configure_health_check(
             path="/health",
             port=str(health_management_port),  # 9000
@@ -187,3 +310,46 @@ class KeycloakService(Construct):
         )
 
         database_instance.connections.allow_default_port_from(self.alb_service.service)
+
+        self.log_group = log_driver.log_group
+
+        # Java Flight Recorder recordings uploaded by bin/jfr.py, through presigned URLs
+        # created by the caller, so the tasks themselves need no access to the bucket
+        self.profiling_bucket = None
+        if profiling_settings.enabled:
+            self.profiling_bucket = s3.Bucket(
+                self,
+                "ProfilingBucket",
+                block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+                encryption=s3.BucketEncryption.S3_MANAGED,
+                enforce_ssl=True,
+                lifecycle_rules=[
+                    s3.LifecycleRule(
+                        expiration=Duration.days(
+                            profiling_settings.recordings_retention_days
+                        )
+                    )
+                ],
+            )
+
+        CfnOutput(
+            self,
+            "ClusterName",
+            key="KeycloakClusterName",
+            value=self.alb_service.cluster.cluster_name,
+        )
+
+        CfnOutput(
+            self,
+            "ServiceName",
+            key="KeycloakServiceName",
+            value=self.alb_service.service.service_name,
+        )
+
+        if self.profiling_bucket:
+            CfnOutput(
+                self,
+                "ProfilingBucketName",
+                key="ProfilingBucketName",
+                value=self.profiling_bucket.bucket_name,
+            )
@@ -7,10 +7,24 @@ from aws_cdk import (
 from constructs import Construct
 
 from .database import KeycloakDatabase
+from .logs import KeycloakLogQueries
 from .service import KeycloakService
 from .config import KeycloakConfig
 from .url import KeycloakUrl
 from lib.sesrelay import SesRelayStack
+from lib.settings import (
+    ArchitectureSettings,
+    ConfigCliSettings,
+    DatabaseMaintenanceSettings,
+    EmailSettings,
+    KeycloakCacheSettings,
+    KeycloakHttpSettings,
+    LazyLoadingSettings,
+    LoggingSettings,
+    ProfilingSettings,
+    TracingSettings,
+    WafSettings,
+)
 
 
 class KeycloakStack(Stack):
@@ -38,10 +52,27 @@ class KeycloakStack(Stack):
         vpc_id: Optional[str] = None,
         rds_snapshot_identifier: Optional[str] = None,
         keycloak_send_email_addresses: Optional[dict[str, str]] = None,
+        cdn_certificate_arn: Optional[str] = None,
+        keycloak_cache: Optional[KeycloakCacheSettings] = None,
+        keycloak_http: Optional[KeycloakHttpSettings] = None,
+        waf: Optional[WafSettings] = None,
+        architecture: Optional[ArchitectureSettings] = None,
+        lazy_loading: Optional[LazyLoadingSettings] = None,
+        config_cli: Optional[ConfigCliSettings] = None,
+        logging_settings: Optional[LoggingSettings] = None,
+        profiling_settings: Optional[ProfilingSettings] = None,
+        tracing_settings: Optional[TracingSettings] = None,
+        email_settings: Optional[EmailSettings] = None,
+        db_maintenance: Optional[DatabaseMaintenanceSettings] = None,
         **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        architecture = architecture or ArchitectureSettings()
+        lazy_loading = lazy_loading or LazyLoadingSettings()
+        db_maintenance = db_maintenance or DatabaseMaintenanceSettings()
+        email_settings = email_settings or EmailSettings()
+
         vpc = (
             ec2.Vpc.from_lookup(self, "Vpc", vpc_id=vpc_id)
             if vpc_id
@@ -71,9 +102,19 @@ class KeycloakStack(Stack):
             stage=stage,
             alb_access_logs_bucket=alb_access_logs_bucket,
             alb_access_logs_prefix=alb_access_logs_prefix,
+            cache_settings=keycloak_cache,
+            http_settings=keycloak_http,
+            architecture=architecture.keycloak,
+            lazy_loading=lazy_loading.keycloak,
+            # Behind CloudFront, the CDN opens the load balancer to CloudFront only
+            open_listener=not cdn_certificate_arn,
+            logging_settings=logging_settings,
+            profiling_settings=profiling_settings,
+            tracing_settings=tracing_settings,
+            email_settings=email_settings,
         )
 
-        KeycloakConfig(
+        kc_config = KeycloakConfig(
             self,
             "config",
             cluster=kc_service.alb_service.cluster,
@@ -90,21 +131,85 @@ class KeycloakStack(Stack):
             application_role_arns=application_role_arns,
             version=keycloak_config_cli_version,
             stage=stage,
+            architecture=architecture.config_cli,
+            lazy_loading=lazy_loading.config_cli,
+            config_cli_settings=config_cli,
+            logging_settings=logging_settings,
         )
 
-        ses_relay_stack = SesRelayStack(
+        KeycloakLogQueries(
             self,
-            "ses-relay",
-            vpc=vpc,
-            ses_relay_app_dir=ses_relay_app_dir,
+            "log-queries",
+            keycloak_log_group=kc_service.log_group,
+            config_log_group=kc_config.log_group,
+            access_log_enabled=kc_service.access_log_enabled,
         )
 
+        if db_maintenance.enabled:
+            from .maintenance import KeycloakDatabaseMaintenance
+
+            KeycloakDatabaseMaintenance(
+                self,
+                "db-maintenance",
+                vpc=vpc,
+                cluster=kc_service.alb_service.cluster,
+                database_name=kc_db.database_name,
+                database_instance=kc_db.database,
+                maintenance_settings=db_maintenance,
+                architecture=architecture.db_maintenance,
+                logging_settings=logging_settings,
+            )
+
+        if email_settings.ses_relay_enabled:
+            SesRelayStack(
+                self,
+                "ses-relay",
+                vpc=vpc,
+                ses_relay_app_dir=ses_relay_app_dir,
+                architecture=architecture.ses_relay,
+            )
+
+        # Optional constructs are imported on demand, which avoids loading the
+        # CloudFront and WAFv2 bindings on every synth of stacks that don't use them
+        kc_cdn = None
+        if cdn_certificate_arn:
+            from .cdn import VIEWER_IP_HEADER, KeycloakCdn
+
+            kc_cdn = KeycloakCdn(
+                self,
+                "cdn",
+                hostname=hostname,
+                alb=kc_service.alb_service.load_balancer,
+                certificate_arn=cdn_certificate_arn,
+            )
+
+        if waf and waf.enabled:
+            from .waf import KeycloakWaf
+
+            KeycloakWaf(
+                self,
+                "waf",
+                alb=kc_service.alb_service.load_balancer,
+                token_rate_limit=waf.token_rate_limit,
+                login_rate_limit=waf.login_rate_limit,
+                global_rate_limit=waf.global_rate_limit,
+                evaluation_window_seconds=waf.evaluation_window_seconds,
+                # Behind CloudFront the load balancer only sees edge IPs, and only
+                # accepts connections from CloudFront, which sets this header
+                forwarded_ip_header=VIEWER_IP_HEADER if kc_cdn else None,
+            )
+
         if configure_route53:
             KeycloakUrl(
                 self,
                 "url",
                 hostname=hostname,
                 alb=kc_service.alb_service.load_balancer,
+                distribution=kc_cdn.distribution if kc_cdn else None,
             )
         else:
-            print("Warning: Environment is set to manual DNS configuration--new record for keycloak service load balancer must be added to hosted zone")
+            print(
+                "Warning: Environment is set to manual DNS configuration--new record for keycloak service "
+                + ("CDN distribution" if kc_cdn else "load balancer")
+                + " must be added to hosted zone"
+            )
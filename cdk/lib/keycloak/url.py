@@ -1,7 +1,10 @@
 import re
+from typing import Optional
+
 from constructs import Construct
 from aws_cdk import (
     Stack,
+    aws_cloudfront as cloudfront,
     aws_route53 as route53,
     aws_route53_targets as route53_targets,
     aws_elasticloadbalancingv2 as elbv2,
@@ -17,6 +20,7 @@ class KeycloakUrl(Construct):
         *,
         hostname: str,
         alb: elbv2.ApplicationLoadBalancer,
+        distribution: Optional[cloudfront.IDistribution] = None,
     ) -> None:
         super().__init__(scope, construct_id)
 
@@ -38,14 +42,17 @@ class KeycloakUrl(Construct):
             self, "HostedZone", domain_name=domain_name
         )
 
-        # Create or replace an A record for the provided subdomain
+        # Create or replace an A record for the provided subdomain, pointing at the CDN
+        # when one is deployed in front of the load balancer
         record = route53.ARecord(
             self,
             "AliasRecord",
             zone=hosted_zone,
             record_name=subdomain,
             target=route53.RecordTarget.from_alias(
-                route53_targets.LoadBalancerTarget(alb)
+                route53_targets.CloudFrontTarget(distribution)
+                if distribution
+                else route53_targets.LoadBalancerTarget(alb)
             ),
             delete_existing=True,
             comment=f"Alias record for Keycloak, created by {Stack.of(self).stack_name}",
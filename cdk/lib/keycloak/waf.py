@@ -0,0 +1,147 @@
+from typing import Optional
+
+from constructs import Construct
+from aws_cdk import (
+    Stack,
+    aws_elasticloadbalancingv2 as elbv2,
+    aws_wafv2 as wafv2,
+)
+
+
+class KeycloakWaf(Construct):
+    """
+    WAFv2 web ACL with per-IP rate limits, attached to the Keycloak load balancer so that
+    abusive clients are rejected before their requests reach the Keycloak tasks.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        alb: elbv2.IApplicationLoadBalancer,
+        token_rate_limit: int,
+        login_rate_limit: int,
+        global_rate_limit: Optional[int] = None,
+        evaluation_window_seconds: int = 300,
+        forwarded_ip_header: Optional[str] = None,
+    ) -> None:
+        """
+        :param scope: Construct scope
+        :param construct_id: Identifier for this construct
+        :param alb: The load balancer serving Keycloak
+        :param token_rate_limit: Maximum requests per IP to the token endpoints per window
+        :param login_rate_limit: Maximum requests per IP to the login pages and forms per window
+        :param global_rate_limit: Optional maximum requests per IP to any path per window
+        :param evaluation_window_seconds: Rate limit window, one of 60, 120, 300 or 600
+        :param forwarded_ip_header: Header holding the client IP, required when the load
+            balancer sits behind a proxy such as CloudFront. The proxy must overwrite the
+            header, and be the only way to reach the load balancer, as the header is
+            otherwise set by the client. X-Forwarded-For must not be used, WAF takes
+            its first address, which the client controls.
+        """
+        super().__init__(scope, construct_id)
+
+        stack_name = Stack.of(self).stack_name
+
+        def uri_path_match(value: str, positional_constraint: str):
+            return wafv2.CfnWebACL.StatementProperty(
+                byte_match_statement=wafv2.CfnWebACL.ByteMatchStatementProperty(
+                    field_to_match=wafv2.CfnWebACL.FieldToMatchProperty(uri_path={}),
+                    positional_constraint=positional_constraint,
+                    search_string=value,
+                    text_transformations=[
+                        wafv2.CfnWebACL.TextTransformationProperty(
+                            priority=0, type="URL_DECODE"
+                        ),
+                        wafv2.CfnWebACL.TextTransformationProperty(
+                            priority=1, type="LOWERCASE"
+                        ),
+                    ],
+                )
+            )
+
+        def rate_limit_rule(
+            name: str,
+            priority: int,
+            limit: int,
+            scope_down: Optional[wafv2.CfnWebACL.StatementProperty] = None,
+        ):
+            return wafv2.CfnWebACL.RuleProperty(
+                name=name,
+                priority=priority,
+                action=wafv2.CfnWebACL.RuleActionProperty(
+                    block=wafv2.CfnWebACL.BlockActionProperty(
+                        custom_response=wafv2.CfnWebACL.CustomResponseProperty(
+                            response_code=429
+                        )
+                    )
+                ),
+                statement=wafv2.CfnWebACL.StatementProperty(
+                    rate_based_statement=wafv2.CfnWebACL.RateBasedStatementProperty(
+                        aggregate_key_type="FORWARDED_IP" if forwarded_ip_header else "IP",
+                        forwarded_ip_config=(
+                            wafv2.CfnWebACL.ForwardedIPConfigurationProperty(
+                                header_name=forwarded_ip_header,
+                                fallback_behavior="MATCH",
+                            )
+                            if forwarded_ip_header
+                            else None
+                        ),
+                        limit=limit,
+                        evaluation_window_sec=evaluation_window_seconds,
+                        scope_down_statement=scope_down,
+                    )
+                ),
+                visibility_config=wafv2.CfnWebACL.VisibilityConfigProperty(
+                    cloud_watch_metrics_enabled=True,
+                    metric_name=f"{stack_name}-{name}",
+                    sampled_requests_enabled=True,
+                ),
+            )
+
+        rules = [
+            # Token requests (all grant types, including refresh and client credentials)
+            rate_limit_rule(
+                "token-rate-limit",
+                0,
+                token_rate_limit,
+                uri_path_match("/protocol/openid-connect/token", "ENDS_WITH"),
+            ),
+            # Login pages and the login, registration and reset credential forms
+            rate_limit_rule(
+                "login-rate-limit",
+                1,
+                login_rate_limit,
+                wafv2.CfnWebACL.StatementProperty(
+                    or_statement=wafv2.CfnWebACL.OrStatementProperty(
+                        statements=[
+                            uri_path_match("/protocol/openid-connect/auth", "ENDS_WITH"),
+                            uri_path_match("/login-actions/", "CONTAINS"),
+                        ]
+                    )
+                ),
+            ),
+        ]
+        if global_rate_limit:
+            rules.append(rate_limit_rule("global-rate-limit", 2, global_rate_limit))
+
+        web_acl = wafv2.CfnWebACL(
+            self,
+            "WebAcl",
+            scope="REGIONAL",
+            default_action=wafv2.CfnWebACL.DefaultActionProperty(allow={}),
+            rules=rules,
+            visibility_config=wafv2.CfnWebACL.VisibilityConfigProperty(
+                cloud_watch_metrics_enabled=True,
+                metric_name=f"{stack_name}-web-acl",
+                sampled_requests_enabled=True,
+            ),
+        )
+
+        wafv2.CfnWebACLAssociation(
+            self,
+            "WebAclAssociation",
+            resource_arn=alb.load_balancer_arn,
+            web_acl_arn=web_acl.attr_arn,
+        )
@@ -9,11 +9,13 @@ from aws_cdk import (
     aws_ecs_patterns as ecs_patterns,
     aws_elasticloadbalancingv2 as elbv2,
     aws_iam as iam,
-    aws_ecr_assets as ecr_assets,
     CfnOutput,
 )
 from constructs import Construct
 
+from lib.architecture import image_platform, runtime_platform
+from lib.settings import Architecture
+
 class SesRelayStack(NestedStack):
     def __init__(
         self,
@@ -22,6 +24,7 @@ class SesRelayStack(NestedStack):
         *,
         vpc: ec2.IVpc,
         ses_relay_app_dir: Optional[str] = None,
+        architecture: Architecture = "amd64",
         **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -46,7 +49,7 @@ class SesRelayStack(NestedStack):
         task_image_options=ecs_patterns.NetworkLoadBalancedTaskImageOptions(
             image=ecs.ContainerImage.from_asset(
                     directory=ses_relay_app_dir,
-                    platform=ecr_assets.Platform.LINUX_AMD64,
+                    platform=image_platform(architecture),
                 ),
             container_name="SesRelayContainer",
             container_port=10025,
@@ -84,6 +87,7 @@ class SesRelayStack(NestedStack):
             desired_count=1,
             memory_limit_mib=2048,
             cpu=1024,
+            runtime_platform=runtime_platform(architecture),
             listener_port=10025,
             load_balancer=nlb,
         )
@@ -1,8 +1,357 @@
-from typing import Optional
-from pydantic import DirectoryPath, Field, field_validator
+from typing import Literal, Optional
+from pydantic import (
+    BaseModel,
+    DirectoryPath,
+    Field,
+    NonNegativeInt,
+    PositiveInt,
+    field_validator,
+)
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class KeycloakCacheSettings(BaseModel):
+    """
+    Infinispan cache and persistent user session tuning. Larger caches trade task
+    memory for fewer database round trips. The cache sizes only apply with the custom
+    cache configuration. Set via e.g. KEYCLOAK_CACHE__CUSTOM_CONFIG=true and
+    KEYCLOAK_CACHE__USERS_MAX_COUNT.
+    """
+
+    # Use keycloak/conf/cache-ispn.xml rendered with the sizes below instead of
+    # Keycloak's stock cache configuration
+    custom_config: bool = False
+    # Maximum entries of the local realm, user and authorization caches
+    realms_max_count: PositiveInt = 10000
+    users_max_count: PositiveInt = 10000
+    authorization_max_count: PositiveInt = 10000
+    # Maximum in-memory entries of each (persistent) user and client session cache
+    sessions_max_count: PositiveInt = 10000
+    # Number of copies of each session cache entry held across the cluster
+    session_owners: PositiveInt = 2
+    # Batch writes of session changes to the database, with an optional batch size
+    # (Keycloak defaults to the number of CPUs)
+    persistent_sessions_use_batches: bool = True
+    persistent_sessions_max_batch_size: Optional[PositiveInt] = None
+
+    @property
+    def build_args(self) -> dict[str, str]:
+        """
+        Build arguments that render the cache configuration into the Keycloak image.
+        """
+        return {
+            "CACHE_CONFIG_FILE": (
+                "cache-ispn-custom.xml" if self.custom_config else "cache-ispn.xml"
+            ),
+            "CACHE_REALMS_MAX_COUNT": str(self.realms_max_count),
+            "CACHE_USERS_MAX_COUNT": str(self.users_max_count),
+            "CACHE_AUTHORIZATION_MAX_COUNT": str(self.authorization_max_count),
+            "CACHE_SESSIONS_MAX_COUNT": str(self.sessions_max_count),
+            "CACHE_SESSION_OWNERS": str(self.session_owners),
+        }
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """
+        Runtime options for the Keycloak container.
+        """
+        environment = {
+            "KC_SPI_USER_SESSIONS_INFINISPAN_USE_BATCHES": str(
+                self.persistent_sessions_use_batches
+            ).lower(),
+        }
+        if self.persistent_sessions_max_batch_size:
+            environment["KC_SPI_USER_SESSIONS_INFINISPAN_MAX_BATCH_SIZE"] = str(
+                self.persistent_sessions_max_batch_size
+            )
+        return environment
+
+
+class KeycloakHttpSettings(BaseModel):
+    """
+    Keycloak's HTTP server behind the load balancer. Set via e.g.
+    KEYCLOAK_HTTP__POOL_MAX_THREADS=100 and KEYCLOAK_HTTP__IDLE_TIMEOUT_SECONDS=120.
+    """
+
+    # Maximum worker threads serving requests (Keycloak defaults to 4 per CPU, at least 50)
+    pool_max_threads: Optional[PositiveInt] = None
+    # Idle timeout of the load balancer's connections. Keycloak keeps idle connections
+    # open a little longer, so that the load balancer is always the one to close them.
+    idle_timeout_seconds: PositiveInt = Field(default=60, le=4000)
+    compression_enabled: bool = True
+
+    @property
+    def keycloak_idle_timeout_seconds(self) -> int:
+        return self.idle_timeout_seconds + 15
+
+    @property
+    def build_args(self) -> dict[str, str]:
+        """
+        Build arguments that render the HTTP server options into the Keycloak image.
+        """
+        return {
+            "HTTP_COMPRESSION_ENABLED": str(self.compression_enabled).lower(),
+            "HTTP_IDLE_TIMEOUT_SECONDS": str(self.keycloak_idle_timeout_seconds),
+        }
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """
+        Runtime options for the Keycloak container.
+        """
+        if not self.pool_max_threads:
+            return {}
+        return {"KC_HTTP_POOL_MAX_THREADS": str(self.pool_max_threads)}
+
+
+class WafSettings(BaseModel):
+    """
+    Per-IP rate limits enforced by a WAF in front of the Keycloak load balancer.
+    Set via e.g. WAF__ENABLED=true and WAF__TOKEN_RATE_LIMIT=600.
+    """
+
+    enabled: bool = False
+    # Requests allowed per client IP within each evaluation window
+    token_rate_limit: PositiveInt = 300
+    login_rate_limit: PositiveInt = 100
+    global_rate_limit: Optional[PositiveInt] = None
+    evaluation_window_seconds: Literal[60, 120, 300, 600] = 300
+
+
+class LoggingSettings(BaseModel):
+    """
+    Retention of the Keycloak and config task log groups, and HTTP access logging.
+    Set via e.g. LOGGING__RETENTION_DAYS=90.
+    """
+
+    retention_days: Literal[7, 14, 30, 60, 90, 180, 365, 731, 1827, 3653] = 365
+    # Log every request with its duration, used by the slow requests query. Ignored
+    # before Keycloak 26.1, which has no access log
+    access_log_enabled: bool = True
+
+
+class ProfilingSettings(BaseModel):
+    """
+    Java Flight Recorder in the Keycloak tasks. A continuous recording with the low
+    overhead "default" settings keeps the most recent events in a ring buffer, which
+    bin/jfr.py dumps to S3 on demand. Disabled by default, as bin/jfr.py needs ECS Exec,
+    a shell into every Keycloak task. Set via e.g. PROFILING__ENABLED=true.
+    """
+
+    # ECS Exec, the recordings bucket and the continuous recording
+    enabled: bool = False
+    continuous_recording: bool = True
+    # Events older than this, or beyond this size, are dropped from the recording
+    max_age_minutes: PositiveInt = 30
+    max_size_mb: PositiveInt = 250
+    # Days before uploaded recordings are deleted from the profiling bucket
+    recordings_retention_days: PositiveInt = 30
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """
+        Runtime options for the Keycloak container.
+        """
+        if not (self.enabled and self.continuous_recording):
+            return {}
+        return {
+            "JAVA_OPTS_APPEND": (
+                "-XX:StartFlightRecording=name=continuous,settings=default,"
+                f"maxage={self.max_age_minutes}m,maxsize={self.max_size_mb}m "
+                "-XX:FlightRecorderOptions=repository=/tmp/jfr"
+            ),
+        }
+
+
+class TracingSettings(BaseModel):
+    """
+    OpenTelemetry tracing of Keycloak requests, database queries and the outbound calls
+    of the custom providers, exported to X-Ray by a collector sidecar. Set via e.g.
+    TRACING__ENABLED=true and TRACING__SAMPLING_RATIO=0.1.
+    """
+
+    enabled: bool = False
+    # Share of requests traced, unless the caller already decided (parent based sampling)
+    sampling_ratio: float = Field(default=0.05, ge=0, le=1)
+
+    @property
+    def build_args(self) -> dict[str, str]:
+        """
+        Build arguments of the Keycloak image, tracing is a build time option.
+        """
+        return {"TRACING_ENABLED": str(self.enabled).lower()}
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """
+        Runtime options for the Keycloak container, which exports to the collector
+        sidecar on localhost.
+        """
+        if not self.enabled:
+            return {}
+        return {
+            "KC_TRACING_ENDPOINT": "http://localhost:4317",
+            "KC_TRACING_SAMPLER_TYPE": "parentbased_traceidratio",
+            "KC_TRACING_SAMPLER_RATIO": str(self.sampling_ratio),
+        }
+
+
+class EmailSettings(BaseModel):
+    """
+    How Keycloak sends email. "smtp" uses the realm's SMTP server (the SES relay), "ses"
+    calls the SES v2 API directly with the Keycloak task role, ignoring the realm's SMTP
+    server settings. Set via e.g. EMAIL__SENDER=ses and EMAIL__SES_RELAY_ENABLED=false.
+    """
+
+    sender: Literal["smtp", "ses"] = "smtp"
+    # Region of the SES identities, defaults to the region of the stack
+    ses_region: Optional[str] = None
+    ses_configuration_set: Optional[str] = None
+    # Attempts of each send, throttled and failed requests are retried with backoff
+    ses_max_attempts: PositiveInt = 4
+    # The SMTP relay (SesRelayStack) is only needed by the "smtp" sender
+    ses_relay_enabled: bool = True
+
+    @property
+    def build_args(self) -> dict[str, str]:
+        """
+        Build arguments of the Keycloak image, the default email sender is a build option.
+        """
+        return {
+            "EMAIL_SENDER_PROVIDER": "ses-email" if self.sender == "ses" else "default",
+        }
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """
+        Runtime options for the Keycloak container.
+        """
+        if self.sender != "ses":
+            return {}
+        environment = {
+            "KC_SPI_EMAIL_SENDER_SES_EMAIL_MAX_ATTEMPTS": str(self.ses_max_attempts),
+            # New user notifications, see the email-on-user-creation provider
+            "KC_SPI_EVENTS_LISTENER_EMAIL_ON_USER_CREATION_EMAIL_SENDER": "ses-email",
+        }
+        if self.ses_region:
+            environment["KC_SPI_EMAIL_SENDER_SES_EMAIL_REGION"] = self.ses_region
+        if self.ses_configuration_set:
+            environment["KC_SPI_EMAIL_SENDER_SES_EMAIL_CONFIGURATION_SET"] = (
+                self.ses_configuration_set
+            )
+        return environment
+
+
+class RealmRetentionSettings(BaseModel):
+    """
+    Retention overrides of a single realm, unset values fall back to the defaults.
+    """
+
+    event_days: Optional[NonNegativeInt] = None
+    admin_event_days: Optional[NonNegativeInt] = None
+    offline_session_idle_days: Optional[NonNegativeInt] = None
+
+
+class DatabaseMaintenanceSettings(BaseModel):
+    """
+    Scheduled pruning, vacuuming and reindexing of the Keycloak event and session tables.
+    Retention is in days, 0 keeps the rows indefinitely. Pruning is opt in, by default
+    nothing is deleted and the task only vacuums, reindexes and publishes metrics. Set via
+    e.g. DB_MAINTENANCE__ENABLED=true and DB_MAINTENANCE__EVENT_DAYS=30 or
+    DB_MAINTENANCE__REALMS='{"veda": {"event_days": 7}}'.
+    """
+
+    enabled: bool = False
+    # EventBridge schedule expression, in UTC
+    schedule: str = "cron(0 8 * * ? *)"
+    event_days: NonNegativeInt = 0
+    admin_event_days: NonNegativeInt = 0
+    # Offline sessions not refreshed within this many days
+    offline_session_idle_days: NonNegativeInt = 0
+    realms: dict[str, RealmRetentionSettings] = {}
+    # B-tree indexes of the hot tables above this size are rebuilt once their average
+    # leaf density (%) drops below the maximum
+    reindex_min_size_mb: NonNegativeInt = 64
+    reindex_max_leaf_density: PositiveInt = Field(default=70, le=100)
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """
+        Environment of the maintenance task, see db_maintenance/maintenance.py.
+        """
+        return {
+            "RETENTION": self.model_dump_json(
+                include={
+                    "event_days",
+                    "admin_event_days",
+                    "offline_session_idle_days",
+                    "realms",
+                },
+                exclude_none=True,
+            ),
+            "REINDEX_MIN_SIZE_MB": str(self.reindex_min_size_mb),
+            "REINDEX_MAX_LEAF_DENSITY": str(self.reindex_max_leaf_density),
+        }
+
+
+# CPU architecture of a container image and the Fargate tasks that run it
+Architecture = Literal["amd64", "arm64"]
+
+
+class LazyLoadingSettings(BaseModel):
+    """
+    Seekable OCI (SOCI) indexes of the container images, built at deploy time so that
+    Fargate lazily loads the image layers and starts the container before the whole
+    image is pulled. Opt in, set via e.g. LAZY_LOADING__KEYCLOAK=true.
+    """
+
+    keycloak: bool = False
+    config_cli: bool = False
+
+
+class ConfigCliSettings(BaseModel):
+    """
+    Size of the keycloak-config-cli task and how many realm files it imports at once.
+    By default the files are imported one after the other, as before. With a higher
+    concurrency, each file is imported by its own keycloak-config-cli process, the
+    master realm first (see keycloak-config-cli/import-realms.sh), and the task needs
+    to be sized for the concurrent JVMs. Set via e.g. CONFIG_CLI__IMPORT_CONCURRENCY=4,
+    CONFIG_CLI__CPU=1024 and CONFIG_CLI__MEMORY_LIMIT_MIB=2048.
+    """
+
+    import_concurrency: PositiveInt = 1
+    cpu: Literal[256, 512, 1024, 2048, 4096] = 256
+    memory_limit_mib: PositiveInt = 512
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """
+        Environment of the keycloak-config-cli container.
+        """
+        if self.import_concurrency == 1:
+            return {"IMPORT_CONCURRENCY": "1"}
+        return {
+            "IMPORT_CONCURRENCY": str(self.import_concurrency),
+            # Shares the task memory between the concurrent JVMs, leaving room for
+            # their non-heap memory
+            "JAVA_TOOL_OPTIONS": (
+                f"-XX:MaxRAMPercentage={max(5, 60 // self.import_concurrency)}"
+            ),
+        }
+
+
+class ArchitectureSettings(BaseModel):
+    """
+    CPU architecture of each service, ARM64 runs on Graviton Fargate capacity.
+    Set via e.g. ARCHITECTURE__KEYCLOAK=arm64.
+    """
+
+    keycloak: Architecture = "amd64"
+    config_cli: Architecture = "amd64"
+    ses_relay: Architecture = "amd64"
+    db_maintenance: Architecture = "amd64"
+
+
 class Settings(BaseSettings):
     aws_account_id: str
     aws_region: str = "us-west-2"
@@ -24,7 +373,24 @@ class Settings(BaseSettings):
     configure_route53: Optional[bool] = True
     alb_access_logs_bucket: Optional[str] = None
     alb_access_logs_prefix: Optional[str] = None
+    # ACM certificate in us-east-1 for the hostname, enables the CloudFront distribution
+    cdn_certificate_arn: Optional[str] = Field(
+        default=None,
+        pattern=r"^arn:aws:acm:us-east-1:\d{12}:certificate/.+$",
+    )
     
+    keycloak_cache: KeycloakCacheSettings = KeycloakCacheSettings()
+    keycloak_http: KeycloakHttpSettings = KeycloakHttpSettings()
+    waf: WafSettings = WafSettings()
+    architecture: ArchitectureSettings = ArchitectureSettings()
+    lazy_loading: LazyLoadingSettings = LazyLoadingSettings()
+    config_cli: ConfigCliSettings = ConfigCliSettings()
+    logging: LoggingSettings = LoggingSettings()
+    profiling: ProfilingSettings = ProfilingSettings()
+    tracing: TracingSettings = TracingSettings()
+    email: EmailSettings = EmailSettings()
+    db_maintenance: DatabaseMaintenanceSettings = DatabaseMaintenanceSettings()
+
     @field_validator("rds_snapshot_identifier", mode="before")
     @classmethod
     def convert_empty_string_to_none(cls, v):
@@ -32,7 +398,9 @@ class Settings(BaseSettings):
             return None
         return v
 
-    model_config = SettingsConfigDict(extra="ignore")
+    model_config = SettingsConfigDict(
+        extra="ignore", env_nested_delimiter="__", env_ignore_empty=True
+    )
 
     @property
     def is_production(self) -> bool:
@@ -1,44 +1,115 @@
 import logging
 import os
 import re
+from dataclasses import dataclass, field
+from typing import Mapping, Optional
+
 import yaml
 
+OAUTH_SECRET_PREFIX = "IDP_SECRET_ARN_"
+APPLICATION_ROLE_ARN_PREFIX = "APPLICATION_ROLE_ARN_"
+SEND_EMAIL_ADDRESS_PREFIX = "KEYCLOAK_SEND_EMAIL_ADDRESS_"
+# Client attribute that makes Keycloak issue lightweight access tokens to the client,
+# which only contain the claims of protocol mappers with lightweight.claim: "true"
+LIGHTWEIGHT_ACCESS_TOKEN_ATTRIBUTE = "client.use.lightweight.access.token.enabled"
+
+
+@dataclass
+class DeploymentEnvironment:
+    """
+    Deployment values that are provided as families of prefixed environment variables
+    rather than as individual settings.
+    """
+
+    # Client slug -> IdP client secret ARN
+    idp_oauth_client_secrets: dict[str, str] = field(default_factory=dict)
+    # Client id -> application role ARNs
+    application_role_arns: dict[str, list[str]] = field(default_factory=dict)
+    # KEYCLOAK_EMAIL_ADDRESS_<REALM> -> send email address
+    send_email_addresses: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_environ(
+        cls, environ: Optional[Mapping[str, str]] = None
+    ) -> "DeploymentEnvironment":
+        """
+        Collects all prefixed variables in a single pass over the environment.
+        """
+        env = cls()
+
+        for key, value in (os.environ if environ is None else environ).items():
+            if key.startswith(OAUTH_SECRET_PREFIX):
+                # The client slug is the remainder of the key after the prefix
+                client_slug = key[len(OAUTH_SECRET_PREFIX) :]
+                env.idp_oauth_client_secrets[client_slug] = value
+            elif key.startswith(APPLICATION_ROLE_ARN_PREFIX):
+                env_suffix = key[len(APPLICATION_ROLE_ARN_PREFIX) :]
+                # example: convert AIRFLOW_INGEST_API to airflow-ingest-api
+                client_id = env_suffix.lower().replace("_", "-")
+                # value can be comma separated list of ARNs
+                arns = [arn.strip() for arn in value.split(",") if arn.strip()]
+                env.application_role_arns[client_id] = arns
+            elif key.startswith(SEND_EMAIL_ADDRESS_PREFIX):
+                realm = key.split("_")[-1].upper()
+                env.send_email_addresses[f"KEYCLOAK_EMAIL_ADDRESS_{realm}"] = str(value)
+
+        return env
+
 
 def get_oauth_secrets() -> dict[str, str]:
     """
     Extracts OAuth client secrets from environment variables starting with 'IDP_SECRET_ARN_'.
     Returns a dictionary mapping each client slug to its secret ARN.
     """
-    oauth_secret_prefix = "IDP_SECRET_ARN_"
-    client_secrets = {}
-
-    for key, value in os.environ.items():
-        if key.startswith(oauth_secret_prefix):
-            # The client slug is the remainder of the key after the prefix
-            client_slug = key[len(oauth_secret_prefix) :]
-            client_secrets[client_slug] = value
+    return DeploymentEnvironment.from_environ().idp_oauth_client_secrets
 
-    return client_secrets
 
-
-def get_private_client_ids(config_dir: str) -> list[dict[str, str]]:
+def load_realm_configs(config_dir: str) -> dict[str, dict]:
     """
-    Reads all YAML files in a directory, extracts clients with a 'secret',
-    and returns a list of {'realm': <realm>, 'id': <clientId>} objects.
+    Parses every YAML file in a directory in a single pass.
+    Returns a dictionary mapping each filename to its parsed realm configuration.
     """
-    client_ids = []
+    # Prefer the libyaml-backed loader when available, it is an order of magnitude faster
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    realm_configs = {}
 
     # List YAML/YML files
     for filename in os.listdir(config_dir):
         if not filename.endswith(".yaml") and not filename.endswith(".yml"):
             logging.debug("Ignoring %s due to filename extension", filename)
+            continue
 
         # Parse the YAML file
         file_path = os.path.join(config_dir, filename)
         with open(file_path, "r", encoding="utf-8") as f:
             logging.debug("Parsing %s", filename)
-            data = yaml.safe_load(f)
+            realm_configs[filename] = yaml.load(f, Loader=loader)
+
+    return realm_configs
+
 
+def get_private_client_ids(config_dir: str) -> list[dict[str, str]]:
+    """
+    Reads all YAML files in a directory, extracts clients with a 'secret',
+    and returns a list of {'realm': <realm>, 'id': <clientId>} objects.
+    """
+    client_ids = extract_private_client_ids(load_realm_configs(config_dir))
+
+    # Validate each extracted clientId
+    for client in client_ids:
+        validate_client_id(client["id"])
+
+    return client_ids
+
+
+def extract_private_client_ids(realm_configs: dict[str, dict]) -> list[dict[str, str]]:
+    """
+    Extracts clients with a 'secret' from already parsed realm configurations
+    and returns a list of {'realm': <realm>, 'id': <clientId>} objects.
+    """
+    client_ids = []
+
+    for filename, data in realm_configs.items():
         if data and isinstance(data.get("clients"), list):
             for client in data["clients"]:
                 # Only collect clients that have a 'secret' field
@@ -57,10 +128,6 @@ def get_private_client_ids(config_dir: str) -> list[dict[str, str]]:
                             filename,
                         )
 
-    # Validate each extracted clientId
-    for client in client_ids:
-        validate_client_id(client["id"])
-
     return client_ids
 
 def get_application_role_arns() -> dict[str, list[str]]:
@@ -68,28 +135,14 @@ def get_application_role_arns() -> dict[str, list[str]]:
     Extracts application role ARNs from environment variables starting with 'APPLICATION_ROLE_ARN_'.
     Returns a dictionary mapping each client id to its app role ARN.
     """
-    app_role_arn_prefix = "APPLICATION_ROLE_ARN_"
-    app_role_arns = {}
-    for key, value in os.environ.items(): # value can be comma separated list of ARNs
-        if key.startswith(app_role_arn_prefix):
-            env_suffix = key[len(app_role_arn_prefix) :]
-            client_id = env_suffix.lower().replace("_", "-") # example: convert AIRFLOW_INGEST_API to airflow-ingest-api
-            arns = [arn.strip() for arn in value.split(",") if arn.strip()]
-            app_role_arns[client_id] = arns
-    return app_role_arns
+    return DeploymentEnvironment.from_environ().application_role_arns
 
 def get_send_email_addresses() -> dict[str, str]:
     """
     Extracts send email addresses from environment variables starting with 'KEYCLOAK_SEND_EMAIL_ADDRESS_'.
     Returns a dictionary mapping each realm to its email address.
     """
-    send_email_addresses = {}
-    send_email_address_prefix = "KEYCLOAK_SEND_EMAIL_ADDRESS_"
-    for key, value in os.environ.items():
-        if key.startswith(send_email_address_prefix):
-            realm = key.split("_")[-1].upper()
-            send_email_addresses[f"KEYCLOAK_EMAIL_ADDRESS_{realm}"] = str(value)
-    return send_email_addresses
+    return DeploymentEnvironment.from_environ().send_email_addresses
 
 
 def validate_client_id(client_id: str) -> None:
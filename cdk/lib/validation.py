@@ -0,0 +1,348 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from .utils import (
+    LIGHTWEIGHT_ACCESS_TOKEN_ATTRIBUTE,
+    client_id_to_env_var,
+    extract_private_client_ids,
+    get_oauth_secrets,
+    validate_client_id,
+)
+
+# Matches keycloak-config-cli variable substitutions, e.g. $(env:GRAFANA_CLIENT_SECRET)
+# or $(env:GH_ADMIN_TEAM:-"veda-auth"). The second group captures an optional default.
+ENV_VAR_PATTERN = re.compile(r"\$\(env:([A-Za-z_][A-Za-z0-9_]*)(:-[^)]*)?\)")
+
+# Client scopes that Keycloak creates in every realm, these may be referenced
+# by clients without being declared within the realm configuration.
+BUILTIN_CLIENT_SCOPES = {
+    "acr",
+    "address",
+    "basic",
+    "email",
+    "microprofile-jwt",
+    "offline_access",
+    "organization",
+    "phone",
+    "profile",
+    "role_list",
+    "roles",
+    "saml_organization",
+    "service_account",
+    "web-origins",
+}
+
+# Subset of Keycloak's RealmRepresentation. Keys mapped to `object` are known
+# but their type is not checked. Unknown keys are reported as warnings.
+REALM_SCHEMA: dict[str, Any] = {
+    "realm": str,
+    "enabled": bool,
+    "displayName": str,
+    "displayNameHtml": str,
+    "loginTheme": str,
+    "accountTheme": str,
+    "adminTheme": str,
+    "emailTheme": str,
+    "loginWithEmailAllowed": bool,
+    "registrationAllowed": bool,
+    "registrationEmailAsUsername": bool,
+    "rememberMe": bool,
+    "verifyEmail": bool,
+    "resetPasswordAllowed": bool,
+    "editUsernameAllowed": bool,
+    "duplicateEmailsAllowed": bool,
+    "bruteForceProtected": bool,
+    "sslRequired": str,
+    "eventsEnabled": bool,
+    "eventsExpiration": int,
+    "adminEventsEnabled": bool,
+    "adminEventsDetailsEnabled": bool,
+    "eventsListeners": list,
+    "enabledEventTypes": list,
+    "clients": list,
+    "clientScopes": list,
+    "clientScopeMappings": dict,
+    "scopeMappings": list,
+    "defaultDefaultClientScopes": list,
+    "defaultOptionalClientScopes": list,
+    "roles": dict,
+    "groups": list,
+    "defaultGroups": list,
+    "users": list,
+    "identityProviders": list,
+    "identityProviderMappers": list,
+    "authenticationFlows": list,
+    "authenticatorConfig": list,
+    "requiredActions": list,
+    "components": dict,
+    "attributes": dict,
+    "smtpServer": dict,
+    "browserSecurityHeaders": dict,
+    "internationalizationEnabled": bool,
+    "supportedLocales": list,
+    "defaultLocale": str,
+    "browserFlow": str,
+    "registrationFlow": str,
+    "directGrantFlow": str,
+    "resetCredentialsFlow": str,
+    "clientAuthenticationFlow": str,
+    "dockerAuthenticationFlow": str,
+    "firstBrokerLoginFlow": str,
+    "userManagedAccessAllowed": bool,
+    "organizationsEnabled": bool,
+    "passwordPolicy": str,
+    "accessTokenLifespan": int,
+    "ssoSessionIdleTimeout": int,
+    "ssoSessionMaxLifespan": int,
+    "offlineSessionIdleTimeout": int,
+    "offlineSessionMaxLifespan": int,
+    "offlineSessionMaxLifespanEnabled": bool,
+    "defaultRole": object,
+    "id": object,
+}
+
+# Subset of Keycloak's ClientRepresentation.
+CLIENT_SCHEMA: dict[str, Any] = {
+    "clientId": str,
+    "id": str,
+    "name": str,
+    "description": str,
+    "enabled": bool,
+    "publicClient": bool,
+    "bearerOnly": bool,
+    "consentRequired": bool,
+    "secret": str,
+    "clientAuthenticatorType": str,
+    "rootUrl": str,
+    "baseUrl": str,
+    "adminUrl": str,
+    "redirectUris": list,
+    "webOrigins": list,
+    "protocol": str,
+    "fullScopeAllowed": bool,
+    "defaultClientScopes": list,
+    "optionalClientScopes": list,
+    "protocolMappers": list,
+    "attributes": dict,
+    "standardFlowEnabled": bool,
+    "implicitFlowEnabled": bool,
+    "directAccessGrantsEnabled": bool,
+    "serviceAccountsEnabled": bool,
+    "authorizationServicesEnabled": bool,
+    "authorizationSettings": dict,
+    "frontchannelLogout": bool,
+    "alwaysDisplayInConsole": bool,
+    "surrogateAuthRequired": bool,
+    "nodeReRegistrationTimeout": int,
+    "access": object,
+}
+
+
+@dataclass
+class ValidationResult:
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def get_client_secret_env_vars(
+    realm_configs: dict[str, dict],
+    idp_oauth_client_secrets: Optional[dict[str, str]] = None,
+) -> set[str]:
+    """
+    Returns the names of the environment variables that KeycloakConfig injects into the
+    config task from Secrets Manager, e.g. GRAFANA_CLIENT_ID and GRAFANA_CLIENT_SECRET.
+    """
+    if idp_oauth_client_secrets is None:
+        idp_oauth_client_secrets = get_oauth_secrets()
+
+    client_slugs = [
+        client["id"] for client in extract_private_client_ids(realm_configs)
+    ] + list(idp_oauth_client_secrets.keys())
+
+    return {
+        f"{client_id_to_env_var(client_slug)}_CLIENT_{key}"
+        for client_slug in client_slugs
+        for key in ["ID", "SECRET"]
+    }
+
+
+def validate_realm_configs(
+    realm_configs: dict[str, dict],
+    available_env_vars: set[str],
+) -> ValidationResult:
+    """
+    Validates parsed realm configurations without contacting Keycloak or AWS. Checks
+    structure against REALM_SCHEMA/CLIENT_SCHEMA, that every $(env:...) substitution
+    without a default can be resolved from available_env_vars, that clientIds are
+    unique, and that referenced client scopes exist.
+    """
+    result = ValidationResult()
+    realm_files: dict[str, str] = {}
+    private_client_realms: dict[str, str] = {}
+
+    for filename, data in realm_configs.items():
+        if not isinstance(data, dict):
+            result.errors.append(f"{filename}: expected a mapping at the top level")
+            continue
+
+        _check_schema(result, filename, data, REALM_SCHEMA, "realm")
+
+        realm = data.get("realm")
+        if not realm:
+            result.errors.append(f"{filename}: missing required key 'realm'")
+        elif realm in realm_files:
+            result.errors.append(
+                f"{filename}: realm '{realm}' is also defined in {realm_files[realm]}"
+            )
+        else:
+            realm_files[realm] = filename
+
+        _check_env_vars(result, filename, data, available_env_vars)
+
+        clients = data.get("clients") or []
+        if not isinstance(clients, list):
+            continue
+
+        known_scopes = BUILTIN_CLIENT_SCOPES | {
+            scope.get("name")
+            for scope in data.get("clientScopes") or []
+            if isinstance(scope, dict)
+        }
+
+        seen_client_ids = set()
+        for index, client in enumerate(clients):
+            if not isinstance(client, dict):
+                result.errors.append(f"{filename}: clients[{index}] must be a mapping")
+                continue
+
+            client_id = client.get("clientId")
+            location = f"clients[{index}]" if not client_id else f"client '{client_id}'"
+            _check_schema(result, filename, client, CLIENT_SCHEMA, location)
+
+            if not client_id:
+                result.errors.append(f"{filename}: {location} is missing 'clientId'")
+                continue
+
+            if client_id in seen_client_ids:
+                result.errors.append(f"{filename}: duplicate clientId '{client_id}'")
+            seen_client_ids.add(client_id)
+
+            if "secret" in client:
+                try:
+                    validate_client_id(client_id)
+                except ValueError as e:
+                    result.errors.append(f"{filename}: {e}")
+
+                # Client secrets are named after the clientId alone, so private
+                # clients must be unique across every realm in the stage.
+                other_realm = private_client_realms.get(client_id)
+                if other_realm is not None and other_realm != realm:
+                    result.errors.append(
+                        f"{filename}: private clientId '{client_id}' is also used in "
+                        f"realm '{other_realm}', their client secrets would collide"
+                    )
+                private_client_realms.setdefault(client_id, realm)
+
+            _check_lightweight_access_token(result, filename, client, location)
+
+            for key in ["defaultClientScopes", "optionalClientScopes"]:
+                for scope in client.get(key) or []:
+                    if scope not in known_scopes:
+                        result.errors.append(
+                            f"{filename}: {location} references unknown client "
+                            f"scope '{scope}' in {key}"
+                        )
+
+        for client_id, mappings in (data.get("clientScopeMappings") or {}).items():
+            for mapping in mappings or []:
+                scope = mapping.get("clientScope") if isinstance(mapping, dict) else None
+                if scope not in known_scopes:
+                    result.errors.append(
+                        f"{filename}: clientScopeMappings for '{client_id}' references "
+                        f"unknown client scope '{scope}'"
+                    )
+
+    return result
+
+
+def _check_lightweight_access_token(
+    result: ValidationResult,
+    filename: str,
+    client: dict,
+    location: str,
+) -> None:
+    # Client attributes and mapper configs are string maps, an unquoted YAML boolean
+    # would not be recognized by Keycloak
+    attributes = client.get("attributes") or {}
+    value = (
+        attributes.get(LIGHTWEIGHT_ACCESS_TOKEN_ATTRIBUTE)
+        if isinstance(attributes, dict)
+        else None
+    )
+    if value is not None and value not in ("true", "false"):
+        result.errors.append(
+            f"{filename}: {location} attribute '{LIGHTWEIGHT_ACCESS_TOKEN_ATTRIBUTE}' "
+            f"should be \"true\" or \"false\", got {value!r}"
+        )
+
+    for mapper in client.get("protocolMappers") or []:
+        config = (mapper.get("config") if isinstance(mapper, dict) else None) or {}
+        value = config.get("lightweight.claim")
+        if value is not None and value not in ("true", "false"):
+            result.errors.append(
+                f"{filename}: {location} protocol mapper '{mapper.get('name')}' "
+                f"lightweight.claim should be \"true\" or \"false\", got {value!r}"
+            )
+
+
+def _check_schema(
+    result: ValidationResult,
+    filename: str,
+    data: dict,
+    schema: dict[str, Any],
+    location: str,
+) -> None:
+    for key, value in data.items():
+        if key not in schema:
+            result.warnings.append(f"{filename}: unknown key '{key}' in {location}")
+            continue
+
+        expected_type = schema[key]
+        # Substitutions are resolved by keycloak-config-cli before the value is typed
+        if isinstance(value, str) and ENV_VAR_PATTERN.search(value):
+            continue
+        # bool is a subclass of int, don't accept it where a number is expected
+        if value is not None and (
+            not isinstance(value, expected_type)
+            or (expected_type is int and isinstance(value, bool))
+        ):
+            result.errors.append(
+                f"{filename}: '{key}' in {location} should be of type "
+                f"{expected_type.__name__}, got {type(value).__name__}"
+            )
+
+
+def _check_env_vars(
+    result: ValidationResult,
+    filename: str,
+    data: Any,
+    available_env_vars: set[str],
+) -> None:
+    if isinstance(data, dict):
+        for value in data.values():
+            _check_env_vars(result, filename, value, available_env_vars)
+    elif isinstance(data, list):
+        for value in data:
+            _check_env_vars(result, filename, value, available_env_vars)
+    elif isinstance(data, str):
+        for name, default in ENV_VAR_PATTERN.findall(data):
+            if not default and name not in available_env_vars:
+                result.errors.append(
+                    f"{filename}: $(env:{name}) has no matching client secret or "
+                    "configuration variable"
+                )
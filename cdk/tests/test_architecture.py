@@ -0,0 +1,199 @@
+"""
+Synthesizes the Keycloak stack with a different CPU architecture for each service and
+asserts the runtime platform of each service's task definition, and the platform its
+container images are built for.
+
+Usage, from the repository root:
+    python -m unittest discover -s cdk/tests -t cdk
+"""
+
+import glob
+import json
+import os
+import unittest
+
+from aws_cdk import App, Stack, aws_ecs as ecs
+from aws_cdk.assertions import Template
+
+from lib.keycloak import KeycloakStack
+from lib.settings import (
+    ArchitectureSettings,
+    DatabaseMaintenanceSettings,
+    LazyLoadingSettings,
+    Settings,
+)
+
+# Expected CpuArchitecture of the task definitions
+CPU_ARCHITECTURES = {"amd64": "X86_64", "arm64": "ARM64"}
+
+# Expected platform of the image assets
+IMAGE_PLATFORMS = {"amd64": "linux/amd64", "arm64": "linux/arm64"}
+
+# Construct id of each service (a nested stack for the SES relay) -> architecture setting
+SERVICES = {
+    "service": "keycloak",
+    "config": "config_cli",
+    "db-maintenance": "db_maintenance",
+    "ses-relay": "ses_relay",
+}
+
+
+def synth(architecture: ArchitectureSettings, lazy_loading: bool) -> KeycloakStack:
+    # Paths of the settings are relative to the repository root
+    settings = Settings(
+        _env_file=None,
+        aws_account_id="123456789012",
+        ssl_certificate_arn="arn:aws:acm:us-west-2:123456789012:certificate/test",
+        hostname="https://keycloak.example.com",
+        configure_route53=False,
+        architecture=architecture,
+        # Opt in, so that the maintenance task is part of the stack
+        db_maintenance=DatabaseMaintenanceSettings(enabled=True),
+    )
+    return KeycloakStack(
+        App(),
+        "test",
+        is_production=settings.is_production,
+        stage=settings.stage,
+        hostname=settings.hostname,
+        ssl_certificate_arn=settings.ssl_certificate_arn,
+        keycloak_version=settings.keycloak_version,
+        keycloak_app_dir=settings.keycloak_app_dir.as_posix(),
+        keycloak_config_cli_version=settings.keycloak_config_cli_version,
+        keycloak_config_cli_app_dir=settings.keycloak_config_cli_app_dir.as_posix(),
+        ses_relay_app_dir=settings.ses_relay_app_dir.as_posix(),
+        keycloak_send_email_addresses={},
+        idp_oauth_client_secrets={},
+        private_oauth_clients=[],
+        application_role_arns={},
+        configure_route53=settings.configure_route53,
+        architecture=settings.architecture,
+        lazy_loading=LazyLoadingSettings(keycloak=lazy_loading, config_cli=lazy_loading),
+        config_cli=settings.config_cli,
+        logging_settings=settings.logging,
+        profiling_settings=settings.profiling,
+        tracing_settings=settings.tracing,
+        email_settings=settings.email,
+        db_maintenance=settings.db_maintenance,
+        env={"account": settings.aws_account_id, "region": settings.aws_region},
+    )
+
+
+def task_definitions(stack: KeycloakStack, construct_id: str) -> list[tuple[dict, dict]]:
+    """
+    Returns the synthesized properties of each task definition of a service, along with
+    the resources of the template they are part of.
+    """
+    service = stack.node.find_child(construct_id)
+    template_stack = service if isinstance(service, Stack) else stack
+    resources = Template.from_stack(template_stack).to_json()["Resources"]
+    return [
+        (
+            resources[template_stack.get_logical_id(construct.node.default_child)][
+                "Properties"
+            ],
+            resources,
+        )
+        for construct in service.node.find_all()
+        if isinstance(construct, ecs.TaskDefinition)
+    ]
+
+
+def image_asset_platforms(stack: KeycloakStack) -> dict[str, str]:
+    """
+    Returns the platform of each container image asset of the app, by asset hash, from
+    the synthesized assets manifests.
+    """
+    assembly = stack.node.root.synth()
+    platforms = {}
+    for manifest in glob.glob(os.path.join(assembly.directory, "*.assets.json")):
+        with open(manifest, encoding="utf-8") as f:
+            images = json.load(f).get("dockerImages", {})
+        platforms.update(
+            {asset_hash: image["source"].get("platform") for asset_hash, image in images.items()}
+        )
+    return platforms
+
+
+def get_atts(value: object) -> list[str]:
+    """
+    Returns the logical ids of the resources a template value refers to with Fn::GetAtt.
+    """
+    if isinstance(value, dict):
+        ids = [value["Fn::GetAtt"][0]] if "Fn::GetAtt" in value else []
+        return ids + [logical_id for item in value.values() for logical_id in get_atts(item)]
+    if isinstance(value, list):
+        return [logical_id for item in value for logical_id in get_atts(item)]
+    return []
+
+
+def image_assets(image: object, resources: dict, asset_hashes: dict) -> list[str]:
+    """
+    Returns the hashes of the image assets a container image refers to. With lazy
+    loading, the image tag is an attribute of the SOCI index build, so the properties of
+    the resources it refers to are searched as well.
+    """
+    references = [json.dumps(image)] + [
+        json.dumps(resources[logical_id]["Properties"]) for logical_id in get_atts(image)
+    ]
+    return [
+        asset_hash
+        for asset_hash in asset_hashes
+        if any(asset_hash in reference for reference in references)
+    ]
+
+
+class RuntimePlatformTest(unittest.TestCase):
+    def test_runtime_platform_per_service(self):
+        # Each service gets the opposite architecture in the second synth, so a
+        # service reading another service's setting fails one of them. The images are
+        # lazy loaded in the second synth only, to cover both ways of referring to them
+        for architectures, lazy_loading in (
+            (
+                ArchitectureSettings(
+                    keycloak="arm64", config_cli="amd64", ses_relay="arm64", db_maintenance="amd64"
+                ),
+                False,
+            ),
+            (
+                ArchitectureSettings(
+                    keycloak="amd64", config_cli="arm64", ses_relay="amd64", db_maintenance="arm64"
+                ),
+                True,
+            ),
+        ):
+            stack = synth(architectures, lazy_loading)
+            asset_platforms = image_asset_platforms(stack)
+            for construct_id, setting in SERVICES.items():
+                architecture = getattr(architectures, setting)
+                with self.subTest(
+                    service=construct_id, architecture=architecture, lazy_loading=lazy_loading
+                ):
+                    task_defs = task_definitions(stack, construct_id)
+                    self.assertTrue(task_defs, f"No task definition in {construct_id}")
+                    for task_def, resources in task_defs:
+                        self.assertEqual(
+                            task_def["RuntimePlatform"],
+                            {
+                                "CpuArchitecture": CPU_ARCHITECTURES[architecture],
+                                "OperatingSystemFamily": "LINUX",
+                            },
+                        )
+                        # Images pulled from a registry, e.g. the AWS CLI of the config
+                        # task, are multi-platform and not built by the stack
+                        assets = [
+                            asset_hash
+                            for container in task_def["ContainerDefinitions"]
+                            for asset_hash in image_assets(
+                                container["Image"], resources, asset_platforms
+                            )
+                        ]
+                        self.assertTrue(assets, f"No image asset in {construct_id}")
+                        for asset_hash in assets:
+                            self.assertEqual(
+                                asset_platforms[asset_hash], IMAGE_PLATFORMS[architecture]
+                            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/bin/sh
+#
+# Entrypoint of the keycloak-config-cli image.
+#
+# With IMPORT_CONCURRENCY unset or 1, keycloak-config-cli imports the files matched by
+# IMPORT_FILES_LOCATIONS one after the other, as without this script.
+#
+# With a higher IMPORT_CONCURRENCY, each realm file matched by IMPORT_FILES_LOCATIONS
+# (directories are skipped) is imported by its own keycloak-config-cli process. The
+# master realm is imported first, as the other realms may depend on its clients and
+# identity providers. The remaining files are then imported concurrently, at most
+# IMPORT_CONCURRENCY at a time and the largest first. Each JSON log line is tagged
+# with the file it belongs to ("import_file"). The outcome of each file is logged as
+# "Import of file '<file>' finished with exit code <code> after <seconds>s", which
+# bin/apply-config.py reports per realm. Exits with 1 if the import of any file failed.
+
+set -eu
+
+JAR="${KEYCLOAK_CONFIG_CLI_JAR:-/app/keycloak-config-cli.jar}"
+CONCURRENCY="${IMPORT_CONCURRENCY:-1}"
+NL='
+'
+
+# Writes a JSON log line like those of keycloak-config-cli with the json-log profile
+log() {
+  printf '{"level":"%s","logger_name":"import-realms","import_file":"%s","message":"%s"}\n' "$1" "$2" "$3"
+}
+
+# Adds the file name to each JSON log line
+tag() {
+  awk -v file="$1" '{
+    if (substr($0, 1, 1) == "{") print "{\"import_file\":\"" file "\"," substr($0, 2)
+    else print
+    fflush()
+  }'
+}
+
+is_master() {
+  grep -Eq '^realm:[[:space:]]*["'\'']?master["'\'']?[[:space:]]*$|"realm"[[:space:]]*:[[:space:]]*"master"' "$1"
+}
+
+import_file() {
+  name="$(basename "$1")"
+  status_file="$(mktemp)"
+  start="$(date +%s)"
+  log INFO "$name" "Starting import of file '$name'"
+  {
+    code=0
+    # shellcheck disable=SC2086
+    IMPORT_FILES_LOCATIONS="$1" java ${JAVA_OPTS:-} -jar "$JAR" 2>&1 || code=$?
+    echo "$code" >"$status_file"
+  } | tag "$name"
+  code="$(cat "$status_file")"
+  rm -f "$status_file"
+
+  level=INFO
+  if [ "$code" -ne 0 ]; then
+    level=ERROR
+  fi
+  log "$level" "$name" "Import of file '$name' finished with exit code $code after $(($(date +%s) - start))s"
+  # Any other exit code than 255 lets xargs carry on with the remaining files
+  [ "$code" -eq 0 ]
+}
+
+if [ "${1:-}" = "--import-file" ]; then
+  import_file "$2"
+  exit
+fi
+
+if [ "$CONCURRENCY" -le 1 ]; then
+  # shellcheck disable=SC2086
+  exec java ${JAVA_OPTS:-} -jar "$JAR" "$@"
+fi
+
+masters=""
+others=""
+# Expands the glob of IMPORT_FILES_LOCATIONS, e.g. /config/*
+for location in $IMPORT_FILES_LOCATIONS; do
+  if [ ! -f "$location" ]; then
+    continue
+  fi
+  if is_master "$location"; then
+    masters="$masters$location$NL"
+  else
+    others="$others$(wc -c <"$location") $location$NL"
+  fi
+done
+
+if [ -z "$masters$others" ]; then
+  log ERROR "" "No realm files found in $IMPORT_FILES_LOCATIONS"
+  exit 1
+fi
+
+# The other realms are not imported when the master realm failed
+if ! printf '%s' "$masters" | while IFS= read -r file; do
+  "$0" --import-file "$file" || exit 1
+done; then
+  exit 1
+fi
+
+printf '%s' "$others" | sort -rn | cut -d' ' -f2- |
+  xargs -r -P "$CONCURRENCY" -I{} "$0" --import-file {} || exit 1
@@ -3,18 +3,27 @@
 # Set KEYCLOAK_VERSION to the provided environment variable or default to 'latest'
 KEYCLOAK_VERSION=${KEYCLOAK_VERSION:-latest}
 
-# Find all subdirectories excluding '.' and '.jars'
-SUBDIRS=$(find . -maxdepth 1 -type d ! -name '.' ! -name '.jars')
+# Install the shared libraries of the providers into the local Maven repository first,
+# so that the providers depending on them can be built
+LIBDIRS="./tracing"
+for dir in $LIBDIRS; do
+  echo "Installing $dir..."
+  (cd "$dir" && mvn clean install -DskipTests "-Dkeycloak.version=$KEYCLOAK_VERSION")
+done
+
+# Find all other subdirectories excluding '.' and '.jars'
+SUBDIRS=$(find . -maxdepth 1 -type d ! -name '.' ! -name '.jars' ! -name 'tracing')
 
 # Loop over each subdirectory
 for dir in $SUBDIRS; do
   echo "Building in $dir..."
-  # Navigate into the subdirectory and run the Maven build command
-  (cd "$dir" && mvn clean package "-Dkeycloak.version=$KEYCLOAK_VERSION")
+  # Navigate into the subdirectory and run the Maven build command. Tests are run by
+  # CI (see .github/workflows/diff.yaml) rather than in the image build
+  (cd "$dir" && mvn clean package -DskipTests "-Dkeycloak.version=$KEYCLOAK_VERSION")
 done
 
 # Create the .jars directory if it doesn't exist
 mkdir -p .jars
 
-# Find all JAR files in the 'target' directories and copy them to '.jars/'
-find $SUBDIRS -type f -path '*/target/*.jar' -exec cp {} .jars/ \;
+# Find all JAR files, including the shared libraries, in the 'target' directories and copy them to '.jars/'
+find $LIBDIRS $SUBDIRS -type f -path '*/target/*.jar' -exec cp {} .jars/ \;
@@ -24,17 +24,20 @@ public class UserCreationEmailEventListenerProvider implements EventListenerProv
     private final KeycloakSession session;
     private final Map<String, String> realmToEmail;
     private final String stage;
+    private final String emailSender;
 
     /**
      * Init the UserCreationEmailEventListenerProvider with key instance info
      * @param session our current session
      * @param realmToEmail mapping of realm name to email address to send emails to
      * @param stage deployment stage identifier
+     * @param emailSender ID of the EmailSenderProvider that sends the notifications
      */
-    public UserCreationEmailEventListenerProvider(KeycloakSession session, Map<String, String> realmToEmail, String stage) {
+    public UserCreationEmailEventListenerProvider(KeycloakSession session, Map<String, String> realmToEmail, String stage, String emailSender) {
         this.session = session;
         this.realmToEmail = realmToEmail != null ? realmToEmail : Collections.emptyMap();
         this.stage = stage != null ? stage : "";
+        this.emailSender = emailSender;
     }
 
     /**
@@ -46,7 +49,7 @@ public class UserCreationEmailEventListenerProvider implements EventListenerProv
     @Override
     public void onEvent(Event event) {
         if (EventType.REGISTER.equals(event.getType())) {
-            EmailSenderProvider senderProvider = session.getProvider(EmailSenderProvider.class, "multi-cc-email");
+            EmailSenderProvider senderProvider = session.getProvider(EmailSenderProvider.class, emailSender);
             String realmName = session.getContext().getRealm().getName();
 
             log.infof("Registration event for realm '%s' detected (stage='%s')", realmName, stage);
@@ -22,8 +22,11 @@ import java.util.Collections;
 public class UserCreationEmailEventListenerProviderFactory implements EventListenerProviderFactory {
 
     private static final Logger log = Logger.getLogger(UserCreationEmailEventListenerProviderFactory.class);
+    // Sender of the notifications, both multi-cc-email and ses-email support the "cc" setting
+    private static final String DEFAULT_EMAIL_SENDER = "multi-cc-email";
     private Map<String, String> realmToEmail = Collections.emptyMap();
     private String stage = "";
+    private String emailSender = DEFAULT_EMAIL_SENDER;
 
     /**
      * Create the EventListenerProvider
@@ -32,7 +35,7 @@ public class UserCreationEmailEventListenerProviderFactory implements EventListe
      */
     @Override
     public EventListenerProvider create(KeycloakSession keycloakSession) {
-        return new UserCreationEmailEventListenerProvider(keycloakSession, this.realmToEmail, this.stage);
+        return new UserCreationEmailEventListenerProvider(keycloakSession, this.realmToEmail, this.stage, this.emailSender);
     }
 
     /**
@@ -43,6 +46,8 @@ public class UserCreationEmailEventListenerProviderFactory implements EventListe
     public void init(Config.Scope config) {
         this.stage = config.get("stage");
         log.infof("stage from Keycloak config scope: '%s'", this.stage);
+        this.emailSender = config.get("emailSender", DEFAULT_EMAIL_SENDER);
+        log.infof("Sending notifications with the '%s' email sender", this.emailSender);
         
         Map<String, String> mapping = new HashMap<>();
         
@@ -91,7 +96,7 @@ public class UserCreationEmailEventListenerProviderFactory implements EventListe
 
     /**
      * Build up the list of configuration properties this provider supports
-     * @return the configuration properties for stage (realm emails are read from env vars)
+     * @return the configuration properties for stage and the email sender (realm emails are read from env vars)
      */
     @Override
     public List<ProviderConfigProperty> getConfigMetadata() {
@@ -102,6 +107,12 @@ public class UserCreationEmailEventListenerProviderFactory implements EventListe
                 .helpText("Deployment stage identifier (e.g., dev, prod). Realm-specific emails are configured via environment variables: KEYCLOAK_EMAIL_ADDRESS_<REALM> (e.g., KEYCLOAK_EMAIL_ADDRESS_VEDA)")
                 .defaultValue("")
                 .add()
+                .property()
+                .name("emailSender")
+                .type("string")
+                .helpText("ID of the email sender provider of the notifications, multi-cc-email (SMTP) or ses-email (SES API)")
+                .defaultValue(DEFAULT_EMAIL_SENDER)
+                .add()
                 .build();
     }
 
@@ -0,0 +1,59 @@
+package org.nasa.impact.keycloak.provider;
+
+import com.fasterxml.jackson.databind.node.ObjectNode;
+import org.jboss.logging.Logger;
+import org.keycloak.events.Event;
+import org.keycloak.events.EventListenerProvider;
+import org.keycloak.events.admin.AdminEvent;
+import org.keycloak.util.JsonSerialization;
+
+/**
+ * Hands login and admin events to the {@link EventExporter}. Serialization is the only
+ * work done on the request thread, delivery happens in batches on the export worker.
+ */
+public class EventExportListenerProvider implements EventListenerProvider {
+
+    private static final Logger log = Logger.getLogger(EventExportListenerProvider.class);
+    private final EventExporter exporter;
+    private final boolean includeRepresentation;
+
+    /**
+     * @param exporter the shared exporter owned by the factory
+     * @param includeRepresentation whether to include the representation of admin events
+     */
+    public EventExportListenerProvider(EventExporter exporter, boolean includeRepresentation) {
+        this.exporter = exporter;
+        this.includeRepresentation = includeRepresentation;
+    }
+
+    @Override
+    public void onEvent(Event event) {
+        export("event", event);
+    }
+
+    @Override
+    public void onEvent(AdminEvent adminEvent, boolean includeRepresentation) {
+        if (!this.includeRepresentation && adminEvent.getRepresentation() != null) {
+            AdminEvent copy = new AdminEvent(adminEvent);
+            copy.setRepresentation(null);
+            adminEvent = copy;
+        }
+        export("admin-event", adminEvent);
+    }
+
+    private void export(String kind, Object event) {
+        try {
+            ObjectNode node = JsonSerialization.mapper.valueToTree(event);
+            node.put("kind", kind);
+            exporter.offer(JsonSerialization.mapper.writeValueAsString(node));
+        } catch (Exception e) {
+            // Never fail the user's request because an event could not be exported
+            log.errorf(e, "Failed to serialize %s for export", kind);
+        }
+    }
+
+    @Override
+    public void close() {
+
+    }
+}
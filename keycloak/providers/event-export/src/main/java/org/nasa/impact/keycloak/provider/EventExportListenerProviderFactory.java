@@ -0,0 +1,133 @@
+package org.nasa.impact.keycloak.provider;
+
+import org.jboss.logging.Logger;
+import org.keycloak.Config;
+import org.keycloak.events.EventListenerProvider;
+import org.keycloak.events.EventListenerProviderFactory;
+import org.keycloak.models.KeycloakSession;
+import org.keycloak.models.KeycloakSessionFactory;
+import org.keycloak.provider.ProviderConfigProperty;
+import org.keycloak.provider.ProviderConfigurationBuilder;
+
+import java.util.List;
+
+public class EventExportListenerProviderFactory implements EventListenerProviderFactory {
+
+    private static final Logger log = Logger.getLogger(EventExportListenerProviderFactory.class);
+    private EventExporter exporter;
+    private boolean includeRepresentation;
+
+    /**
+     * Create the EventListenerProvider
+     * @param keycloakSession the current keycloak session
+     * @return an EventExportListenerProvider sharing this factory's exporter
+     */
+    @Override
+    public EventListenerProvider create(KeycloakSession keycloakSession) {
+        return new EventExportListenerProvider(this.exporter, this.includeRepresentation);
+    }
+
+    /**
+     * Initialise the exporter, configured via KC_SPI_EVENTS_LISTENER_EVENT_EXPORT_* options
+     * @param config our config options
+     */
+    @Override
+    public void init(Config.Scope config) {
+        String sinkType = config.get("sink", "log");
+        int queueCapacity = config.getInt("queueCapacity", 10000);
+        int batchSize = config.getInt("batchSize", 500);
+        long flushInterval = config.getLong("flushIntervalMs", 1000L);
+        this.includeRepresentation = config.getBoolean("includeRepresentation", false);
+
+        EventSink sink;
+        switch (sinkType) {
+            case "file":
+                sink = new FileEventSink(config.get("filePath"));
+                break;
+            case "http":
+                sink = new HttpEventSink(config.get("httpUrl"));
+                break;
+            case "log":
+                sink = new LogEventSink();
+                break;
+            default:
+                throw new IllegalArgumentException("Unknown event export sink: " + sinkType);
+        }
+
+        this.exporter = new EventExporter(sink, queueCapacity, batchSize, flushInterval);
+        log.infof("Event export configured with sink '%s', queue capacity %d, batch size %d, flush interval %dms",
+                sinkType, queueCapacity, batchSize, flushInterval);
+    }
+
+    @Override
+    public void postInit(KeycloakSessionFactory keycloakSessionFactory) {
+
+    }
+
+    @Override
+    public void close() {
+        if (exporter != null) {
+            exporter.close();
+        }
+    }
+
+    /**
+     * Get the ID of this provider
+     * @return ID of provider
+     */
+    @Override
+    public String getId() {
+        return "event-export";
+    }
+
+    /**
+     * Build up the list of configuration properties this provider supports
+     * @return the configuration properties
+     */
+    @Override
+    public List<ProviderConfigProperty> getConfigMetadata() {
+        return ProviderConfigurationBuilder.create()
+                .property()
+                .name("sink")
+                .type("string")
+                .helpText("Where to export events to: log, file or http")
+                .defaultValue("log")
+                .add()
+                .property()
+                .name("queueCapacity")
+                .type("int")
+                .helpText("Maximum number of events held in memory, further events are dropped")
+                .defaultValue(10000)
+                .add()
+                .property()
+                .name("batchSize")
+                .type("int")
+                .helpText("Maximum number of events sent to the sink at once")
+                .defaultValue(500)
+                .add()
+                .property()
+                .name("flushIntervalMs")
+                .type("int")
+                .helpText("How long to wait for more events before sending a partial batch")
+                .defaultValue(1000)
+                .add()
+                .property()
+                .name("includeRepresentation")
+                .type("boolean")
+                .helpText("Include the representation of admin events")
+                .defaultValue(false)
+                .add()
+                .property()
+                .name("filePath")
+                .type("string")
+                .helpText("File to append events to when using the file sink")
+                .add()
+                .property()
+                .name("httpUrl")
+                .type("string")
+                .helpText("URL to POST batches of events to when using the http sink")
+                .add()
+                .build();
+    }
+
+}
@@ -0,0 +1,136 @@
+package org.nasa.impact.keycloak.provider;
+
+import io.micrometer.core.instrument.FunctionCounter;
+import io.micrometer.core.instrument.Gauge;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.Metrics;
+import org.jboss.logging.Logger;
+
+import java.util.ArrayList;
+import java.util.List;
+import java.util.concurrent.ArrayBlockingQueue;
+import java.util.concurrent.BlockingQueue;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicLong;
+
+/**
+ * Bounded in-memory queue of serialized events, drained in batches by a single daemon
+ * worker thread. Request threads only ever call {@link #offer(String)}, which never
+ * blocks: when the queue is full the event is dropped and counted instead.
+ */
+public class EventExporter implements Runnable {
+
+    private static final Logger log = Logger.getLogger(EventExporter.class);
+    // How long close() waits for the queued events to be exported
+    private static final long SHUTDOWN_TIMEOUT_MILLIS = TimeUnit.SECONDS.toMillis(10);
+
+    private final BlockingQueue<String> queue;
+    private final EventSink sink;
+    private final int batchSize;
+    private final long flushIntervalMillis;
+    private final Thread worker;
+    private volatile boolean running = true;
+
+    private final AtomicLong enqueued = new AtomicLong();
+    private final AtomicLong dropped = new AtomicLong();
+    private final AtomicLong exported = new AtomicLong();
+    private final AtomicLong failed = new AtomicLong();
+
+    /**
+     * @param sink destination for batches of events
+     * @param queueCapacity maximum number of events held in memory
+     * @param batchSize maximum number of events sent to the sink at once
+     * @param flushIntervalMillis how long the worker waits for more events before sending a partial batch
+     */
+    public EventExporter(EventSink sink, int queueCapacity, int batchSize, long flushIntervalMillis) {
+        this.queue = new ArrayBlockingQueue<>(queueCapacity);
+        this.sink = sink;
+        this.batchSize = batchSize;
+        this.flushIntervalMillis = flushIntervalMillis;
+
+        // Exposed through Keycloak's metrics endpoint when KC_METRICS_ENABLED is set
+        MeterRegistry registry = Metrics.globalRegistry;
+        FunctionCounter.builder("keycloak.event.export.enqueued", enqueued, AtomicLong::get).register(registry);
+        FunctionCounter.builder("keycloak.event.export.dropped", dropped, AtomicLong::get).register(registry);
+        FunctionCounter.builder("keycloak.event.export.exported", exported, AtomicLong::get).register(registry);
+        FunctionCounter.builder("keycloak.event.export.failed", failed, AtomicLong::get).register(registry);
+        Gauge.builder("keycloak.event.export.queue.size", queue, BlockingQueue::size).register(registry);
+        Gauge.builder("keycloak.event.export.queue.remaining", queue, BlockingQueue::remainingCapacity).register(registry);
+
+        this.worker = new Thread(this, "event-export");
+        this.worker.setDaemon(true);
+        this.worker.start();
+    }
+
+    /**
+     * Queue an event for export without blocking the caller.
+     * @param event the event serialized as a single-line JSON document
+     * @return false if the queue was full and the event was dropped
+     */
+    public boolean offer(String event) {
+        if (queue.offer(event)) {
+            enqueued.incrementAndGet();
+            return true;
+        }
+        long droppedCount = dropped.incrementAndGet();
+        // Log the first drop and every thousandth after that to avoid flooding the log
+        if (droppedCount % 1000 == 1) {
+            log.warnf("Event export queue is full, %d event(s) dropped so far", droppedCount);
+        }
+        return false;
+    }
+
+    @Override
+    public void run() {
+        List<String> batch = new ArrayList<>(batchSize);
+        while (running || !queue.isEmpty()) {
+            try {
+                String first = queue.poll(flushIntervalMillis, TimeUnit.MILLISECONDS);
+                if (first == null) {
+                    continue;
+                }
+                batch.add(first);
+                queue.drainTo(batch, batchSize - 1);
+                flush(batch);
+            } catch (InterruptedException e) {
+                // Raised by close() when the queue could not be drained in time
+                return;
+            }
+        }
+    }
+
+    private void flush(List<String> batch) {
+        try {
+            sink.send(batch);
+            exported.addAndGet(batch.size());
+        } catch (Exception e) {
+            failed.addAndGet(batch.size());
+            log.errorf(e, "Failed to export %d event(s)", batch.size());
+        } finally {
+            batch.clear();
+        }
+    }
+
+    /**
+     * Stop the worker after flushing the events already queued. The worker notices at
+     * the end of its current poll, and is only interrupted if it has not finished
+     * within the shutdown timeout, as interrupting it would fail the batch being sent.
+     */
+    public void close() {
+        running = false;
+        try {
+            worker.join(flushIntervalMillis + SHUTDOWN_TIMEOUT_MILLIS);
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+        }
+        if (worker.isAlive()) {
+            worker.interrupt();
+            // The worker may still be using the sink, so it is left open
+            log.warnf("Event exporter did not stop in time, %d queued event(s) not exported", queue.size());
+            return;
+        }
+        sink.close();
+        log.infof("Event exporter stopped: %d exported, %d failed, %d dropped",
+                exported.get(), failed.get(), dropped.get());
+    }
+}
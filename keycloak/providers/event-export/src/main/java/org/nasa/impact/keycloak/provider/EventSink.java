@@ -0,0 +1,22 @@
+package org.nasa.impact.keycloak.provider;
+
+import java.io.IOException;
+import java.util.List;
+
+/**
+ * Destination for batches of exported events. Implementations are called from the
+ * export worker thread only, never from a request thread.
+ */
+public interface EventSink extends AutoCloseable {
+
+    /**
+     * Deliver a batch of events.
+     * @param events events serialized as single-line JSON documents
+     * @throws IOException if the batch could not be delivered
+     */
+    void send(List<String> events) throws IOException;
+
+    @Override
+    default void close() {
+    }
+}
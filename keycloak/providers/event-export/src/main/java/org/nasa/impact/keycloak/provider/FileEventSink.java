@@ -0,0 +1,35 @@
+package org.nasa.impact.keycloak.provider;
+
+import java.io.BufferedWriter;
+import java.io.IOException;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.StandardOpenOption;
+import java.util.List;
+
+/**
+ * Appends events to a newline-delimited JSON file, e.g. for local testing.
+ */
+public class FileEventSink implements EventSink {
+
+    private final Path path;
+
+    public FileEventSink(String path) {
+        if (path == null || path.isBlank()) {
+            throw new IllegalArgumentException("A file path is required for the file event sink");
+        }
+        this.path = Path.of(path);
+    }
+
+    @Override
+    public void send(List<String> events) throws IOException {
+        try (BufferedWriter writer = Files.newBufferedWriter(path, StandardCharsets.UTF_8,
+                StandardOpenOption.CREATE, StandardOpenOption.APPEND)) {
+            for (String event : events) {
+                writer.write(event);
+                writer.newLine();
+            }
+        }
+    }
+}
@@ -0,0 +1,74 @@
+package org.nasa.impact.keycloak.provider;
+
+import java.io.IOException;
+import java.net.URI;
+import java.net.http.HttpClient;
+import java.net.http.HttpRequest;
+import java.net.http.HttpResponse;
+import java.time.Duration;
+import java.util.List;
+
+/**
+ * POSTs each batch as newline-delimited JSON to an HTTP endpoint, retrying with
+ * exponential backoff on connection errors and 429/5xx responses. The client keeps
+ * connections alive between batches.
+ */
+public class HttpEventSink implements EventSink {
+
+    private static final int MAX_ATTEMPTS = 3;
+
+    private final URI uri;
+    private final HttpClient client;
+
+    public HttpEventSink(String url) {
+        if (url == null || url.isBlank()) {
+            throw new IllegalArgumentException("A URL is required for the http event sink");
+        }
+        this.uri = URI.create(url);
+        this.client = HttpClient.newBuilder()
+                .connectTimeout(Duration.ofSeconds(5))
+                .build();
+    }
+
+    @Override
+    public void send(List<String> events) throws IOException {
+        HttpRequest request = HttpRequest.newBuilder(uri)
+                .timeout(Duration.ofSeconds(10))
+                .header("Content-Type", "application/x-ndjson")
+                .POST(HttpRequest.BodyPublishers.ofString(String.join("\n", events) + "\n"))
+                .build();
+
+        IOException lastError = null;
+        for (int attempt = 0; attempt < MAX_ATTEMPTS; attempt++) {
+            if (attempt > 0) {
+                sleep(200L << attempt);
+            }
+            try {
+                HttpResponse<Void> response = client.send(request, HttpResponse.BodyHandlers.discarding());
+                int status = response.statusCode();
+                if (status < 300) {
+                    return;
+                }
+                lastError = new IOException("Event sink responded with HTTP " + status);
+                if (status != 429 && status < 500) {
+                    break;
+                }
+            } catch (IOException e) {
+                lastError = e;
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+                throw new IOException("Interrupted while sending events", e);
+            }
+        }
+        throw lastError;
+    }
+
+    private static void sleep(long millis) throws IOException {
+        try {
+            Thread.sleep(millis);
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+            throw new IOException("Interrupted while sending events", e);
+        }
+    }
+}
@@ -0,0 +1,21 @@
+package org.nasa.impact.keycloak.provider;
+
+import org.jboss.logging.Logger;
+
+import java.util.List;
+
+/**
+ * Writes each event as a JSON line to the server log. On ECS the container's console
+ * output is shipped to CloudWatch Logs, so this needs no additional infrastructure.
+ */
+public class LogEventSink implements EventSink {
+
+    private static final Logger log = Logger.getLogger("org.nasa.impact.keycloak.events");
+
+    @Override
+    public void send(List<String> events) {
+        for (String event : events) {
+            log.info(event);
+        }
+    }
+}
@@ -0,0 +1,97 @@
+package org.nasa.impact.keycloak.provider;
+
+import com.fasterxml.jackson.databind.JsonNode;
+import org.junit.jupiter.api.AfterEach;
+import org.junit.jupiter.api.Test;
+import org.keycloak.events.Event;
+import org.keycloak.events.EventType;
+import org.keycloak.events.admin.AdminEvent;
+import org.keycloak.events.admin.OperationType;
+import org.keycloak.util.JsonSerialization;
+
+import java.util.List;
+import java.util.concurrent.CopyOnWriteArrayList;
+
+import static org.junit.jupiter.api.Assertions.assertEquals;
+import static org.junit.jupiter.api.Assertions.assertFalse;
+import static org.junit.jupiter.api.Assertions.assertNotNull;
+
+class EventExportListenerProviderTest {
+
+    private final CapturingExporter exporter = new CapturingExporter();
+
+    @AfterEach
+    void close() {
+        exporter.close();
+    }
+
+    @Test
+    void exportsLoginEventsAsJsonWithKind() throws Exception {
+        Event event = new Event();
+        event.setType(EventType.LOGIN);
+        event.setRealmId("veda");
+        event.setUserId("user-id");
+
+        new EventExportListenerProvider(exporter, false).onEvent(event);
+
+        JsonNode node = single();
+        assertEquals("event", node.get("kind").asText());
+        assertEquals("LOGIN", node.get("type").asText());
+        assertEquals("veda", node.get("realmId").asText());
+        assertEquals("user-id", node.get("userId").asText());
+    }
+
+    @Test
+    void omitsAdminEventRepresentationByDefault() throws Exception {
+        AdminEvent adminEvent = adminEvent();
+
+        new EventExportListenerProvider(exporter, false).onEvent(adminEvent, true);
+
+        JsonNode node = single();
+        assertEquals("admin-event", node.get("kind").asText());
+        assertEquals("CREATE", node.get("operationType").asText());
+        assertFalse(node.hasNonNull("representation"));
+        // The event is shared with the other listeners and must not be modified
+        assertNotNull(adminEvent.getRepresentation());
+    }
+
+    @Test
+    void includesAdminEventRepresentationWhenConfigured() throws Exception {
+        new EventExportListenerProvider(exporter, true).onEvent(adminEvent(), true);
+
+        assertEquals("{\"username\":\"new-user\"}", single().get("representation").asText());
+    }
+
+    private static AdminEvent adminEvent() {
+        AdminEvent adminEvent = new AdminEvent();
+        adminEvent.setRealmId("veda");
+        adminEvent.setOperationType(OperationType.CREATE);
+        adminEvent.setResourcePath("users/user-id");
+        adminEvent.setRepresentation("{\"username\":\"new-user\"}");
+        return adminEvent;
+    }
+
+    private JsonNode single() throws Exception {
+        assertEquals(1, exporter.events.size());
+        return JsonSerialization.mapper.readTree(exporter.events.get(0));
+    }
+
+    /**
+     * Captures the serialized events instead of queueing them for the worker.
+     */
+    private static class CapturingExporter extends EventExporter {
+
+        private final List<String> events = new CopyOnWriteArrayList<>();
+
+        CapturingExporter() {
+            super(batch -> {
+            }, 1, 1, 100);
+        }
+
+        @Override
+        public boolean offer(String event) {
+            events.add(event);
+            return true;
+        }
+    }
+}
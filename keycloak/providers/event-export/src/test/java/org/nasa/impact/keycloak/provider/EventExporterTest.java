@@ -0,0 +1,204 @@
+package org.nasa.impact.keycloak.provider;
+
+import org.junit.jupiter.api.AfterEach;
+import org.junit.jupiter.api.Test;
+
+import java.io.IOException;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.concurrent.CountDownLatch;
+import java.util.concurrent.TimeUnit;
+
+import static org.junit.jupiter.api.Assertions.assertEquals;
+import static org.junit.jupiter.api.Assertions.assertFalse;
+import static org.junit.jupiter.api.Assertions.assertTrue;
+
+class EventExporterTest {
+
+    private static final long TIMEOUT_SECONDS = 10;
+
+    private EventExporter exporter;
+
+    @AfterEach
+    void close() {
+        if (exporter != null) {
+            exporter.close();
+        }
+    }
+
+    @Test
+    void sendsEventsInBatchesOfAtMostBatchSize() throws Exception {
+        RecordingSink sink = new RecordingSink();
+        sink.block();
+        exporter = new EventExporter(sink, 100, 4, 100);
+
+        // The worker holds the first event in the blocked sink while the others queue up
+        exporter.offer("event-0");
+        sink.awaitSend();
+        for (int i = 1; i < 10; i++) {
+            assertTrue(exporter.offer("event-" + i));
+        }
+        sink.release();
+
+        List<List<String>> batches = sink.awaitEvents(10);
+        assertEquals(List.of("event-0"), batches.get(0));
+        assertEquals(List.of("event-1", "event-2", "event-3", "event-4"), batches.get(1));
+        assertEquals(List.of("event-5", "event-6", "event-7", "event-8"), batches.get(2));
+        assertEquals(List.of("event-9"), batches.get(3));
+    }
+
+    @Test
+    void sendsPartialBatchWithoutWaitingForBatchSize() throws Exception {
+        RecordingSink sink = new RecordingSink();
+        exporter = new EventExporter(sink, 100, 500, 50);
+
+        exporter.offer("event-0");
+        exporter.offer("event-1");
+
+        assertEquals(List.of("event-0", "event-1"), flatten(sink.awaitEvents(2)));
+    }
+
+    @Test
+    void dropsEventsWhenQueueIsFull() throws Exception {
+        RecordingSink sink = new RecordingSink();
+        sink.block();
+        exporter = new EventExporter(sink, 2, 500, 100);
+
+        exporter.offer("in-flight");
+        sink.awaitSend();
+        assertTrue(exporter.offer("queued-0"));
+        assertTrue(exporter.offer("queued-1"));
+        assertFalse(exporter.offer("dropped"));
+        sink.release();
+
+        assertEquals(List.of("in-flight", "queued-0", "queued-1"), flatten(sink.awaitEvents(3)));
+    }
+
+    @Test
+    void keepsExportingAfterSinkFailure() throws Exception {
+        RecordingSink sink = new RecordingSink();
+        sink.failNext();
+        exporter = new EventExporter(sink, 100, 500, 100);
+
+        exporter.offer("lost");
+        sink.awaitSend();
+        exporter.offer("event-0");
+
+        assertEquals(List.of("event-0"), flatten(sink.awaitEvents(1)));
+    }
+
+    @Test
+    void closeFlushesQueuedEventsAndClosesSink() throws Exception {
+        RecordingSink sink = new RecordingSink();
+        sink.block();
+        exporter = new EventExporter(sink, 100, 500, 100);
+
+        exporter.offer("event-0");
+        sink.awaitSend();
+        exporter.offer("event-1");
+        exporter.offer("event-2");
+        sink.release();
+        exporter.close();
+        exporter = null;
+
+        assertEquals(List.of("event-0", "event-1", "event-2"), flatten(sink.batches()));
+        assertTrue(sink.closed);
+    }
+
+    @Test
+    void closeWaitsForBatchBeingSent() throws Exception {
+        RecordingSink sink = new RecordingSink();
+        sink.block();
+        exporter = new EventExporter(sink, 100, 500, 100);
+
+        exporter.offer("event-0");
+        sink.awaitSend();
+        exporter.offer("event-1");
+        Thread closing = new Thread(exporter::close);
+        closing.start();
+        // Give close() the time to interrupt the worker, which it must not do
+        closing.join(300);
+        sink.release();
+        closing.join(TimeUnit.SECONDS.toMillis(TIMEOUT_SECONDS));
+        exporter = null;
+
+        assertFalse(sink.interrupted);
+        assertEquals(List.of("event-0", "event-1"), flatten(sink.batches()));
+        assertTrue(sink.closed);
+    }
+
+    private static List<String> flatten(List<List<String>> batches) {
+        List<String> events = new ArrayList<>();
+        batches.forEach(events::addAll);
+        return events;
+    }
+
+    /**
+     * Records the batches it receives. Can hold the worker in send() until released, and
+     * fail the next batch.
+     */
+    private static class RecordingSink implements EventSink {
+
+        private final List<List<String>> batches = new ArrayList<>();
+        private final CountDownLatch sending = new CountDownLatch(1);
+        private CountDownLatch released = new CountDownLatch(0);
+        private volatile boolean failNext;
+        private volatile boolean closed;
+        private volatile boolean interrupted;
+
+        void block() {
+            released = new CountDownLatch(1);
+        }
+
+        void release() {
+            released.countDown();
+        }
+
+        void failNext() {
+            failNext = true;
+        }
+
+        void awaitSend() throws InterruptedException {
+            assertTrue(sending.await(TIMEOUT_SECONDS, TimeUnit.SECONDS), "No batch was sent");
+        }
+
+        synchronized List<List<String>> batches() {
+            return new ArrayList<>(batches);
+        }
+
+        synchronized List<List<String>> awaitEvents(int count) throws InterruptedException {
+            long deadline = System.nanoTime() + TimeUnit.SECONDS.toNanos(TIMEOUT_SECONDS);
+            while (flatten(batches).size() < count) {
+                long remaining = TimeUnit.NANOSECONDS.toMillis(deadline - System.nanoTime());
+                assertTrue(remaining > 0, "Expected " + count + " events, got " + batches);
+                wait(remaining);
+            }
+            return new ArrayList<>(batches);
+        }
+
+        @Override
+        public void send(List<String> events) throws IOException {
+            sending.countDown();
+            try {
+                released.await(TIMEOUT_SECONDS, TimeUnit.SECONDS);
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+            }
+            interrupted |= Thread.currentThread().isInterrupted();
+            if (failNext) {
+                failNext = false;
+                throw new IOException("Sink unavailable");
+            }
+            synchronized (this) {
+                // The exporter reuses its batch list, so keep a copy
+                batches.add(new ArrayList<>(events));
+                notifyAll();
+            }
+        }
+
+        @Override
+        public void close() {
+            closed = true;
+        }
+    }
+}
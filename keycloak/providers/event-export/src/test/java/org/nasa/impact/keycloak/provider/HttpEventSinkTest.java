@@ -0,0 +1,88 @@
+package org.nasa.impact.keycloak.provider;
+
+import com.sun.net.httpserver.HttpServer;
+import org.junit.jupiter.api.AfterEach;
+import org.junit.jupiter.api.BeforeEach;
+import org.junit.jupiter.api.Test;
+
+import java.io.IOException;
+import java.io.InputStream;
+import java.net.InetSocketAddress;
+import java.nio.charset.StandardCharsets;
+import java.util.List;
+import java.util.concurrent.ConcurrentLinkedQueue;
+import java.util.concurrent.CopyOnWriteArrayList;
+
+import static org.junit.jupiter.api.Assertions.assertEquals;
+import static org.junit.jupiter.api.Assertions.assertThrows;
+
+class HttpEventSinkTest {
+
+    private HttpServer server;
+    // Status of each response, in order, 200 once exhausted
+    private final ConcurrentLinkedQueue<Integer> statuses = new ConcurrentLinkedQueue<>();
+    private final List<String> bodies = new CopyOnWriteArrayList<>();
+    private HttpEventSink sink;
+
+    @BeforeEach
+    void start() throws IOException {
+        server = HttpServer.create(new InetSocketAddress("127.0.0.1", 0), 0);
+        server.createContext("/events", exchange -> {
+            try (InputStream body = exchange.getRequestBody()) {
+                bodies.add(new String(body.readAllBytes(), StandardCharsets.UTF_8));
+            }
+            Integer status = statuses.poll();
+            exchange.sendResponseHeaders(status == null ? 200 : status, -1);
+            exchange.close();
+        });
+        server.start();
+        sink = new HttpEventSink("http://127.0.0.1:" + server.getAddress().getPort() + "/events");
+    }
+
+    @AfterEach
+    void stop() {
+        server.stop(0);
+    }
+
+    @Test
+    void postsBatchAsNdjson() throws IOException {
+        sink.send(List.of("{\"id\":1}", "{\"id\":2}"));
+
+        assertEquals(List.of("{\"id\":1}\n{\"id\":2}\n"), bodies);
+    }
+
+    @Test
+    void retriesThrottledAndServerErrors() throws IOException {
+        statuses.add(429);
+        statuses.add(503);
+
+        sink.send(List.of("{\"id\":1}"));
+
+        assertEquals(3, bodies.size());
+    }
+
+    @Test
+    void failsAfterMaxAttempts() {
+        statuses.add(500);
+        statuses.add(502);
+        statuses.add(503);
+
+        IOException error = assertThrows(IOException.class, () -> sink.send(List.of("{\"id\":1}")));
+        assertEquals("Event sink responded with HTTP 503", error.getMessage());
+        assertEquals(3, bodies.size());
+    }
+
+    @Test
+    void doesNotRetryClientErrors() {
+        statuses.add(400);
+
+        IOException error = assertThrows(IOException.class, () -> sink.send(List.of("{\"id\":1}")));
+        assertEquals("Event sink responded with HTTP 400", error.getMessage());
+        assertEquals(1, bodies.size());
+    }
+
+    @Test
+    void requiresUrl() {
+        assertThrows(IllegalArgumentException.class, () -> new HttpEventSink(" "));
+    }
+}
@@ -1,6 +1,10 @@
 package org.nasa.impact.keycloak.provider;
 
 import com.fasterxml.jackson.databind.JsonNode;
+import io.opentelemetry.api.trace.Span;
+import io.opentelemetry.api.trace.SpanKind;
+import io.opentelemetry.api.trace.StatusCode;
+import io.opentelemetry.context.Scope;
 import jakarta.ws.rs.core.Response;
 import java.io.IOException;
 import org.keycloak.models.KeycloakSession;
@@ -10,6 +14,7 @@ import org.keycloak.broker.provider.IdentityBrokerException;
 import org.keycloak.broker.provider.util.SimpleHttp;
 import org.keycloak.social.github.GitHubIdentityProvider;
 import org.keycloak.events.EventBuilder;
+import org.nasa.impact.keycloak.tracing.Tracing;
 
 
 /**
@@ -22,6 +27,7 @@ public class GithubOrgIdentityProvider extends GitHubIdentityProvider {
     private final String team;
 
     private static final String DEFAULT_SCOPE = "user:email read:org";
+    private static final String INSTRUMENTATION_SCOPE = "org.nasa.impact.keycloak.github-org-identity-provider";
 
     public GithubOrgIdentityProvider(KeycloakSession session, OAuth2IdentityProviderConfig config) {
         super(session, config);
@@ -33,7 +39,16 @@ public class GithubOrgIdentityProvider extends GitHubIdentityProvider {
 
     @Override
     protected BrokeredIdentityContext doGetFederatedIdentity(String accessToken) {
-        BrokeredIdentityContext user = super.doGetFederatedIdentity(accessToken);
+        // Fetches the user profile (and emails) from the GitHub API
+        BrokeredIdentityContext user;
+        Span span = startSpan("GET github user", apiUrl + "/user");
+        try (Scope ignored = span.makeCurrent()) {
+            user = super.doGetFederatedIdentity(accessToken);
+            endSpan(span, null);
+        } catch (RuntimeException e) {
+            endSpan(span, e);
+            throw e;
+        }
 
         // String organization = getConfig().get("organization");
         if (organization == null || organization.isEmpty()) {
@@ -62,11 +77,7 @@ public class GithubOrgIdentityProvider extends GitHubIdentityProvider {
         // https://docs.github.com/en/rest/orgs/members?apiVersion=2022-11-28#check-organization-membership-for-a-user
         String orgUrl = apiUrl + String.format("/orgs/%s/members/%s", organization, username);
         try {
-            SimpleHttp.Response response = SimpleHttp.doGet(orgUrl, session)
-                                .header("Authorization", "Bearer " + accessToken)
-                                .header("Accept", "application/json")
-                                .asResponse();
-            int statusCode = response.getStatus();
+            int statusCode = getStatus("GET github organization membership", orgUrl, accessToken, "application/json");
             return statusCode == 204;
         } catch (IOException e) {
             throw new IdentityBrokerException("Could not verify organization membership", e);
@@ -76,17 +87,51 @@ public class GithubOrgIdentityProvider extends GitHubIdentityProvider {
     private boolean checkTeamMembership(String accessToken, String organization, String team, String username) {
         String teamMembershipUrl = apiUrl + String.format("/orgs/%s/teams/%s/memberships/%s", organization, team, username);
         try {
-            SimpleHttp.Response response = SimpleHttp.doGet(teamMembershipUrl, session)
-                    .header("Authorization", "Bearer " + accessToken)
-                    .header("Accept", "application/vnd.github+json")
-                    .asResponse();
-            int statusCode = response.getStatus();
+            int statusCode = getStatus("GET github team membership", teamMembershipUrl, accessToken, "application/vnd.github+json");
             return statusCode == 200;
         } catch (IOException e) {
             throw new IdentityBrokerException("Could not verify team membership", e);
         }
     }
 
+    private int getStatus(String spanName, String url, String accessToken, String accept) throws IOException {
+        Span span = startSpan(spanName, url);
+        try (Scope ignored = span.makeCurrent()) {
+            SimpleHttp.Response response = SimpleHttp.doGet(url, session)
+                    .header("Authorization", "Bearer " + accessToken)
+                    .header("Accept", accept)
+                    .asResponse();
+            int statusCode = response.getStatus();
+            span.setAttribute("http.response.status_code", statusCode);
+            endSpan(span, null);
+            return statusCode;
+        } catch (IOException | RuntimeException e) {
+            endSpan(span, e);
+            throw e;
+        }
+    }
+
+    /**
+     * Starts a client span for a GitHub API call, as a child of the Keycloak request span.
+     */
+    private Span startSpan(String name, String url) {
+        return Tracing.tracer(INSTRUMENTATION_SCOPE).spanBuilder(name)
+                .setSpanKind(SpanKind.CLIENT)
+                .setAttribute("http.request.method", "GET")
+                .setAttribute("url.full", url)
+                .setAttribute("github.organization", organization)
+                .setAttribute("keycloak.realm", session.getContext().getRealm().getName())
+                .startSpan();
+    }
+
+    private static void endSpan(Span span, Exception error) {
+        if (error != null) {
+            span.recordException(error);
+            span.setStatus(StatusCode.ERROR);
+        }
+        span.end();
+    }
+
 	@Override
 	protected String getDefaultScopes() {
 		return DEFAULT_SCOPE;
@@ -17,6 +17,10 @@
 
 package org.nasa.impact.keycloak.email;
 
+import io.opentelemetry.api.trace.Span;
+import io.opentelemetry.api.trace.SpanKind;
+import io.opentelemetry.api.trace.StatusCode;
+import io.opentelemetry.context.Scope;
 import org.keycloak.email.EmailException;
 import org.keycloak.email.EmailSenderProvider;
 
@@ -24,9 +28,11 @@ import jakarta.mail.internet.MimeUtility;
 import org.jboss.logging.Logger;
 import org.keycloak.common.enums.HostnameVerificationPolicy;
 import org.keycloak.models.KeycloakSession;
+import org.keycloak.models.RealmModel;
 import org.keycloak.models.UserModel;
 import org.keycloak.services.ServicesLogger;
 import org.keycloak.truststore.JSSETruststoreConfigurator;
+import org.nasa.impact.keycloak.tracing.Tracing;
 
 import jakarta.mail.Address;
 import jakarta.mail.MessagingException;
@@ -56,6 +62,7 @@ public class MultiCcEmailSenderProvider implements EmailSenderProvider {
 
     private static final Logger logger = Logger.getLogger(MultiCcEmailSenderProvider.class);
     private static final String SUPPORTED_SSL_PROTOCOLS = getSupportedSslProtocols();
+    private static final String INSTRUMENTATION_SCOPE = "org.nasa.impact.keycloak.multi-cc-email";
 
     private final KeycloakSession session;
 
@@ -78,7 +85,17 @@ public class MultiCcEmailSenderProvider implements EmailSenderProvider {
 
         Message message = buildMessage(mailSession, address, subject, config, buildMultipartBody(textBody, htmlBody));
 
-        try (Transport transport = mailSession.getTransport("smtp")) {
+        // Client span covering the connection to the SMTP server and the send, as a
+        // child of the Keycloak request span
+        RealmModel realm = session.getContext().getRealm();
+        Span span = Tracing.tracer(INSTRUMENTATION_SCOPE).spanBuilder("smtp send")
+                .setSpanKind(SpanKind.CLIENT)
+                .setAttribute("server.address", String.valueOf(config.get("host")))
+                .setAttribute("server.port", String.valueOf(config.get("port")))
+                .setAttribute("keycloak.realm", realm != null ? realm.getName() : null)
+                .startSpan();
+
+        try (Scope ignored = span.makeCurrent(); Transport transport = mailSession.getTransport("smtp")) {
             if (isAuthConfigured(config)) {
                 transport.connect(
                         config.get("host"),
@@ -88,12 +105,19 @@ public class MultiCcEmailSenderProvider implements EmailSenderProvider {
             } else {
                 transport.connect();
             }
+            span.addEvent("connected");
 
-            transport.sendMessage(message, message.getAllRecipients());
+            Address[] recipients = message.getAllRecipients();
+            span.setAttribute("email.recipients", recipients.length);
+            transport.sendMessage(message, recipients);
 
         } catch (Exception e) {
+            span.recordException(e);
+            span.setStatus(StatusCode.ERROR);
             ServicesLogger.LOGGER.failedToSendEmail(e);
             throw new EmailException("Error when attempting to send the email to the server. More information is available in the server log.", e);
+        } finally {
+            span.end();
         }
     }
 
@@ -239,7 +263,6 @@ public class MultiCcEmailSenderProvider implements EmailSenderProvider {
         return "token".equals(config.get("authType"));
     }
 
-
     protected InternetAddress toInternetAddress(String email, String displayName) throws UnsupportedEncodingException, AddressException, EmailException {
         if (email == null || "".equals(email.trim())) {
             throw new EmailException("Please provide a valid address", null);
@@ -269,6 +292,7 @@ public class MultiCcEmailSenderProvider implements EmailSenderProvider {
         }
     }
 
+
     @Override
     public void close() {
 
@@ -0,0 +1,293 @@
+package org.nasa.impact.keycloak.email;
+
+import org.jboss.logging.Logger;
+import org.keycloak.email.EmailException;
+import org.keycloak.util.JsonSerialization;
+
+import javax.crypto.Mac;
+import javax.crypto.spec.SecretKeySpec;
+import java.io.IOException;
+import java.net.URI;
+import java.net.http.HttpClient;
+import java.net.http.HttpRequest;
+import java.net.http.HttpResponse;
+import java.nio.charset.StandardCharsets;
+import java.security.GeneralSecurityException;
+import java.security.MessageDigest;
+import java.time.Duration;
+import java.time.Instant;
+import java.time.ZoneOffset;
+import java.time.format.DateTimeFormatter;
+import java.util.Map;
+import java.util.TreeMap;
+import java.util.concurrent.ThreadLocalRandom;
+
+/**
+ * Minimal client of the SES v2 SendEmail API, so that the provider needs no bundled AWS SDK.
+ * Requests are signed with Signature Version 4, using the credentials of the environment
+ * (AWS_ACCESS_KEY_ID, ...) or else of the ECS task role. A single HTTP client is shared by
+ * all sends, so connections to SES are kept alive and reused. Throttled and failed requests
+ * are retried with exponential backoff and full jitter.
+ */
+public class SesClient {
+
+    private static final Logger logger = Logger.getLogger(SesClient.class);
+
+    private static final String SERVICE = "ses";
+    private static final String SEND_EMAIL_PATH = "/v2/email/outbound-emails";
+    // Credentials endpoint of the ECS task role
+    private static final String CONTAINER_CREDENTIALS_ENDPOINT = "http://169.254.170.2";
+    private static final Duration REFRESH_BEFORE_EXPIRY = Duration.ofMinutes(5);
+    private static final Duration REQUEST_TIMEOUT = Duration.ofSeconds(30);
+    private static final long BASE_BACKOFF_MILLIS = 100;
+    private static final long MAX_BACKOFF_MILLIS = 5000;
+    private static final DateTimeFormatter AMZ_DATE =
+            DateTimeFormatter.ofPattern("yyyyMMdd'T'HHmmss'Z'").withZone(ZoneOffset.UTC);
+
+    private final HttpClient httpClient;
+    private final String region;
+    private final URI endpoint;
+    private final int maxAttempts;
+
+    private Credentials credentials;
+
+    /**
+     * @param region AWS region of the SES identities
+     * @param endpoint SES endpoint, e.g. of a local stand-in, or null for the regional endpoint
+     * @param maxAttempts attempts of each request, including the first
+     */
+    public SesClient(String region, String endpoint, int maxAttempts) {
+        this.region = region;
+        this.endpoint = URI.create(endpoint != null && !endpoint.isBlank()
+                ? endpoint
+                : "https://email." + region + ".amazonaws.com");
+        this.maxAttempts = maxAttempts;
+        this.httpClient = HttpClient.newBuilder()
+                .connectTimeout(Duration.ofSeconds(10))
+                .build();
+    }
+
+    public URI getEndpoint() {
+        return endpoint;
+    }
+
+    /**
+     * Sends an email, see https://docs.aws.amazon.com/ses/latest/APIReference-V2/API_SendEmail.html
+     * @param request body of the SendEmail request
+     * @return the ID SES assigned to the message
+     */
+    public String sendEmail(Map<String, Object> request) throws EmailException {
+        byte[] body;
+        try {
+            body = JsonSerialization.writeValueAsBytes(request);
+        } catch (IOException e) {
+            throw new EmailException("Failed to serialize the SES request", e);
+        }
+
+        for (int attempt = 1; ; attempt++) {
+            HttpResponse<String> response;
+            try {
+                response = httpClient.send(signedRequest(body), HttpResponse.BodyHandlers.ofString());
+            } catch (IOException e) {
+                if (attempt >= maxAttempts) {
+                    throw new EmailException("Could not reach SES at " + endpoint, e);
+                }
+                backoff(attempt, e.toString());
+                continue;
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+                throw new EmailException("Interrupted while sending the email", e);
+            }
+
+            int status = response.statusCode();
+            if (status == 200) {
+                return messageId(response.body());
+            }
+            if (isExpiredToken(status, response.body())) {
+                invalidateCredentials();
+            } else if (!isRetryable(status)) {
+                throw new EmailException("SES rejected the email with status " + status + ": " + response.body());
+            }
+            if (attempt >= maxAttempts) {
+                throw new EmailException("SES failed after " + attempt + " attempts with status " + status + ": " + response.body());
+            }
+            backoff(attempt, "status " + status);
+        }
+    }
+
+    private HttpRequest signedRequest(byte[] body) throws EmailException {
+        Credentials credentials = credentials();
+        String amzDate = AMZ_DATE.format(Instant.now());
+        String date = amzDate.substring(0, 8);
+        // Same as the Host header set by the HTTP client
+        String host = endpoint.getPort() == -1 ? endpoint.getHost() : endpoint.getHost() + ":" + endpoint.getPort();
+
+        // Signed headers, lower case and sorted by name
+        TreeMap<String, String> headers = new TreeMap<>();
+        headers.put("content-type", "application/json");
+        headers.put("host", host);
+        headers.put("x-amz-date", amzDate);
+        if (credentials.sessionToken != null) {
+            headers.put("x-amz-security-token", credentials.sessionToken);
+        }
+        StringBuilder canonicalHeaders = new StringBuilder();
+        headers.forEach((name, value) -> canonicalHeaders.append(name).append(':').append(value).append('\n'));
+        String signedHeaders = String.join(";", headers.keySet());
+
+        String canonicalRequest = String.join("\n",
+                "POST",
+                SEND_EMAIL_PATH,
+                "",
+                canonicalHeaders.toString(),
+                signedHeaders,
+                hex(sha256(body)));
+        String scope = date + "/" + region + "/" + SERVICE + "/aws4_request";
+        String stringToSign = String.join("\n",
+                "AWS4-HMAC-SHA256",
+                amzDate,
+                scope,
+                hex(sha256(canonicalRequest.getBytes(StandardCharsets.UTF_8))));
+
+        byte[] key = hmac(("AWS4" + credentials.secretAccessKey).getBytes(StandardCharsets.UTF_8), date);
+        key = hmac(key, region);
+        key = hmac(key, SERVICE);
+        key = hmac(key, "aws4_request");
+        String signature = hex(hmac(key, stringToSign));
+
+        HttpRequest.Builder builder = HttpRequest.newBuilder(endpoint.resolve(SEND_EMAIL_PATH))
+                .timeout(REQUEST_TIMEOUT)
+                .POST(HttpRequest.BodyPublishers.ofByteArray(body))
+                .header("Content-Type", "application/json")
+                .header("X-Amz-Date", amzDate)
+                .header("Authorization", "AWS4-HMAC-SHA256 Credential=" + credentials.accessKeyId + "/" + scope
+                        + ", SignedHeaders=" + signedHeaders + ", Signature=" + signature);
+        if (credentials.sessionToken != null) {
+            builder.header("X-Amz-Security-Token", credentials.sessionToken);
+        }
+        return builder.build();
+    }
+
+    private synchronized Credentials credentials() throws EmailException {
+        if (credentials == null || credentials.expiresBefore(Instant.now().plus(REFRESH_BEFORE_EXPIRY))) {
+            credentials = loadCredentials();
+        }
+        return credentials;
+    }
+
+    private synchronized void invalidateCredentials() {
+        credentials = null;
+    }
+
+    private Credentials loadCredentials() throws EmailException {
+        String accessKeyId = System.getenv("AWS_ACCESS_KEY_ID");
+        if (accessKeyId != null && !accessKeyId.isBlank()) {
+            return new Credentials(
+                    accessKeyId,
+                    System.getenv("AWS_SECRET_ACCESS_KEY"),
+                    System.getenv("AWS_SESSION_TOKEN"),
+                    null);
+        }
+
+        String relativeUri = System.getenv("AWS_CONTAINER_CREDENTIALS_RELATIVE_URI");
+        if (relativeUri == null || relativeUri.isBlank()) {
+            throw new EmailException("No AWS credentials found in the environment or the ECS task role");
+        }
+        try {
+            HttpResponse<String> response = httpClient.send(
+                    HttpRequest.newBuilder(URI.create(CONTAINER_CREDENTIALS_ENDPOINT + relativeUri))
+                            .timeout(REQUEST_TIMEOUT)
+                            .build(),
+                    HttpResponse.BodyHandlers.ofString());
+            if (response.statusCode() != 200) {
+                throw new EmailException("Failed to get the task role credentials, status " + response.statusCode());
+            }
+            Map<?, ?> json = JsonSerialization.readValue(response.body(), Map.class);
+            return new Credentials(
+                    (String) json.get("AccessKeyId"),
+                    (String) json.get("SecretAccessKey"),
+                    (String) json.get("Token"),
+                    Instant.parse((String) json.get("Expiration")));
+        } catch (IOException e) {
+            throw new EmailException("Failed to get the task role credentials", e);
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+            throw new EmailException("Interrupted while getting the task role credentials", e);
+        }
+    }
+
+    private static String messageId(String body) throws EmailException {
+        try {
+            return String.valueOf(JsonSerialization.readValue(body, Map.class).get("MessageId"));
+        } catch (IOException e) {
+            throw new EmailException("Unexpected SES response: " + body, e);
+        }
+    }
+
+    /**
+     * Throttling (TooManyRequestsException) and server side errors.
+     */
+    private static boolean isRetryable(int status) {
+        return status == 429 || status >= 500;
+    }
+
+    private static boolean isExpiredToken(int status, String body) {
+        return (status == 400 || status == 403) && body != null && body.contains("ExpiredToken");
+    }
+
+    private static void backoff(int attempt, String reason) throws EmailException {
+        long cap = Math.min(MAX_BACKOFF_MILLIS, BASE_BACKOFF_MILLIS << attempt);
+        long delay = ThreadLocalRandom.current().nextLong(cap + 1);
+        logger.debugf("Retrying SES request in %d ms after attempt %d failed: %s", delay, attempt, reason);
+        try {
+            Thread.sleep(delay);
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+            throw new EmailException("Interrupted while retrying the SES request", e);
+        }
+    }
+
+    private static byte[] sha256(byte[] data) {
+        try {
+            return MessageDigest.getInstance("SHA-256").digest(data);
+        } catch (GeneralSecurityException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+
+    private static byte[] hmac(byte[] key, String data) {
+        try {
+            Mac mac = Mac.getInstance("HmacSHA256");
+            mac.init(new SecretKeySpec(key, "HmacSHA256"));
+            return mac.doFinal(data.getBytes(StandardCharsets.UTF_8));
+        } catch (GeneralSecurityException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+
+    private static String hex(byte[] bytes) {
+        StringBuilder sb = new StringBuilder(bytes.length * 2);
+        for (byte b : bytes) {
+            sb.append(String.format("%02x", b));
+        }
+        return sb.toString();
+    }
+
+    private static class Credentials {
+        final String accessKeyId;
+        final String secretAccessKey;
+        final String sessionToken;
+        // Null for static credentials
+        final Instant expiration;
+
+        Credentials(String accessKeyId, String secretAccessKey, String sessionToken, Instant expiration) {
+            this.accessKeyId = accessKeyId;
+            this.secretAccessKey = secretAccessKey;
+            this.sessionToken = sessionToken != null && !sessionToken.isBlank() ? sessionToken : null;
+            this.expiration = expiration;
+        }
+
+        boolean expiresBefore(Instant instant) {
+            return expiration != null && expiration.isBefore(instant);
+        }
+    }
+}
@@ -0,0 +1,159 @@
+package org.nasa.impact.keycloak.email;
+
+import io.opentelemetry.api.trace.Span;
+import io.opentelemetry.api.trace.SpanKind;
+import io.opentelemetry.api.trace.StatusCode;
+import io.opentelemetry.context.Scope;
+import jakarta.mail.internet.AddressException;
+import jakarta.mail.internet.InternetAddress;
+import org.jboss.logging.Logger;
+import org.keycloak.email.EmailException;
+import org.keycloak.email.EmailSenderProvider;
+import org.keycloak.models.KeycloakSession;
+import org.keycloak.models.RealmModel;
+import org.keycloak.models.UserModel;
+import org.keycloak.services.ServicesLogger;
+import org.nasa.impact.keycloak.tracing.Tracing;
+
+import java.io.UnsupportedEncodingException;
+import java.util.ArrayList;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+
+import static org.keycloak.utils.StringUtil.isNotBlank;
+
+/**
+ * Sends email with the SES v2 API rather than SMTP, using the Keycloak task role. Takes the
+ * sender and reply-to addresses from the realm's email settings like the SMTP senders, and a
+ * comma separated list of CC addresses from the "cc" setting like MultiCcEmailSenderProvider.
+ * The SMTP server settings of the realm are ignored.
+ */
+public class SesEmailSenderProvider implements EmailSenderProvider {
+
+    private static final Logger logger = Logger.getLogger(SesEmailSenderProvider.class);
+    private static final String INSTRUMENTATION_SCOPE = "org.nasa.impact.keycloak.ses-email";
+    private static final String CHARSET = "UTF-8";
+
+    private final KeycloakSession session;
+    private final SesClient client;
+    private final String configurationSet;
+
+    public SesEmailSenderProvider(KeycloakSession session, SesClient client, String configurationSet) {
+        this.session = session;
+        this.client = client;
+        this.configurationSet = configurationSet;
+    }
+
+    @Override
+    public void send(Map<String, String> config, UserModel user, String subject, String textBody, String htmlBody) throws EmailException {
+        String address = user.getEmail();
+        if (address == null) {
+            throw new EmailException("No email address configured for the user");
+        }
+        send(config, address, subject, textBody, htmlBody);
+    }
+
+    @Override
+    public void send(Map<String, String> config, String address, String subject, String textBody, String htmlBody) throws EmailException {
+        Map<String, Object> request = buildRequest(config, address, subject, textBody, htmlBody);
+
+        RealmModel realm = session.getContext().getRealm();
+        Span span = Tracing.tracer(INSTRUMENTATION_SCOPE).spanBuilder("ses send")
+                .setSpanKind(SpanKind.CLIENT)
+                .setAttribute("server.address", client.getEndpoint().getHost())
+                .setAttribute("keycloak.realm", realm != null ? realm.getName() : null)
+                .startSpan();
+
+        try (Scope ignored = span.makeCurrent()) {
+            String messageId = client.sendEmail(request);
+            span.setAttribute("email.message_id", messageId);
+            logger.debugf("Sent email %s with SES", messageId);
+        } catch (EmailException e) {
+            span.recordException(e);
+            span.setStatus(StatusCode.ERROR);
+            ServicesLogger.LOGGER.failedToSendEmail(e);
+            throw e;
+        } finally {
+            span.end();
+        }
+    }
+
+    private Map<String, Object> buildRequest(Map<String, String> config, String address, String subject, String textBody, String htmlBody) throws EmailException {
+        String from = config.get("from");
+        if (from == null) {
+            throw new EmailException("No sender address configured in the realm settings for emails");
+        }
+
+        Map<String, Object> destination = new LinkedHashMap<>();
+        destination.put("ToAddresses", parseAddresses(address));
+        if (isNotBlank(config.get("cc"))) {
+            destination.put("CcAddresses", parseAddresses(config.get("cc")));
+        }
+
+        Map<String, Object> body = new LinkedHashMap<>();
+        if (textBody != null) {
+            body.put("Text", content(textBody));
+        }
+        if (htmlBody != null) {
+            body.put("Html", content(htmlBody));
+        }
+        Map<String, Object> simple = new LinkedHashMap<>();
+        simple.put("Subject", content(subject));
+        simple.put("Body", body);
+
+        Map<String, Object> request = new LinkedHashMap<>();
+        request.put("FromEmailAddress", toAddress(from, config.get("fromDisplayName")));
+        request.put("Destination", destination);
+        if (isNotBlank(config.get("replyTo"))) {
+            request.put("ReplyToAddresses", List.of(toAddress(config.get("replyTo"), config.get("replyToDisplayName"))));
+        }
+        // Bounces and complaints are forwarded to the envelope sender
+        if (isNotBlank(config.get("envelopeFrom"))) {
+            request.put("FeedbackForwardingEmailAddress", config.get("envelopeFrom"));
+        }
+        request.put("Content", Map.of("Simple", simple));
+        if (isNotBlank(configurationSet)) {
+            request.put("ConfigurationSetName", configurationSet);
+        }
+        return request;
+    }
+
+    private static Map<String, String> content(String data) {
+        return Map.of("Data", data, "Charset", CHARSET);
+    }
+
+    private static List<String> parseAddresses(String addresses) throws EmailException {
+        try {
+            List<String> parsed = new ArrayList<>();
+            for (InternetAddress address : InternetAddress.parse(addresses, false)) {
+                parsed.add(address.toString());
+            }
+            return parsed;
+        } catch (AddressException e) {
+            throw new EmailException("Invalid email address format", e);
+        }
+    }
+
+    /**
+     * Formats an address with an optional display name, which is MIME encoded if needed.
+     */
+    private static String toAddress(String email, String displayName) throws EmailException {
+        if (email == null || email.isBlank()) {
+            throw new EmailException("Please provide a valid address", null);
+        }
+        if (displayName == null || displayName.isBlank()) {
+            return email;
+        }
+        try {
+            return new InternetAddress(email, displayName, CHARSET).toString();
+        } catch (UnsupportedEncodingException e) {
+            throw new EmailException("Failed to encode email address", e);
+        }
+    }
+
+    @Override
+    public void close() {
+
+    }
+}
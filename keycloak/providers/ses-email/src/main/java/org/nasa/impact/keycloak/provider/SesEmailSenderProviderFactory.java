@@ -0,0 +1,86 @@
+package org.nasa.impact.keycloak.email;
+
+import org.jboss.logging.Logger;
+import org.keycloak.Config;
+import org.keycloak.email.EmailSenderProvider;
+import org.keycloak.email.EmailSenderProviderFactory;
+import org.keycloak.models.KeycloakSession;
+import org.keycloak.models.KeycloakSessionFactory;
+import org.keycloak.provider.ProviderConfigProperty;
+import org.keycloak.provider.ProviderConfigurationBuilder;
+
+import java.util.List;
+
+/**
+ * Configured via e.g. KC_SPI_EMAIL_SENDER_SES_EMAIL_REGION, and made the default email
+ * sender with the build option --spi-email-sender-provider=ses-email.
+ */
+public class SesEmailSenderProviderFactory implements EmailSenderProviderFactory {
+
+    public static final String ID = "ses-email";
+
+    private static final Logger logger = Logger.getLogger(SesEmailSenderProviderFactory.class);
+    private static final int DEFAULT_MAX_ATTEMPTS = 4;
+
+    // Shared by all providers, so that connections to SES are reused across sessions
+    private SesClient client;
+    private String configurationSet;
+
+    @Override
+    public EmailSenderProvider create(KeycloakSession session) {
+        return new SesEmailSenderProvider(session, client, configurationSet);
+    }
+
+    @Override
+    public void init(Config.Scope config) {
+        String region = config.get("region", System.getenv("AWS_REGION"));
+        if (region == null || region.isBlank()) {
+            region = "us-east-1";
+        }
+        client = new SesClient(region, config.get("endpoint"), config.getInt("maxAttempts", DEFAULT_MAX_ATTEMPTS));
+        configurationSet = config.get("configurationSet");
+        logger.infof("Sending email with SES in %s through %s", region, client.getEndpoint());
+    }
+
+    @Override
+    public void postInit(KeycloakSessionFactory factory) {
+        // no-op
+    }
+
+    @Override
+    public void close() {
+        // no-op
+    }
+
+    @Override
+    public String getId() {
+        return ID;
+    }
+
+    @Override
+    public List<ProviderConfigProperty> getConfigMetadata() {
+        return ProviderConfigurationBuilder.create()
+                .property()
+                .name("region")
+                .type("string")
+                .helpText("AWS region of the SES identities, defaults to AWS_REGION")
+                .add()
+                .property()
+                .name("endpoint")
+                .type("string")
+                .helpText("SES endpoint, e.g. of a local SES stand-in, defaults to the regional endpoint")
+                .add()
+                .property()
+                .name("maxAttempts")
+                .type("int")
+                .helpText("Attempts of each send, throttled and failed requests are retried with backoff")
+                .defaultValue(DEFAULT_MAX_ATTEMPTS)
+                .add()
+                .property()
+                .name("configurationSet")
+                .type("string")
+                .helpText("SES configuration set of the sent emails")
+                .add()
+                .build();
+    }
+}
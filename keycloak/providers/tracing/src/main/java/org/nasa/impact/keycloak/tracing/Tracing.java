@@ -0,0 +1,36 @@
+package org.nasa.impact.keycloak.tracing;
+
+import io.opentelemetry.api.OpenTelemetry;
+import io.opentelemetry.api.trace.Tracer;
+import jakarta.enterprise.inject.spi.CDI;
+
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
+
+/**
+ * Tracers of the custom providers, shared library deployed next to them in the providers
+ * directory.
+ */
+public final class Tracing {
+
+    private static final Map<String, Tracer> TRACERS = new ConcurrentHashMap<>();
+
+    private Tracing() {
+    }
+
+    /**
+     * Returns a tracer of Keycloak's OpenTelemetry instance, which is a no-op unless tracing
+     * is enabled in the build. Looked up on first use, once CDI is available.
+     */
+    public static Tracer tracer(String instrumentationScope) {
+        return TRACERS.computeIfAbsent(instrumentationScope, Tracing::lookupTracer);
+    }
+
+    private static Tracer lookupTracer(String instrumentationScope) {
+        try {
+            return CDI.current().select(OpenTelemetry.class).get().getTracer(instrumentationScope);
+        } catch (RuntimeException e) {
+            return OpenTelemetry.noop().getTracer(instrumentationScope);
+        }
+    }
+}
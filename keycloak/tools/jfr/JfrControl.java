@@ -0,0 +1,123 @@
+package org.nasa.impact.keycloak.tools;
+
+import com.sun.tools.attach.VirtualMachine;
+import com.sun.tools.attach.VirtualMachineDescriptor;
+
+import javax.management.MBeanServerConnection;
+import javax.management.ObjectName;
+import javax.management.remote.JMXConnector;
+import javax.management.remote.JMXConnectorFactory;
+import javax.management.remote.JMXServiceURL;
+import java.net.URI;
+import java.net.http.HttpClient;
+import java.net.http.HttpRequest;
+import java.net.http.HttpResponse;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.Arrays;
+
+/**
+ * Controls Java Flight Recorder in the Keycloak JVM of the same container, for use
+ * through ECS Exec (see bin/jfr.py). The Keycloak image has no JDK tools such as jcmd,
+ * so the JFR diagnostic commands are invoked over a local JMX connection instead.
+ *
+ * <pre>
+ * java -jar jfr-control.jar check
+ * java -jar jfr-control.jar start NAME SETTINGS DURATION FILE
+ * java -jar jfr-control.jar dump NAME FILE [PRESIGNED_PUT_URL]
+ * </pre>
+ */
+public class JfrControl {
+
+    private static final String DIAGNOSTIC_COMMAND = "com.sun.management:type=DiagnosticCommand";
+
+    public static void main(String[] args) throws Exception {
+        if (args.length == 0) {
+            usage();
+        }
+
+        switch (args[0]) {
+            case "check" -> System.out.println(execute("jfrCheck"));
+            case "start" -> {
+                if (args.length != 5) {
+                    usage();
+                }
+                System.out.println(execute(
+                        "jfrStart",
+                        "name=" + args[1],
+                        "settings=" + args[2],
+                        "duration=" + args[3],
+                        "filename=" + args[4]));
+            }
+            case "dump" -> {
+                if (args.length < 3) {
+                    usage();
+                }
+                Path file = Path.of(args[2]);
+                try {
+                    System.out.println(execute("jfrDump", "name=" + args[1], "filename=" + file));
+                } catch (Exception e) {
+                    // A recording started with a duration is written to its file when it ends
+                    if (!Files.exists(file)) {
+                        throw e;
+                    }
+                    System.out.println("Recording " + args[1] + " has ended, using " + file);
+                }
+                if (args.length > 3) {
+                    upload(file, args[3]);
+                }
+            }
+            default -> usage();
+        }
+    }
+
+    private static String execute(String command, String... arguments) throws Exception {
+        VirtualMachine vm = VirtualMachine.attach(findKeycloak());
+        try {
+            String address = vm.startLocalManagementAgent();
+            try (JMXConnector connector = JMXConnectorFactory.connect(new JMXServiceURL(address))) {
+                MBeanServerConnection connection = connector.getMBeanServerConnection();
+                return String.valueOf(connection.invoke(
+                        new ObjectName(DIAGNOSTIC_COMMAND),
+                        command,
+                        new Object[]{arguments},
+                        new String[]{String[].class.getName()}));
+            }
+        } finally {
+            vm.detach();
+        }
+    }
+
+    private static String findKeycloak() {
+        String self = String.valueOf(ProcessHandle.current().pid());
+        return VirtualMachine.list().stream()
+                .filter(vm -> !vm.id().equals(self))
+                .filter(vm -> vm.displayName().contains("quarkus"))
+                .map(VirtualMachineDescriptor::id)
+                .findFirst()
+                .orElseThrow(() -> new IllegalStateException(
+                        "No Keycloak JVM found in " + VirtualMachine.list()));
+    }
+
+    private static void upload(Path file, String url) throws Exception {
+        HttpResponse<String> response = HttpClient.newHttpClient().send(
+                HttpRequest.newBuilder(URI.create(url))
+                        .PUT(HttpRequest.BodyPublishers.ofFile(file))
+                        .build(),
+                HttpResponse.BodyHandlers.ofString());
+        if (response.statusCode() != 200) {
+            throw new IllegalStateException(
+                    "Upload failed with status " + response.statusCode() + ": " + response.body());
+        }
+        System.out.println("Uploaded " + file + " (" + Files.size(file) + " bytes)");
+    }
+
+    private static void usage() {
+        System.err.println(String.join("\n", Arrays.asList(
+                "Usage:",
+                "  java -jar jfr-control.jar check",
+                "  java -jar jfr-control.jar start NAME SETTINGS DURATION FILE",
+                "  java -jar jfr-control.jar dump NAME FILE [PRESIGNED_PUT_URL]")));
+        System.exit(2);
+    }
+}